@@ -1,29 +1,42 @@
 import os
-from concurrent.futures import ThreadPoolExecutor
+import time
 
 from flask import Flask, jsonify, render_template, request
 
+# Importing the provider modules registers their fetch plans (see flix_stream.registry).
+from flix_stream import cineby, providers
 from flix_stream.anime import (
-    fetch_aniways_streams,
+    aniways_probe_stats,
     get_aniways_anime_context,
     get_kitsu_anime_context,
     resolve_aniways_id_from_kitsu,
 )
-from flix_stream.cineby import CinebyProvider
+from flix_stream.breaker import breaker_states
+from flix_stream.cache import PROVIDER_CACHE_BUDGET, CacheBudget, cache_stats, ttl_cache
+from flix_stream.availability import is_known_unavailable, provider_outcome, record_provider_outcome
 from flix_stream.anime_id_resolver import (
     pick_best_tmdb_candidate,
     resolve_external_ids_from_mal_anilist,
 )
-from flix_stream.config import AUTOEMBED_SERVERS, MANIFEST, SERVERS
-from flix_stream.crypto import get_decryption_key
-from flix_stream.ids import decode_stream_id, normalize_episode_part, provider_rank
-from flix_stream.providers import (
-    fetch_autoembed_server_streams,
-    fetch_server_streams,
-    fetch_vixsrc_streams,
+from flix_stream.config import (
+    ANIME_EXTERNAL_ID_WAIT,
+    MANIFEST,
+    RESPONSE_CACHE_MAX_BYTES,
+    RESPONSE_CACHE_MAXSIZE,
+    RESPONSE_CACHE_TTL,
+    STREAM_BACKGROUND_GRACE,
+    STREAM_DEADLINE,
 )
+from flix_stream.deadline import mark_partial, request_budget, response_time_left
+from flix_stream.http_client import http_stats, resilience_stats
+from flix_stream.ids import decode_stream_id, normalize_episode_part
+from flix_stream.prefetch import client_key, prefetch_stats, schedule_next
+from flix_stream.rate_limit import limiter_stats
+from flix_stream.registry import PROVIDERS, StreamQuery, provider_rank, stream_providers
+from flix_stream.scheduler import map_tasks, scheduler_stats, submit
 from flix_stream.runtime_config import (
     DEFAULT_ADDON_CONFIG,
+    PROVIDER_FLAGS,
     decode_addon_config_token,
     encode_addon_config,
     normalize_addon_config,
@@ -35,6 +48,7 @@ from flix_stream.famelack import (
     get_famelack_streams,
 )
 from flix_stream.tmdb import get_series_context_from_imdb, get_tmdb_id, search_tmdb_id_by_title
+from flix_stream.warmer import record_request, register_stream_renderer, warmer_stats
 from flix_stream.wyzie import fetch_wyzie_subtitles, merge_subtitles
 
 
@@ -50,48 +64,69 @@ def _support_stream():
 
 
 def _attach_subtitles(streams, subtitles):
+    # Cached provider results are read-only, so replace each stream with a merged copy.
     if not subtitles:
         return streams
-    for stream_obj in streams:
+    for idx, stream_obj in enumerate(streams):
         if not isinstance(stream_obj, dict) or not stream_obj.get("url"):
             continue
-        stream_obj["subtitles"] = merge_subtitles(stream_obj.get("subtitles"), subtitles)
+        streams[idx] = dict(stream_obj, subtitles=merge_subtitles(stream_obj.get("subtitles"), subtitles))
     return streams
 
 
-def _resolve_tmdb_for_anime(source_prefix, source_id, anime_id):
+def _timed(label, stage, func, *args, **kwargs):
+    """Run one stage of a /stream dependency graph, logging how long it took at debug level."""
+    started = time.perf_counter()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        app.logger.debug("%s: %s took %.1f ms", label, stage, (time.perf_counter() - started) * 1000)
+
+
+def _search_anime_titles(title_candidates, hint, year):
+    for title in title_candidates:
+        tmdb_id, tmdb_kind = search_tmdb_id_by_title(title, hint, year)
+        if tmdb_id:
+            return tmdb_id, tmdb_kind
+    return None
+
+
+def _resolve_tmdb_for_anime(source_prefix, source_id):
+    label = f"{source_prefix}:{source_id}"
     if source_prefix == "kitsu":
-        ctx = get_kitsu_anime_context(source_id)
-        title_candidates = (ctx.get("titles") or [])[:6]
-        media_type = str(ctx.get("media_type") or "").lower()
-        hint = "movie" if media_type == "movie" else "series"
+        ctx = _timed(label, "kitsu context", get_kitsu_anime_context, source_id)
         year = None
-        mal_id = ctx.get("mal_id")
-        anilist_id = ctx.get("anilist_id")
     else:
-        ctx = get_aniways_anime_context(anime_id)
-        title_candidates = (ctx.get("titles") or [])[:6]
-        media_type = str(ctx.get("media_type") or "").lower()
-        hint = "movie" if media_type == "movie" else "series"
+        ctx = _timed(label, "aniways context", get_aniways_anime_context, source_id)
         year = ctx.get("season_year")
-        mal_id = ctx.get("mal_id")
-        anilist_id = ctx.get("anilist_id")
+    title_candidates = (ctx.get("titles") or [])[:6]
+    media_type = str(ctx.get("media_type") or "").lower()
+    hint = "movie" if media_type == "movie" else "series"
 
     # Primary path: resolve by stable external ids (MAL/AniList -> Wikidata -> TMDB/IMDb).
-    external_candidates = resolve_external_ids_from_mal_anilist(mal_id=mal_id, anilist_id=anilist_id)
-    tmdb_id, tmdb_kind, imdb_id = pick_best_tmdb_candidate(external_candidates, hint=hint)
+    external_task = submit(
+        _timed, label, "wikidata ids", resolve_external_ids_from_mal_anilist,
+        mal_id=ctx.get("mal_id"), anilist_id=ctx.get("anilist_id"),
+    )
+    title_match = None
+    searched = not external_task.wait(ANIME_EXTERNAL_ID_WAIT)
+    if searched:
+        # Wikidata is slow (tightly rate limited): search by title meanwhile.
+        title_match = _timed(label, "tmdb title search", _search_anime_titles, title_candidates, hint, year)
+
+    tmdb_id, tmdb_kind, imdb_id = pick_best_tmdb_candidate(external_task.result(), hint=hint)
     if tmdb_id:
         return tmdb_id, tmdb_kind
     if imdb_id and str(imdb_id).startswith("tt"):
         kind_hint = "movie" if hint == "movie" else "series"
-        resolved_tmdb = get_tmdb_id(imdb_id, kind_hint)
+        resolved_tmdb = _timed(label, "tmdb find", get_tmdb_id, imdb_id, kind_hint)
         if resolved_tmdb:
             return resolved_tmdb, ("movie" if kind_hint == "movie" else "tv")
 
-    for title in title_candidates:
-        tmdb_id, tmdb_kind = search_tmdb_id_by_title(title, hint, year)
-        if tmdb_id:
-            return tmdb_id, tmdb_kind
+    if not searched:
+        title_match = _timed(label, "tmdb title search", _search_anime_titles, title_candidates, hint, year)
+    if title_match:
+        return title_match
 
     # Fallback without type hint for ambiguous titles.
     for title in title_candidates[:3]:
@@ -143,17 +178,7 @@ def _build_manifest(addon_config):
         base = request.url_root.rstrip("/")
         manifest_data["logo"] = f"{base}{logo}"
 
-    provider_labels = []
-    if addon_config.get("enable_vidzee"):
-        provider_labels.append("VidZee")
-    if addon_config.get("enable_autoembed"):
-        provider_labels.append("AutoEmbed")
-    if addon_config.get("enable_vixsrc"):
-        provider_labels.append("VixSrc")
-    if addon_config.get("enable_cineby"):
-        provider_labels.append("Cineby")
-    if addon_config.get("enable_aniways"):
-        provider_labels.append("Aniways")
+    provider_labels = [spec.label for spec in PROVIDERS.values() if addon_config.get(f"enable_{spec.name}")]
     if famelack_countries:
         provider_labels.append(f"TV ({len(famelack_countries)})")
 
@@ -174,13 +199,14 @@ def _fetch_wyzie_for_regular_content(tmdb_id, kind, season, episode, addon_confi
     return fetch_wyzie_subtitles(tmdb_id, wyzie_season, wyzie_episode, addon_config)
 
 
-def _fetch_wyzie_for_anime_ids(source_prefix, source_id, anime_id, season, episode, addon_config):
+def _fetch_wyzie_for_anime_ids(source_prefix, source_id, season, episode, addon_config):
+    """Subtitles for an anime id; needs only the source id, so it runs alongside the stream fetch."""
     if not addon_config.get("enable_wyzie"):
         return []
     if not addon_config.get("wyzie_apply_to_aniways_ids"):
         return []
 
-    tmdb_id, tmdb_kind = _resolve_tmdb_for_anime(source_prefix, source_id, anime_id)
+    tmdb_id, tmdb_kind = _resolve_tmdb_for_anime(source_prefix, source_id)
     if not tmdb_id:
         return []
 
@@ -190,57 +216,78 @@ def _fetch_wyzie_for_anime_ids(source_prefix, source_id, anime_id, season, episo
         wyzie_season = season or "1"
         wyzie_episode = episode
 
-    return fetch_wyzie_subtitles(tmdb_id, wyzie_season, wyzie_episode, addon_config)
+    return _timed(
+        f"{source_prefix}:{source_id}", "wyzie subtitles",
+        fetch_wyzie_subtitles, tmdb_id, wyzie_season, wyzie_episode, addon_config,
+    )
 
 
-def _fetch_provider_streams(tmdb_id, imdb_id, kind, season, episode, addon_config):
-    all_streams = []
+def _call_provider(fetch, *args):
+    """Run one upstream fetch, returning (streams, error) instead of raising."""
+    try:
+        return fetch(*args), None
+    except Exception as exc:
+        return [], exc
+
+
+def _settle_provider(provider, title_id, season, episode, results):
+    """Combine (streams, error) pairs for one provider and record its outcome."""
+    streams = []
+    errors = []
+    for res, exc in results:
+        streams.extend(res)
+        if exc is not None:
+            errors.append(exc)
+    if errors:
+        app.logger.warning("%s: %d upstream call(s) failed: %s", provider, len(errors), errors[0])
+    record_provider_outcome(provider, title_id, season, episode, provider_outcome(streams, errors))
+    return streams
 
-    def _fetch_vidzee_streams():
-        decryption_key = get_decryption_key()
-        if not decryption_key:
-            app.logger.warning("VidZee decryption key unavailable; skipping VidZee provider")
-            return []
-
-        streams = []
-        with ThreadPoolExecutor(max_workers=min(10, len(SERVERS) or 1)) as executor:
-            for res in executor.map(
-                lambda s: fetch_server_streams(tmdb_id, s, season, episode, decryption_key),
-                SERVERS,
-            ):
-                streams.extend(res)
-        return streams
 
-    def _fetch_autoembed_streams():
-        streams = []
-        with ThreadPoolExecutor(max_workers=min(6, len(AUTOEMBED_SERVERS) or 1)) as executor:
-            for res in executor.map(
-                lambda s: fetch_autoembed_server_streams(tmdb_id, s, season, episode),
-                AUTOEMBED_SERVERS,
-            ):
-                streams.extend(res)
-        return streams
+def _provider_available(spec, query):
+    if is_known_unavailable(spec.name, query.title_id, query.season, query.episode):
+        app.logger.debug("Skipping %s for %s %s: provider has no streams for this title", spec.name, query.id_kind, query.title_id)
+        return False
+    return True
+
+
+def _scheduled_providers(query, addon_config):
+    """Registered providers that can serve ``query`` and may still have streams for it, best rank first."""
+    return [spec for spec in stream_providers(query, addon_config) if _provider_available(spec, query)]
+
+
+def _run_provider(spec, query):
+    calls = spec.plan(query)
+    if not calls:
+        return []
+    results = map_tasks(lambda call: _call_provider(*call), calls, provider=spec.slot)
+    return _settle_provider(spec.name, query.title_id, query.season, query.episode, results)
+
 
-    with ThreadPoolExecutor(max_workers=6) as executor:
-        futures = []
-        if addon_config.get("enable_vidzee"):
-            futures.append(executor.submit(_fetch_vidzee_streams))
-        if addon_config.get("enable_autoembed"):
-            futures.append(executor.submit(_fetch_autoembed_streams))
-        if addon_config.get("enable_vixsrc"):
-            futures.append(executor.submit(fetch_vixsrc_streams, tmdb_id, kind, season, episode))
-        if addon_config.get("enable_cineby"):
-            futures.append(executor.submit(CinebyProvider.fetch_streams, tmdb_id, imdb_id, ("tv" if kind in ("series", "tv") else "movie"), season or 1, episode or 1))
-
-        for future in futures:
-            try:
-                all_streams.extend(future.result())
-            except Exception as exc:
-                app.logger.error("Provider fetch failed: %s", exc)
+def _fetch_provider_streams(query, addon_config):
+    # Group tasks stay untagged: only the leaf upstream calls hold provider slots.
+    tasks = [submit(_run_provider, spec, query) for spec in _scheduled_providers(query, addon_config)]
+    all_streams = []
+    for task in tasks:
+        if not _finished_in_time(task):
+            continue
+        try:
+            all_streams.extend(task.result())
+        except Exception as exc:
+            app.logger.error("Provider fetch failed: %s", exc)
 
     return all_streams
 
 
+def _finished_in_time(task):
+    """Wait for ``task`` until the response deadline; a late task keeps running in the background."""
+    left = response_time_left()
+    if left is None or task.wait(left):
+        return True
+    mark_partial()
+    return False
+
+
 def parse_stream_id(content_type, raw_id):
     """Parse Stremio content ids into a provider id + optional season/episode."""
     decoded_id = decode_stream_id(raw_id)
@@ -271,11 +318,17 @@ def parse_stream_id(content_type, raw_id):
     return content_id, season, episode
 
 
+CORS_HEADERS = (
+    ("Access-Control-Allow-Origin", "*"),
+    ("Access-Control-Allow-Headers", "*"),
+    ("Access-Control-Allow-Methods", "GET,POST,OPTIONS"),
+)
+
+
 @app.after_request
 def after_request(response):
-    response.headers.add("Access-Control-Allow-Origin", "*")
-    response.headers.add("Access-Control-Allow-Headers", "*")
-    response.headers.add("Access-Control-Allow-Methods", "GET,POST,OPTIONS")
+    for name, value in CORS_HEADERS:
+        response.headers.add(name, value)
     return response
 
 
@@ -293,6 +346,8 @@ def _render_config_page(config_token=None):
         initial_config=normalized_config,
         config_token=canonical_token,
         base_url=request.url_root.rstrip("/"),
+        providers=list(PROVIDERS.values()),
+        provider_flags=list(PROVIDER_FLAGS),
     )
 
 
@@ -318,42 +373,108 @@ def manifest_with_config(config_token):
     return jsonify(_build_manifest(addon_config))
 
 
-def _catalog_response(catalog_type, catalog_id, addon_config, skip=None):
+def _catalog_payload(catalog_type, catalog_id, addon_config, skip=0):
     if catalog_type != "series":
-        return jsonify({"metas": []})
+        return {"metas": []}, 200
 
     # Famelack Catalogs
     if catalog_id.startswith("famelack-"):
         code = catalog_id.replace("famelack-", "")
         allowed = addon_config.get("famelack_countries") or []
         if code.lower() not in [c.lower() for c in allowed]:
-             return jsonify({"metas": []})
-
-        if skip is None:
-            try:
-                skip = int(request.args.get("skip", "0"))
-            except Exception:
-                skip = 0
+             return {"metas": []}, 200
 
         metas = get_famelack_catalog(code, skip=skip)
-        return jsonify({"metas": metas})
+        return {"metas": metas}, 200
 
-    return jsonify({"metas": []})
+    return {"metas": []}, 200
 
 
-def _meta_response(content_type, raw_id, addon_config):
-    if content_type != "series":
-        return jsonify({"meta": None}), 404
+def _catalog_response(catalog_type, catalog_id, addon_config, skip=None):
+    if skip is None:
+        try:
+            skip = int(request.args.get("skip", "0"))
+        except Exception:
+            skip = 0
+    return _cached_response("catalog", catalog_type, catalog_id, addon_config, skip=skip)
 
-    decoded_id = decode_stream_id(raw_id)
+
+def _meta_payload(content_type, decoded_id, addon_config):
+    if content_type != "series":
+        return {"meta": None}, 404
 
     if str(decoded_id).startswith("famelack:"):
         meta = get_famelack_meta(decoded_id)
         if not isinstance(meta, dict):
-            return jsonify({"meta": None}), 404
-        return jsonify({"meta": meta})
+            return {"meta": None}, 404
+        return {"meta": meta}, 200
+
+    return {"meta": None}, 404
+
+
+def _meta_response(content_type, raw_id, addon_config):
+    return _cached_response("meta", content_type, raw_id, addon_config)
+
+
+def _is_cacheable_response(result):
+    return result[2]
+
 
-    return jsonify({"meta": None}), 404
+RESPONSE_CACHE_BUDGET = CacheBudget(RESPONSE_CACHE_MAX_BYTES)
+
+
+@ttl_cache(
+    ttl_seconds=RESPONSE_CACHE_TTL,
+    maxsize=RESPONSE_CACHE_MAXSIZE,
+    immutable=True,
+    budget=RESPONSE_CACHE_BUDGET,
+    should_cache=_is_cacheable_response,
+)
+def _render_response(route, content_type, content_id, addon_config, skip=None):
+    """Build and serialize one addon response, returning (body, status, cacheable).
+
+    Keyed by the normalized config and decoded id, so repeat requests skip the
+    provider fan-out and serialization entirely. Answers that may be degraded
+    (no streams or metas, errors, cut short by STREAM_DEADLINE) are served but
+    not kept.
+    """
+    if route == "stream":
+        with request_budget(STREAM_DEADLINE, STREAM_BACKGROUND_GRACE) as budget:
+            payload = _stream_payload(content_type, content_id, addon_config)
+        return _stream_result(payload, complete=budget is None or not budget.partial)
+    if route == "catalog":
+        payload, status = _catalog_payload(content_type, content_id, addon_config, skip=skip)
+        cacheable = bool(payload["metas"])
+    else:
+        payload, status = _meta_payload(content_type, content_id, addon_config)
+        cacheable = status == 200
+    return _encode_payload(payload), status, cacheable
+
+
+def _encode_payload(payload):
+    # Same bytes jsonify produces outside debug mode.
+    return (app.json.dumps(payload, separators=(",", ":")) + "\n").encode("utf-8")
+
+
+def _stream_result(payload, complete=True):
+    # Only keep complete answers with more than the support entry.
+    return _encode_payload(payload), 200, complete and len(payload["streams"]) > 1
+
+
+def _stream_ttl_left(content_type, content_id, addon_config):
+    return _render_response.cache_ttl_left("stream", content_type, content_id, addon_config, skip=None)
+
+
+def _warm_stream(content_type, content_id, addon_config):
+    return _render_response("stream", content_type, content_id, addon_config, skip=None)
+
+
+register_stream_renderer(_stream_ttl_left, _warm_stream)
+
+
+def _cached_response(route, content_type, raw_id, addon_config, skip=None):
+    body, status, _ = _render_response(route, content_type, decode_stream_id(raw_id), addon_config, skip=skip)
+    return app.response_class(body, status=status, mimetype="application/json")
 
 
 @app.route("/catalog/<type>/<id>.json")
@@ -392,6 +513,38 @@ def meta_with_config(config_token, type, id):
     return _meta_response(type, id, addon_config)
 
 
+def _is_local_request():
+    return request.remote_addr in ("127.0.0.1", "::1") and not request.headers.get("X-Forwarded-For")
+
+
+@app.route("/metrics")
+def metrics():
+    """Runtime counters for tuning cache sizes; only served to loopback clients."""
+    if not _is_local_request():
+        return jsonify({"error": "not found"}), 404
+    return jsonify({
+        "caches": cache_stats(),
+        "provider_cache_budget": PROVIDER_CACHE_BUDGET.stats(),
+        "response_cache_budget": RESPONSE_CACHE_BUDGET.stats(),
+        "http": http_stats(),
+        "http_resilience": resilience_stats(),
+        "upstream_limits": limiter_stats(),
+        "scheduler": scheduler_stats(),
+        "prefetch": prefetch_stats(),
+        "warmer": warmer_stats(),
+        "aniways_probes": aniways_probe_stats(),
+        "cineby_wasm_pool": cineby.CinebyProvider.wasm_pool_stats(),
+    })
+
+
+@app.route("/breakers")
+def breakers():
+    """Circuit breaker state and latency per upstream; only served to loopback clients."""
+    if not _is_local_request():
+        return jsonify({"error": "not found"}), 404
+    return jsonify(breaker_states())
+
+
 @app.route("/api/famelack/countries")
 def api_famelack_countries():
     countries = get_famelack_countries()
@@ -406,7 +559,75 @@ def api_famelack_countries():
     return jsonify(result)
 
 
-def _stream_response(content_type, raw_id, addon_config):
+def _parse_anime_stream_id(parts):
+    """Split aniways:<id>:<episode> / kitsu:<id>[:<season>]:<episode> parts into (source_id, season, episode)."""
+    source_id = parts[1] if len(parts) > 1 else None
+    season = normalize_episode_part(parts[2] if len(parts) > 3 else None)
+    if len(parts) > 3:
+        episode = normalize_episode_part(parts[3])
+    else:
+        episode = normalize_episode_part(parts[2] if len(parts) > 2 else None)
+    return source_id, season, episode
+
+
+def _anime_sort_key(stream):
+    return str(stream.get("name", "")), str(stream.get("title", ""))
+
+
+def _stream_sort_key(stream):
+    return provider_rank(stream), str(stream.get("name", "")), str(stream.get("title", ""))
+
+
+def _finalize_streams(streams, subtitles, sort_key):
+    _attach_subtitles(streams, subtitles)
+    streams.sort(key=sort_key)
+    streams.append(_support_stream())
+    return {"streams": streams}
+
+
+def _title_query(parts, tmdb_id, kind, season, episode):
+    imdb_id = parts[0] if parts and parts[0].startswith("tt") else None
+    return StreamQuery("imdb" if imdb_id else "tmdb", tmdb_id, kind, season, episode, imdb_id)
+
+
+def _anime_stream_payload(source_prefix, parts, kind, addon_config):
+    """Streams for aniways:/kitsu: ids, fetched as two independent branches.
+
+    Subtitles (context -> Wikidata/TMDB -> Wyzie) only need the source id, so
+    they resolve while the Aniways id is looked up and its streams are fetched;
+    the response waits for the longer branch instead of the sum of both.
+    """
+    source_id, season, episode = _parse_anime_stream_id(parts)
+    if not stream_providers(StreamQuery(source_prefix, source_id, kind), addon_config):
+        return {"streams": []}
+    if not source_id or not episode:
+        return {"streams": []}
+
+    label = f"{source_prefix}:{source_id}"
+    started = time.perf_counter()
+    wyzie_task = submit(_fetch_wyzie_for_anime_ids, source_prefix, source_id, season, episode, addon_config)
+
+    anime_id = source_id
+    if source_prefix == "kitsu":
+        anime_id = _timed(label, "aniways id", resolve_aniways_id_from_kitsu, source_id)
+    if not anime_id:
+        return {"streams": []}
+
+    anime_streams = _timed(
+        label, "aniways streams",
+        _fetch_provider_streams, StreamQuery(source_prefix, anime_id, kind, None, episode), addon_config,
+    )
+    wyzie_subtitles = []
+    if _finished_in_time(wyzie_task):
+        try:
+            wyzie_subtitles = wyzie_task.result()
+        except Exception as exc:
+            app.logger.error("Wyzie fetch failed: %s", exc)
+    app.logger.debug("%s: stream graph took %.1f ms", label, (time.perf_counter() - started) * 1000)
+    return _finalize_streams(anime_streams, wyzie_subtitles, _anime_sort_key)
+
+
+def _stream_payload(content_type, raw_id, addon_config):
     decoded_id = decode_stream_id(raw_id)
     parts = [p for p in decoded_id.split(":") if p]
     kind = (content_type or "").lower()
@@ -415,47 +636,14 @@ def _stream_response(content_type, raw_id, addon_config):
     if prefix == "famelack":
         streams = get_famelack_streams(decoded_id)
         streams.append(_support_stream())
-        return jsonify({"streams": streams})
+        return {"streams": streams}
 
     if prefix in ("aniways", "kitsu"):
-        if not addon_config.get("enable_aniways"):
-            return jsonify({"streams": []})
-
-        source_prefix = prefix
-        source_id = parts[1] if len(parts) > 1 else None
-        season = normalize_episode_part(parts[2] if len(parts) > 3 else None)
-        if len(parts) > 3:
-            aniways_episode = normalize_episode_part(parts[3])
-        else:
-            aniways_episode = normalize_episode_part(parts[2] if len(parts) > 2 else None)
-
-        if not source_id or not aniways_episode:
-            return jsonify({"streams": []})
-
-        anime_id = source_id
-        if source_prefix == "kitsu":
-            anime_id = resolve_aniways_id_from_kitsu(source_id)
-
-        if not anime_id:
-            return jsonify({"streams": []})
-
-        aniways_streams = fetch_aniways_streams(anime_id, aniways_episode)
-        wyzie_subtitles = _fetch_wyzie_for_anime_ids(
-            source_prefix,
-            source_id,
-            anime_id,
-            season,
-            aniways_episode,
-            addon_config,
-        )
-        _attach_subtitles(aniways_streams, wyzie_subtitles)
-        aniways_streams.sort(key=lambda s: (str(s.get("name", "")), str(s.get("title", ""))))
-        aniways_streams.append(_support_stream())
-        return jsonify({"streams": aniways_streams})
+        return _anime_stream_payload(prefix, parts, kind, addon_config)
 
     tmdb_id, season, episode = parse_stream_id(content_type, raw_id)
     if not tmdb_id:
-        return jsonify({"streams": []})
+        return {"streams": []}
 
     if kind in ("series", "tv") and (not season or not episode):
         raw_imdb = parts[0] if parts else ""
@@ -467,42 +655,38 @@ def _stream_response(content_type, raw_id, addon_config):
                 episode = str(hint_episode)
 
     if kind in ("series", "tv") and (not season or not episode):
-        return jsonify({"streams": []})
-
-    with ThreadPoolExecutor(max_workers=2) as executor:
-        provider_future = executor.submit(
-            _fetch_provider_streams,
-            tmdb_id,
-            parts[0] if parts and parts[0].startswith("tt") else None,
-            kind,
-            season,
-            episode,
-            addon_config,
-        )
-        wyzie_future = executor.submit(
-            _fetch_wyzie_for_regular_content,
-            tmdb_id,
-            kind,
-            season,
-            episode,
-            addon_config,
-        )
-        try:
-            all_streams = provider_future.result()
-        except Exception as exc:
-            app.logger.error("Provider fetch group failed: %s", exc)
-            all_streams = []
+        return {"streams": []}
+
+    wyzie_task = submit(
+        _fetch_wyzie_for_regular_content,
+        tmdb_id,
+        kind,
+        season,
+        episode,
+        addon_config,
+        provider="wyzie",
+    )
+    try:
+        all_streams = _fetch_provider_streams(_title_query(parts, tmdb_id, kind, season, episode), addon_config)
+    except Exception as exc:
+        app.logger.error("Provider fetch group failed: %s", exc)
+        all_streams = []
+    wyzie_subtitles = []
+    if _finished_in_time(wyzie_task):
         try:
-            wyzie_subtitles = wyzie_future.result()
+            wyzie_subtitles = wyzie_task.result()
         except Exception as exc:
             app.logger.error("Wyzie fetch failed: %s", exc)
-            wyzie_subtitles = []
 
-    _attach_subtitles(all_streams, wyzie_subtitles)
+    return _finalize_streams(all_streams, wyzie_subtitles, _stream_sort_key)
 
-    all_streams.sort(key=lambda s: (provider_rank(s), str(s.get("name", "")), str(s.get("title", ""))))
-    all_streams.append(_support_stream())
-    return jsonify({"streams": all_streams})
+
+def _stream_response(content_type, raw_id, addon_config):
+    response = _cached_response("stream", content_type, raw_id, addon_config)
+    record_request(content_type, raw_id, addon_config)
+    client = client_key(request.remote_addr, request.headers.get("X-Forwarded-For", ""))
+    schedule_next(content_type, raw_id, addon_config, client, _warm_stream)
+    return response
 
 
 @app.route("/stream/<type>/<path:id>.json")
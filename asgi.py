@@ -0,0 +1,166 @@
+"""ASGI entry point: ``uvicorn asgi:application``.
+
+/stream requests are coroutines on one event loop. Response-cache hits are
+answered on the loop, concurrent identical misses await one build, and that
+build is the WSGI ``app``'s own cached renderer run on the shared bounded
+scheduler, so both entry points produce the same bytes from one implementation.
+Every other route is served by the Flask app on the scheduler.
+"""
+import asyncio
+import io
+import logging
+import re
+import sys
+
+from app import (
+    CORS_HEADERS,
+    _render_response,
+    _warm_stream,
+    app,
+)
+from flix_stream.ids import decode_stream_id
+from flix_stream.prefetch import client_key, schedule_next
+from flix_stream.runtime_config import DEFAULT_ADDON_CONFIG, decode_addon_config_token, encode_addon_config, normalize_addon_config
+from flix_stream.scheduler import run_async
+from flix_stream.warmer import record_request
+
+
+logger = logging.getLogger(__name__)
+
+_STREAM_ROUTE = re.compile(r"^/(?:(?P<config>[^/]+)/)?stream/(?P<type>[^/]+)/(?P<id>.+)\.json$")
+_inflight = {}
+
+
+async def render_stream(content_type, raw_id, addon_config):
+    """Return (body, status, cacheable) for a /stream request, sharing the WSGI response cache."""
+    content_id = decode_stream_id(raw_id)
+    cached = _render_response.cache_get("stream", content_type, content_id, addon_config, skip=None)
+    if cached is not None:
+        return cached
+    key = (content_type, content_id, encode_addon_config(addon_config))
+    pending = _inflight.get(key)
+    if pending is None:
+        # Concurrent identical misses await one build; shield it from any single client disconnecting.
+        pending = _inflight[key] = asyncio.ensure_future(
+            run_async(_render_response, "stream", content_type, content_id, addon_config, skip=None)
+        )
+        pending.add_done_callback(lambda _: _inflight.pop(key, None))
+    return await asyncio.shield(pending)
+
+
+async def _send(send, status, headers, body, head=False):
+    await send({"type": "http.response.start", "status": status, "headers": headers})
+    await send({"type": "http.response.body", "body": b"" if head else body})
+
+
+def _response_headers(content_type, body):
+    headers = [(b"content-type", content_type), (b"content-length", str(len(body)).encode("latin-1"))]
+    headers.extend((name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in CORS_HEADERS)
+    return headers
+
+
+async def _read_body(receive):
+    chunks = []
+    while True:
+        message = await receive()
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body"):
+            return b"".join(chunks)
+
+
+def _wsgi_environ(scope, body):
+    server_name, server_port = scope.get("server") or ("localhost", 80)
+    client = scope.get("client") or ("", 0)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", "").encode("utf-8").decode("latin-1"),
+        "PATH_INFO": scope["path"].encode("utf-8").decode("latin-1"),
+        "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+        "SERVER_NAME": str(server_name),
+        "SERVER_PORT": str(server_port),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "REMOTE_ADDR": client[0],
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": io.BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+    }
+    for raw_name, raw_value in scope.get("headers", []):
+        name = raw_name.decode("latin-1").upper().replace("-", "_")
+        value = raw_value.decode("latin-1")
+        if name not in ("CONTENT_TYPE", "CONTENT_LENGTH"):
+            name = f"HTTP_{name}"
+        environ[name] = f"{environ[name]},{value}" if name in environ else value
+    return environ
+
+
+def _call_wsgi(environ):
+    captured = {}
+
+    def start_response(status, headers, exc_info=None):
+        captured["status"] = int(status.split(" ", 1)[0])
+        captured["headers"] = headers
+
+    result = app(environ, start_response)
+    try:
+        body = b"".join(result)
+    finally:
+        if hasattr(result, "close"):
+            result.close()
+    headers = [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in captured["headers"]]
+    return captured["status"], headers, body
+
+
+async def _serve_wsgi(scope, receive, send):
+    environ = _wsgi_environ(scope, await _read_body(receive))
+    status, headers, body = await run_async(_call_wsgi, environ)
+    await _send(send, status, headers, body)
+
+
+def _client_id(scope):
+    forwarded = ",".join(
+        value.decode("latin-1") for name, value in scope.get("headers", []) if name.lower() == b"x-forwarded-for"
+    )
+    return client_key((scope.get("client") or ("",))[0], forwarded)
+
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def application(scope, receive, send):
+    if scope["type"] == "lifespan":
+        await _lifespan(receive, send)
+        return
+    if scope["type"] != "http":
+        return
+
+    match = _STREAM_ROUTE.match(scope["path"]) if scope["method"] in ("GET", "HEAD") else None
+    if match is None:
+        await _serve_wsgi(scope, receive, send)
+        return
+
+    config_token = match.group("config")
+    if config_token:
+        addon_config = decode_addon_config_token(config_token)
+    else:
+        addon_config = normalize_addon_config(DEFAULT_ADDON_CONFIG)
+    try:
+        body, status, _ = await render_stream(match.group("type"), match.group("id"), addon_config)
+        content_type = b"application/json"
+    except Exception:
+        logger.exception("Stream request failed for %s", scope["path"])
+        body, status, content_type = b"Internal Server Error", 500, b"text/plain; charset=utf-8"
+    await _send(send, status, _response_headers(content_type, body), body, head=scope["method"] == "HEAD")
+    if status == 200:
+        record_request(match.group("type"), match.group("id"), addon_config)
+        schedule_next(match.group("type"), match.group("id"), addon_config, _client_id(scope), _warm_stream)
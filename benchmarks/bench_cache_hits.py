@@ -0,0 +1,70 @@
+"""Compare ttl_cache hit cost for deep-copy mode vs immutable mode.
+
+Usage: python benchmarks/bench_cache_hits.py [hits]
+"""
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from flix_stream.cache import ttl_cache  # noqa: E402
+from flix_stream.config import COMMON_HEADERS  # noqa: E402
+
+
+def _vidzee_like_result(stream_count=4, subtitle_count=20):
+    subtitles = [
+        {"url": f"https://subs.example/{idx}.vtt", "lang": "eng", "id": f"English{idx}"}
+        for idx in range(subtitle_count)
+    ]
+    return [
+        {
+            "name": "VidZee - Duke",
+            "title": f"[VidZee] English stream {idx}\nDuke",
+            "url": f"https://cdn.example/{idx}/master.m3u8",
+            "behaviorHints": {
+                "notWebReady": True,
+                "proxyHeaders": {"request": dict(COMMON_HEADERS)},
+            },
+            "subtitles": list(subtitles),
+        }
+        for idx in range(stream_count)
+    ]
+
+
+def _measure(immutable, hits):
+    payload = _vidzee_like_result()
+
+    @ttl_cache(ttl_seconds=3600, maxsize=16, immutable=immutable)
+    def fetch(tmdb_id):
+        return payload
+
+    fetch(1)
+
+    started = time.perf_counter()
+    for _ in range(hits):
+        fetch(1)
+    elapsed = time.perf_counter() - started
+
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    before, _ = tracemalloc.get_traced_memory()
+    kept = [fetch(1) for _ in range(100)]
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del kept
+
+    return elapsed / hits * 1e6, (after - before) / 100
+
+
+def main():
+    hits = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    print(f"{'mode':<12}{'us/hit':>12}{'bytes/hit':>14}")
+    for label, immutable in (("deepcopy", False), ("immutable", True)):
+        per_hit_us, bytes_per_hit = _measure(immutable, hits)
+        print(f"{label:<12}{per_hit_us:>12.2f}{bytes_per_hit:>14.0f}")
+
+
+if __name__ == "__main__":
+    main()
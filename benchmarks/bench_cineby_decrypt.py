@@ -0,0 +1,67 @@
+"""Compare Cineby WASM decrypt throughput: a fresh instance per call vs the instance pool.
+
+"fresh" is what decryption cost before pooling: a new Store, host functions and
+Instance plus verification for every response. The payload is random hex of a
+typical response size, which exercises the same code path as a real one.
+
+Usage: python benchmarks/bench_cineby_decrypt.py [seconds] [threads]
+"""
+import os
+import sys
+import threading
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from flix_stream.cineby import CinebyProvider, WasmDecryptor  # noqa: E402
+
+
+PAYLOAD = os.urandom(4096).hex()
+TMDB_ID = 603
+
+
+def _fresh(engine, module):
+    return WasmDecryptor(engine, module, CinebyProvider.FIXED_WASM_HASH).decrypt(PAYLOAD, TMDB_ID)
+
+
+def _pooled(engine, module):
+    return CinebyProvider._run_wasm_decrypt(engine, module, PAYLOAD, TMDB_ID)
+
+
+def _measure(decrypt, engine, module, seconds, threads):
+    counts = [0] * threads
+    stop = time.perf_counter() + seconds
+
+    def work(slot):
+        while time.perf_counter() < stop:
+            decrypt(engine, module)
+            counts[slot] += 1
+
+    workers = [threading.Thread(target=work, args=(slot,)) for slot in range(threads)]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return sum(counts) / (time.perf_counter() - started)
+
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 3.0
+    threads = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    engine, module = CinebyProvider._get_wasm()
+    if module is None:
+        sys.exit("wasmtime and flix_stream/module.wasm are required")
+    if _fresh(engine, module) != _pooled(engine, module):
+        sys.exit("pooled decrypt does not match a fresh instance")
+
+    print(f"{'mode':<10}{'threads':>8}{'decrypts/s':>14}")
+    for thread_count in sorted({1, threads}):
+        for label, decrypt in (("fresh", _fresh), ("pooled", _pooled)):
+            rate = _measure(decrypt, engine, module, seconds, thread_count)
+            print(f"{label:<10}{thread_count:>8}{rate:>14.1f}")
+    print(f"pool: {CinebyProvider.wasm_pool_stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,31 @@
 import base64
 import json
 import re
-from concurrent.futures import ThreadPoolExecutor
-from functools import lru_cache
+import threading
 
-import requests
-
-from flix_stream.cache import ttl_cache
+from flix_stream import http_client
+from flix_stream.availability import ProviderError
+from flix_stream.breaker import get_breaker
+from flix_stream.cache import PROVIDER_CACHE_BUDGET, lru_cache, ttl_cache
 from flix_stream.config import (
     ANIWAYS_API_BASE,
     ANIWAYS_COMMON_HEADERS,
+    ANIWAYS_EPISODES_CACHE_HARD_TTL,
+    ANIWAYS_EPISODES_CACHE_TTL,
+    ANIWAYS_EPISODES_REFRESH_MIN_AGE,
+    ANIWAYS_SERVERS_CACHE_TTL,
     COMMON_HEADERS,
+    ID_CACHE_TTL,
     KITSU_API_BASE,
     PROVIDER_CACHE_MAXSIZE,
-    PROVIDER_CACHE_TTL,
+    RESOLVER_CACHE_PERSIST_TTL,
 )
+from flix_stream.persistent_cache import get_id_store, get_persistent_store
+from flix_stream.registry import get_provider, provider_plan
+from flix_stream.scheduler import map_tasks, submit
+
+
+ANIWAYS = get_provider("aniways")
 
 
 def decode_b64_loose(token):
@@ -105,37 +116,244 @@ def is_aniways_api_proxy_url(url):
     )
 
 
-@ttl_cache(ttl_seconds=PROVIDER_CACHE_TTL, maxsize=PROVIDER_CACHE_MAXSIZE)
-def fetch_aniways_streams(anime_id, episode_num):
-    """Fetch stream links from Aniways for a specific anime and episode number."""
+_PROBE_BREAKER = "aniways/probe"
+
+# (serverName, type) -> (server, type) query parameters that last worked for that server.
+_SERVER_PARAMS_NAMESPACE = "flix_stream.anime.server_params"
+_server_params = {}
+_server_params_lock = threading.Lock()
+_probe_stats = {"learned_hits": 0, "learned_misses": 0, "probe_rounds": 0, "probes": 0, "rejected": 0, "unresolved": 0}
+
+
+def _server_param_candidates(server_name, server_type):
+    """Every (server, type) parameter pair to try for a server entry, most likely first."""
+    server_candidates = []
+    raw_server_name = str(server_name or "").strip()
+    if raw_server_name:
+        server_candidates.append(raw_server_name)
+        server_candidates.append(raw_server_name.lower().replace(" ", "-"))
+        server_candidates.append(raw_server_name.lower())
+    server_candidates = [
+        value
+        for idx, value in enumerate(server_candidates)
+        if value and value not in server_candidates[:idx]
+    ]
+
+    type_candidates = []
+    raw_server_type = str(server_type or "").strip()
+    if raw_server_type:
+        type_candidates.append(raw_server_type)
+        type_candidates.append(raw_server_type.lower())
+    else:
+        type_candidates.append("")
+    type_candidates = [
+        value for idx, value in enumerate(type_candidates) if value not in type_candidates[:idx]
+    ]
+    return [(server_param, type_param) for server_param in server_candidates or [""] for type_param in type_candidates]
+
+
+def _learned_server_params(key):
+    with _server_params_lock:
+        params = _server_params.get(key)
+    if params is None:
+        l2 = get_persistent_store()
+        found = l2.get(_SERVER_PARAMS_NAMESPACE, key) if l2 is not None else None
+        if found is not None:
+            params = tuple(found[0])
+            with _server_params_lock:
+                _server_params.setdefault(key, params)
+    return params
+
+
+def _remember_server_params(key, params):
+    with _server_params_lock:
+        if params is None:
+            _server_params.pop(key, None)
+        else:
+            _server_params[key] = params
+    l2 = get_persistent_store()
+    if l2 is None:
+        return
+    if params is None:
+        l2.delete(_SERVER_PARAMS_NAMESPACE, key)
+    else:
+        l2.set(_SERVER_PARAMS_NAMESPACE, key, list(params), ttl_seconds=RESOLVER_CACHE_PERSIST_TTL)
+
+
+def _count_probe(name, amount=1):
+    with _server_params_lock:
+        _probe_stats[name] += amount
+
+
+def _request_server_source(url, params, probe=False):
+    """Aniways' answer for one server/type spelling, or None when it could not be reached.
+
+    Probes of unconfirmed spellings are sent once (no retries or hedges) and
+    outside any breaker: a wrong spelling may well be answered with a 5xx, so
+    only whole probe rounds are counted (see ``_fetch_server_source``).
+    """
+    kwargs = {"headers": ANIWAYS_COMMON_HEADERS, "params": {"server": params[0], "type": params[1]}, "timeout": 5}
     try:
-        episodes_url = f"{ANIWAYS_API_BASE}/anime/{anime_id}/episodes"
-        response_episode = requests.get(episodes_url, headers=ANIWAYS_COMMON_HEADERS, timeout=10)
-        if response_episode.status_code != 200:
-            return []
+        if probe:
+            return http_client.get(url, breaker=False, **kwargs)
+        return http_client.resilient_get(url, **kwargs)
+    except Exception:
+        return None
 
-        episodes = response_episode.json()
-        target_ep = None
-        for episode in episodes:
-            if str(episode.get("number")) == str(episode_num):
-                target_ep = episode
-                break
 
-        if not target_ep:
-            return []
+def _probe_failed_upstream(response):
+    # No answer or a 5xx says nothing about whether the spelling is right.
+    return response is None or response.status_code >= 500
+
+
+def _fetch_server_source(url, server_name, server_type):
+    """GET one Aniways server's source, returning the 200 response or None.
+
+    The server/type spelling that last worked for this (serverName, type) is
+    tried first; otherwise every remaining spelling is probed in parallel and
+    the first one in preference order that answers is remembered, without
+    waiting for the less preferred probes still running.
+    """
+    key = (str(server_name or ""), str(server_type or ""))
+    candidates = _server_param_candidates(server_name, server_type)
+    learned = _learned_server_params(key)
+    if learned is not None:
+        response = _request_server_source(url, learned)
+        if response is not None and response.status_code == 200:
+            _count_probe("learned_hits")
+            return response
+        if _probe_failed_upstream(response):
+            # The server is failing, not the spelling; keep it for next time.
+            return None
+        _count_probe("learned_misses")
+        candidates = [params for params in candidates if params != learned]
+
+    circuit = get_breaker(_PROBE_BREAKER)
+    if not circuit.allow():
+        _count_probe("rejected")
+        return None
+    _count_probe("probe_rounds")
+    _count_probe("probes", len(candidates))
+    tasks = [submit(_request_server_source, url, params, probe=True) for params in candidates]
+    conclusive = True
+    for params, task in zip(candidates, tasks):
+        response = task.result()
+        if response is not None and response.status_code == 200:
+            circuit.record(True)
+            _remember_server_params(key, params)
+            return response
+        conclusive = conclusive and not _probe_failed_upstream(response)
+    _count_probe("unresolved")
+    if conclusive:
+        # Every spelling was refused outright: the server is gone, Aniways itself is fine.
+        circuit.release()
+        _remember_server_params(key, None)
+    else:
+        circuit.record(False)
+    return None
 
-        episode_id = target_ep.get("id")
-        if not episode_id:
-            return []
 
-        servers_url = f"{ANIWAYS_API_BASE}/anime/{anime_id}/episodes/{episode_id}/servers"
-        response_server = requests.get(servers_url, headers=ANIWAYS_COMMON_HEADERS, timeout=10)
-        if response_server.status_code != 200:
+def aniways_probe_stats():
+    with _server_params_lock:
+        stats = dict(_probe_stats, learned=len(_server_params))
+    tried = stats["learned_hits"] + stats["learned_misses"]
+    stats["learned_hit_rate"] = round(stats["learned_hits"] / tried, 3) if tried else None
+    return stats
+
+
+def _fetch_episode_index(anime_id):
+    url = f"{ANIWAYS_API_BASE}/anime/{anime_id}/episodes"
+    response = http_client.resilient_get(url, headers=ANIWAYS_COMMON_HEADERS, timeout=ANIWAYS.timeout)
+    if response.status_code == 404:
+        return {}
+    if response.status_code != 200:
+        raise ProviderError(f"Aniways episodes returned HTTP {response.status_code}")
+    index = {}
+    for episode in response.json():
+        number = str(episode.get("number"))
+        if episode.get("id") and number not in index:
+            index[number] = episode["id"]
+    return index
+
+
+@ttl_cache(
+    ttl_seconds=ANIWAYS_EPISODES_CACHE_TTL,
+    hard_ttl_seconds=ANIWAYS_EPISODES_CACHE_HARD_TTL,
+    maxsize=PROVIDER_CACHE_MAXSIZE,
+    immutable=True,
+    persist=True,
+    budget=PROVIDER_CACHE_BUDGET,
+    # An empty answer for a show we already know is a glitch, not a removed show.
+    replace_if=lambda cached, index: bool(index) or not cached,
+)
+def get_aniways_episode_index(anime_id):
+    """Map of episode number (as a string) to Aniways episode id; {} when the anime is unknown.
+
+    The full episode list is large for long-running shows, so only this index is kept.
+    """
+    return _fetch_episode_index(anime_id)
+
+
+def _aniways_episode_id(anime_id, episode_num):
+    index = get_aniways_episode_index(anime_id)
+    episode_id = index.get(str(episode_num))
+    if episode_id is None:
+        # The index is fresh for ANIWAYS_EPISODES_CACHE_TTL seconds, so this is its age.
+        ttl_left = get_aniways_episode_index.cache_ttl_left(anime_id)
+        if ttl_left is not None and ANIWAYS_EPISODES_CACHE_TTL - ttl_left >= ANIWAYS_EPISODES_REFRESH_MIN_AGE:
+            # A newly aired episode may be missing from an older index; the empty stream result
+            # that follows a real miss is remembered by the provider cache and availability index.
+            index = get_aniways_episode_index.cache_refresh(anime_id)
+            episode_id = index.get(str(episode_num))
+    return episode_id
+
+
+@ttl_cache(
+    ttl_seconds=ANIWAYS_SERVERS_CACHE_TTL,
+    maxsize=PROVIDER_CACHE_MAXSIZE,
+    immutable=True,
+    persist=True,
+    budget=PROVIDER_CACHE_BUDGET,
+)
+def get_aniways_servers(anime_id, episode_id):
+    """Server entries (serverId, serverName, type) for one Aniways episode; [] when it has none."""
+    url = f"{ANIWAYS_API_BASE}/anime/{anime_id}/episodes/{episode_id}/servers"
+    response = http_client.resilient_get(url, headers=ANIWAYS_COMMON_HEADERS, timeout=ANIWAYS.timeout)
+    if response.status_code == 404:
+        return []
+    if response.status_code != 200:
+        raise ProviderError(f"Aniways servers returned HTTP {response.status_code}")
+    return [
+        {key: srv.get(key) for key in ("serverId", "serverName", "type")}
+        for srv in response.json()
+        if isinstance(srv, dict) and srv.get("serverId")
+    ]
+
+
+@ttl_cache(
+    maxsize=PROVIDER_CACHE_MAXSIZE,
+    immutable=True,
+    persist=True,
+    budget=PROVIDER_CACHE_BUDGET,
+    **ANIWAYS.cache_window,
+)
+def fetch_aniways_streams(anime_id, episode_num):
+    """Fetch stream links from Aniways for a specific anime and episode number.
+
+    The episode index and server lists come from their own longer-lived caches,
+    so a cold episode of a known show only costs the server and source calls.
+    Returns [] when Aniways has no such episode and raises ProviderError when the
+    upstream calls fail.
+    """
+    try:
+        episode_id = _aniways_episode_id(anime_id, episode_num)
+        if not episode_id:
             return []
 
-        servers = response_server.json()
+        servers = get_aniways_servers(anime_id, episode_id)
 
         def _fetch_server_streams(srv):
+            # Returns None when the server could not be queried.
             streams = []
             server_id = srv.get("serverId")
             server_name = srv.get("serverName")
@@ -146,47 +364,9 @@ def fetch_aniways_streams(anime_id, episode_num):
             stream_api_url = f"{ANIWAYS_API_BASE}/anime/{anime_id}/episodes/servers/{server_id}"
 
             try:
-                server_candidates = []
-                raw_server_name = str(server_name or "").strip()
-                if raw_server_name:
-                    server_candidates.append(raw_server_name)
-                    server_candidates.append(raw_server_name.lower().replace(" ", "-"))
-                    server_candidates.append(raw_server_name.lower())
-                server_candidates = [
-                    value
-                    for idx, value in enumerate(server_candidates)
-                    if value and value not in server_candidates[:idx]
-                ]
-
-                type_candidates = []
-                raw_server_type = str(server_type or "").strip()
-                if raw_server_type:
-                    type_candidates.append(raw_server_type)
-                    type_candidates.append(raw_server_type.lower())
-                else:
-                    type_candidates.append("")
-                type_candidates = [
-                    value for idx, value in enumerate(type_candidates) if value not in type_candidates[:idx]
-                ]
-
-                response_stream = None
-                for server_param in server_candidates or [""]:
-                    for type_param in type_candidates:
-                        params = {"server": server_param, "type": type_param}
-                        response_candidate = requests.get(
-                            stream_api_url,
-                            headers=ANIWAYS_COMMON_HEADERS,
-                            params=params,
-                            timeout=5,
-                        )
-                        if response_candidate.status_code == 200:
-                            response_stream = response_candidate
-                            break
-                    if response_stream is not None:
-                        break
-
+                response_stream = _fetch_server_source(stream_api_url, server_name, server_type)
                 if response_stream is None:
-                    return streams
+                    return None
 
                 stream_data = response_stream.json()
                 source_obj = stream_data.get("source") if isinstance(stream_data.get("source"), dict) else {}
@@ -285,16 +465,28 @@ def fetch_aniways_streams(anime_id, episode_num):
                         stream_obj["subtitles"] = subtitles
                     streams.append(stream_obj)
             except Exception:
-                return []
+                return None
             return streams
 
         streams = []
-        with ThreadPoolExecutor(max_workers=min(8, len(servers) or 1)) as executor:
-            for server_streams in executor.map(_fetch_server_streams, servers):
-                streams.extend(server_streams)
+        failed_servers = 0
+        for server_streams in map_tasks(_fetch_server_streams, servers, provider="aniways"):
+            if server_streams is None:
+                failed_servers += 1
+                continue
+            streams.extend(server_streams)
+        if not streams and failed_servers:
+            raise ProviderError(f"all {failed_servers} Aniways server(s) failed")
         return streams
-    except Exception:
-        return []
+    except ProviderError:
+        raise
+    except Exception as exc:
+        raise ProviderError(f"Aniways: {exc}") from exc
+
+
+@provider_plan("aniways")
+def plan_aniways(query):
+    return [(fetch_aniways_streams, query.title_id, query.episode)]
 
 
 def normalize_title_for_match(value):
@@ -303,7 +495,7 @@ def normalize_title_for_match(value):
     return re.sub(r"[^a-z0-9]+", "", str(value).lower())
 
 
-@lru_cache(maxsize=1024)
+@lru_cache(maxsize=1024, persist_ttl_seconds=ID_CACHE_TTL, persist_store=get_id_store)
 def get_kitsu_anime_context(kitsu_id):
     """Fetch Kitsu anime metadata and cross-site mappings for Aniways resolution."""
     titles = []
@@ -317,15 +509,14 @@ def get_kitsu_anime_context(kitsu_id):
 
     def _fetch_json(url):
         try:
-            response = requests.get(url, headers=headers, timeout=10)
+            response = http_client.resilient_get(url, headers=headers, timeout=10)
             if response.status_code != 200:
                 return None
             return response.json()
         except Exception:
             return None
 
-    with ThreadPoolExecutor(max_workers=2) as executor:
-        anime_payload, mappings_payload = executor.map(_fetch_json, [anime_url, mappings_url])
+    anime_payload, mappings_payload = map_tasks(_fetch_json, [anime_url, mappings_url], provider="kitsu")
 
     try:
         data = anime_payload.get("data") if isinstance(anime_payload, dict) else None
@@ -392,11 +583,11 @@ def get_kitsu_anime_context(kitsu_id):
     }
 
 
-@lru_cache(maxsize=2048)
+@lru_cache(maxsize=2048, persist_ttl_seconds=RESOLVER_CACHE_PERSIST_TTL)
 def fetch_aniways_search_page(query, page=1, items_per_page=20):
     params = {"q": query, "page": page, "itemsPerPage": items_per_page}
     try:
-        response = requests.get(
+        response = http_client.resilient_get(
             f"{ANIWAYS_API_BASE}/anime/listings/search",
             headers=ANIWAYS_COMMON_HEADERS,
             params=params,
@@ -411,7 +602,7 @@ def fetch_aniways_search_page(query, page=1, items_per_page=20):
         return []
 
 
-@lru_cache(maxsize=1024)
+@lru_cache(maxsize=1024, persist_ttl_seconds=ID_CACHE_TTL, persist_store=get_id_store)
 def get_aniways_anime_context(anime_id):
     """Fetch Aniways metadata for subtitle/ID enrichment flows."""
     titles = []
@@ -421,7 +612,7 @@ def get_aniways_anime_context(anime_id):
     anilist_id = None
 
     try:
-        response = requests.get(
+        response = http_client.resilient_get(
             f"{ANIWAYS_API_BASE}/anime/{anime_id}",
             headers=ANIWAYS_COMMON_HEADERS,
             timeout=10,
@@ -474,7 +665,7 @@ def get_aniways_anime_context(anime_id):
     }
 
 
-@lru_cache(maxsize=1024)
+@lru_cache(maxsize=1024, persist_ttl_seconds=ID_CACHE_TTL, persist_store=get_id_store)
 def resolve_aniways_id_from_kitsu(kitsu_id):
     """Resolve Aniways anime id from a Kitsu anime id using mappings + title search."""
     ctx = get_kitsu_anime_context(kitsu_id)
@@ -496,12 +687,11 @@ def resolve_aniways_id_from_kitsu(kitsu_id):
         ordered_queries.append(token)
 
     search_results = {}
-    with ThreadPoolExecutor(max_workers=min(6, len(ordered_queries) or 1)) as executor:
-        for title, items in zip(
-            ordered_queries,
-            executor.map(lambda q: fetch_aniways_search_page(q, page=1, items_per_page=20), ordered_queries),
-        ):
-            search_results[title] = items
+    for title, items in zip(
+        ordered_queries,
+        map_tasks(lambda q: fetch_aniways_search_page(q, page=1, items_per_page=20), ordered_queries, provider="aniways"),
+    ):
+        search_results[title] = items
 
     # First pass: exact external-id match (most reliable).
     for title in primary_titles:
@@ -1,10 +1,10 @@
 import logging
-from functools import lru_cache
 from urllib.parse import quote_plus
 
-import requests
-
-from flix_stream.config import COMMON_HEADERS
+from flix_stream import http_client
+from flix_stream.cache import lru_cache
+from flix_stream.config import COMMON_HEADERS, ID_CACHE_TTL
+from flix_stream.persistent_cache import get_id_store
 
 
 logger = logging.getLogger(__name__)
@@ -32,7 +32,7 @@ def _build_external_id_query(mal_id=None, anilist_id=None):
     )
 
 
-@lru_cache(maxsize=2048)
+@lru_cache(maxsize=2048, persist_ttl_seconds=ID_CACHE_TTL, persist_store=get_id_store)
 def resolve_external_ids_from_mal_anilist(mal_id=None, anilist_id=None):
     """Resolve TMDB/IMDb ids from MAL/AniList ids via Wikidata."""
     query = _build_external_id_query(mal_id, anilist_id)
@@ -45,7 +45,7 @@ def resolve_external_ids_from_mal_anilist(mal_id=None, anilist_id=None):
         "Accept": "application/sparql-results+json, application/json",
     }
     try:
-        payload = requests.get(url, headers=headers, timeout=10).json()
+        payload = http_client.get(url, headers=headers, timeout=10).json()
         rows = payload.get("results", {}).get("bindings", [])
     except Exception as exc:
         logger.error("Wikidata lookup failed for MAL=%s AniList=%s: %s", mal_id, anilist_id, exc)
@@ -0,0 +1,46 @@
+from flix_stream.cache import _MISSING, TTLStore
+from flix_stream.config import PROVIDER_EMPTY_MAXSIZE, PROVIDER_EMPTY_TTL
+
+OUTCOME_OK = "ok"
+OUTCOME_EMPTY = "empty"
+OUTCOME_ERROR = "error"
+
+# (provider, title id, season, episode) -> True for titles a provider confirmed it does not carry.
+_EMPTY_INDEX = TTLStore(PROVIDER_EMPTY_TTL, PROVIDER_EMPTY_MAXSIZE)
+
+
+class ProviderError(Exception):
+    """An upstream call failed, as opposed to the provider answering with no streams."""
+
+
+def _index_key(provider, title_id, season, episode):
+    return (str(provider), str(title_id), str(season or ""), str(episode or ""))
+
+
+def provider_outcome(streams, errors):
+    if streams:
+        return OUTCOME_OK
+    if errors:
+        return OUTCOME_ERROR
+    return OUTCOME_EMPTY
+
+
+def record_provider_outcome(provider, title_id, season, episode, outcome):
+    """Remember confirmed-empty answers; transient errors leave the index untouched."""
+    if PROVIDER_EMPTY_TTL <= 0:
+        return
+    key = _index_key(provider, title_id, season, episode)
+    if outcome == OUTCOME_EMPTY:
+        _EMPTY_INDEX.set(key, True)
+    elif outcome == OUTCOME_OK:
+        _EMPTY_INDEX.pop(key)
+
+
+def is_known_unavailable(provider, title_id, season, episode):
+    if PROVIDER_EMPTY_TTL <= 0:
+        return False
+    return _EMPTY_INDEX.get(_index_key(provider, title_id, season, episode)) is not _MISSING
+
+
+def clear_availability_index():
+    _EMPTY_INDEX.clear()
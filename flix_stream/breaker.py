@@ -0,0 +1,163 @@
+"""Circuit breakers and latency-derived timeouts for upstream calls.
+
+One breaker per upstream name: a provider server ("vidzee/4"), a Cineby
+sub-provider ("cineby/vidsrc") or, by default, the host. A breaker opens after
+BREAKER_FAILURES consecutive errors or when the error rate over the last
+BREAKER_WINDOW calls reaches BREAKER_ERROR_RATE, rejects calls for
+BREAKER_COOLDOWN seconds, then lets a single half-open probe decide whether
+to close again.
+"""
+import math
+import threading
+import time
+from collections import deque
+
+from flix_stream.config import (
+    ADAPTIVE_TIMEOUT_FACTOR,
+    ADAPTIVE_TIMEOUT_MIN,
+    BREAKER_COOLDOWN,
+    BREAKER_ERROR_RATE,
+    BREAKER_FAILURES,
+    BREAKER_WINDOW,
+)
+
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Successful-call latencies kept per upstream for percentiles, and how many are needed first.
+LATENCY_SAMPLES = 200
+MIN_LATENCY_SAMPLES = 20
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an upstream whose breaker is open."""
+
+
+def _percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(fraction * len(ordered)) - 1))]
+
+
+class CircuitBreaker:
+    def __init__(self, name, failures=BREAKER_FAILURES, error_rate=BREAKER_ERROR_RATE,
+                 window=BREAKER_WINDOW, cooldown=BREAKER_COOLDOWN):
+        self.name = name
+        self.failures = max(1, failures)
+        self.error_rate = error_rate
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probing = False
+        self._consecutive = 0
+        self._outcomes = deque(maxlen=max(1, window))
+        self._latencies = deque(maxlen=LATENCY_SAMPLES)
+        self._rejected = 0
+        self._trips = 0
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._current_state(time.monotonic())
+
+    def _current_state(self, now):
+        if self._state == OPEN and now - self._opened_at >= self.cooldown:
+            self._state = HALF_OPEN
+            self._probing = False
+        return self._state
+
+    def allow(self):
+        """Whether a call may go out now; a half-open breaker admits one probe at a time."""
+        with self._lock:
+            state = self._current_state(time.monotonic())
+            if state == CLOSED:
+                return True
+            if state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            self._rejected += 1
+            return False
+
+    def record(self, success, latency=None):
+        with self._lock:
+            self._probing = False
+            if success:
+                self._consecutive = 0
+                self._outcomes.append(True)
+                if latency is not None:
+                    self._latencies.append(latency)
+                if self._state == HALF_OPEN:
+                    self._state = CLOSED
+                    self._outcomes.clear()
+                return
+            self._consecutive += 1
+            self._outcomes.append(False)
+            if self._state == HALF_OPEN or (self._state == CLOSED and self._should_trip()):
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+                self._trips += 1
+
+    def release(self):
+        """Forget an admitted call that ended without telling anything about the upstream."""
+        with self._lock:
+            self._probing = False
+
+    def _should_trip(self):
+        if self._consecutive >= self.failures:
+            return True
+        if len(self._outcomes) < self._outcomes.maxlen:
+            return False
+        errors = self._outcomes.count(False)
+        return errors / len(self._outcomes) >= self.error_rate
+
+    def latency_percentile(self, fraction):
+        """Observed latency at ``fraction`` (e.g. 0.95) in seconds, or None with too few samples."""
+        with self._lock:
+            if len(self._latencies) < MIN_LATENCY_SAMPLES:
+                return None
+            samples = list(self._latencies)
+        return _percentile(samples, fraction)
+
+    def timeout(self, default):
+        """``default`` shrunk to ADAPTIVE_TIMEOUT_FACTOR x p95 latency once enough calls were seen."""
+        if default is None or isinstance(default, tuple):
+            return default
+        p95 = self.latency_percentile(0.95)
+        if p95 is None:
+            return default
+        return min(default, max(ADAPTIVE_TIMEOUT_MIN, p95 * ADAPTIVE_TIMEOUT_FACTOR))
+
+    def stats(self):
+        p95 = self.latency_percentile(0.95)
+        with self._lock:
+            state = self._current_state(time.monotonic())
+            calls = len(self._outcomes)
+            return {
+                "state": state,
+                "consecutive_failures": self._consecutive,
+                "error_rate": round(self._outcomes.count(False) / calls, 3) if calls else 0.0,
+                "p95_ms": None if p95 is None else round(p95 * 1000, 1),
+                "trips": self._trips,
+                "rejected": self._rejected,
+                "retry_in": round(max(0.0, self.cooldown - (time.monotonic() - self._opened_at)), 1) if state == OPEN else 0.0,
+            }
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(name):
+    breaker = _breakers.get(name)
+    if breaker is None:
+        with _breakers_lock:
+            breaker = _breakers.get(name)
+            if breaker is None:
+                breaker = _breakers[name] = CircuitBreaker(name)
+    return breaker
+
+
+def breaker_states():
+    return {name: breaker.stats() for name, breaker in sorted(_breakers.items())}
@@ -1,8 +1,46 @@
+import contextvars
 import copy
+import heapq
+import itertools
+import logging
+import math
+import sys
 import time
 from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from functools import wraps
-from threading import RLock
+from threading import Event, Lock
+
+from flix_stream.config import PROVIDER_CACHE_MAX_BYTES
+from flix_stream.persistent_cache import get_persistent_store
+
+logger = logging.getLogger(__name__)
+
+CACHE_SHARDS = 16
+REFRESH_WORKERS = 4
+
+_MISSING = object()
+
+# Qualified function name -> cached wrapper, used for stats reporting.
+_REGISTRY = {}
+
+# Seconds before expiry within which a hit is reloaded synchronously (see refresh_ahead).
+_refresh_ahead = contextvars.ContextVar("cache_refresh_ahead", default=0.0)
+
+
+@contextmanager
+def refresh_ahead(seconds):
+    """Reload cached entries that would expire within ``seconds`` when they are read in this context.
+
+    Used by background warmers so hot entries are replaced before callers ever
+    see them stale or missing. A reload that fails keeps the cached value.
+    """
+    token = _refresh_ahead.set(max(0.0, seconds))
+    try:
+        yield
+    finally:
+        _refresh_ahead.reset(token)
 
 
 def _freeze(value):
@@ -25,51 +63,622 @@ def _make_key(args, kwargs):
     return (_freeze(args), _freeze(kwargs))
 
 
-def ttl_cache(ttl_seconds=45, maxsize=2048):
+class FrozenDict(dict):
+    """Read-only dict handed out by immutable caches; serializes like a plain dict."""
+
+    __slots__ = ()
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("cached results are read-only; copy before mutating")
+
+    __setitem__ = __delitem__ = __ior__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+
+    def __copy__(self):
+        return dict(self)
+
+    def __deepcopy__(self, memo):
+        return thaw(self)
+
+    def __reduce__(self):
+        return (FrozenDict, (dict(self),))
+
+
+def freeze_value(value):
+    """Recursively convert dicts/lists into FrozenDict/tuple so they can be shared safely."""
+    if isinstance(value, FrozenDict):
+        return value
+    if isinstance(value, dict):
+        return FrozenDict((key, freeze_value(val)) for key, val in value.items())
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze_value(item) for item in value)
+    return value
+
+
+def thaw(value):
+    """Return a mutable deep copy of a value produced by freeze_value."""
+    if isinstance(value, dict):
+        return {key: thaw(val) for key, val in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [thaw(item) for item in value]
+    return value
+
+
+def estimate_size(value):
+    """Approximate deep size of a cached value in bytes (shared sub-objects are counted each time)."""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        for key, item in value.items():
+            size += estimate_size(key) + estimate_size(item)
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        for item in value:
+            size += estimate_size(item)
+    return size
+
+
+class _Shard:
+    __slots__ = ("lock", "entries", "expiry_heap", "limit", "bytes", "hits", "misses", "expirations", "evictions")
+
+    def __init__(self, limit):
+        self.lock = Lock()
+        # key -> (expires_at, value, size), kept in LRU order (oldest first).
+        self.entries = OrderedDict()
+        # (expires_at, seq, key) min-heap; entries may be stale after overwrite/eviction.
+        self.expiry_heap = []
+        self.limit = limit
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.evictions = 0
+
+
+class CacheBudget:
+    """Byte budget shared by several TTLStores.
+
+    Stores report size changes here; when the total goes over ``max_bytes`` the
+    store holding the most bytes gives up its least recently used entries.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max(0, int(max_bytes or 0))
+        self._lock = Lock()
+        self._stores = []
+        self.used_bytes = 0
+        self.evictions = 0
+
+    def register(self, store):
+        with self._lock:
+            self._stores.append(store)
+
+    def charge(self, delta):
+        with self._lock:
+            self.used_bytes += delta
+
+    def reclaim(self):
+        if not self.max_bytes:
+            return
+        while self.used_bytes > self.max_bytes:
+            with self._lock:
+                stores = list(self._stores)
+            largest = max(stores, key=lambda store: store.bytes, default=None)
+            if largest is None or not largest.evict_one():
+                return
+            with self._lock:
+                self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            return {"max_bytes": self.max_bytes, "used_bytes": self.used_bytes, "evictions": self.evictions}
+
+
+class TTLStore:
+    """Sharded LRU store with min-heap expiry.
+
+    Lookups only inspect the requested key, so hit cost does not depend on how
+    many entries are cached. Expired entries are dropped lazily on access and by
+    popping the expiry heap on insert (amortized O(log n)).
+    """
+
+    def __init__(self, ttl_seconds, maxsize, shards=CACHE_SHARDS, budget=None):
+        self.ttl = ttl_seconds
+        self.maxsize = max(1, int(maxsize or 1))
+        shard_count = max(1, min(int(shards or 1), self.maxsize))
+        per_shard = -(-self.maxsize // shard_count)
+        self._shards = tuple(_Shard(per_shard) for _ in range(shard_count))
+        self._seq = itertools.count()
+        self._budget = budget
+        if budget is not None:
+            budget.register(self)
+
+    @property
+    def bytes(self):
+        return sum(shard.bytes for shard in self._shards)
+
+    def _account(self, shard, delta):
+        # Called with shard.lock held; the budget lock is always taken after a shard lock.
+        shard.bytes += delta
+        if self._budget is not None:
+            self._budget.charge(delta)
+
+    def _shard_for(self, key):
+        return self._shards[hash(key) % len(self._shards)]
+
+    def get(self, key, now=None, record=True):
+        now = time.monotonic() if now is None else now
+        shard = self._shard_for(key)
+        with shard.lock:
+            cached = shard.entries.get(key)
+            if cached is None:
+                if record:
+                    shard.misses += 1
+                return _MISSING
+            expires_at, value, size = cached
+            if expires_at <= now:
+                del shard.entries[key]
+                self._account(shard, -size)
+                shard.expirations += 1
+                if record:
+                    shard.misses += 1
+                return _MISSING
+            shard.entries.move_to_end(key)
+            if record:
+                shard.hits += 1
+            return value
+
+    def set(self, key, value, now=None, ttl=None):
+        now = time.monotonic() if now is None else now
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = math.inf if ttl is None else now + ttl
+        size = estimate_size(value)
+        shard = self._shard_for(key)
+        with shard.lock:
+            self._purge_expired(shard, now)
+            previous = shard.entries.pop(key, None)
+            if previous is not None:
+                self._account(shard, -previous[2])
+            shard.entries[key] = (expires_at, value, size)
+            self._account(shard, size)
+            if expires_at != math.inf:
+                heapq.heappush(shard.expiry_heap, (expires_at, next(self._seq), key))
+            while len(shard.entries) > shard.limit:
+                _, (_, _, evicted_size) = shard.entries.popitem(last=False)
+                self._account(shard, -evicted_size)
+                shard.evictions += 1
+            if len(shard.expiry_heap) > 2 * len(shard.entries) + 32:
+                self._rebuild_heap(shard)
+        if self._budget is not None:
+            self._budget.reclaim()
+
+    def expiry(self, key):
+        """Monotonic expiry time of ``key`` (inf when it never expires), or None when absent."""
+        shard = self._shard_for(key)
+        with shard.lock:
+            cached = shard.entries.get(key)
+            return None if cached is None else cached[0]
+
+    def evict_one(self):
+        """Drop the least recently used entry of the largest shard; False when empty."""
+        shard = max(self._shards, key=lambda item: item.bytes)
+        with shard.lock:
+            if not shard.entries:
+                return False
+            _, (_, _, size) = shard.entries.popitem(last=False)
+            self._account(shard, -size)
+            shard.evictions += 1
+        return True
+
+    def pop(self, key):
+        shard = self._shard_for(key)
+        with shard.lock:
+            cached = shard.entries.pop(key, None)
+            if cached is None:
+                return _MISSING
+            self._account(shard, -cached[2])
+        return cached[1]
+
+    def _purge_expired(self, shard, now):
+        heap = shard.expiry_heap
+        entries = shard.entries
+        while heap and heap[0][0] <= now:
+            expires_at, _, key = heapq.heappop(heap)
+            cached = entries.get(key)
+            # Skip heap records left behind by overwritten or evicted entries.
+            if cached is not None and cached[0] == expires_at:
+                del entries[key]
+                self._account(shard, -cached[2])
+                shard.expirations += 1
+
+    def _rebuild_heap(self, shard):
+        shard.expiry_heap = [
+            (expires_at, next(self._seq), key)
+            for key, (expires_at, _, _) in shard.entries.items()
+            if expires_at != math.inf
+        ]
+        heapq.heapify(shard.expiry_heap)
+
+    def clear(self):
+        for shard in self._shards:
+            with shard.lock:
+                shard.entries.clear()
+                shard.expiry_heap.clear()
+                self._account(shard, -shard.bytes)
+
+    def stats(self):
+        totals = {"hits": 0, "misses": 0, "expirations": 0, "evictions": 0, "entries": 0, "bytes": 0}
+        for shard in self._shards:
+            with shard.lock:
+                totals["hits"] += shard.hits
+                totals["misses"] += shard.misses
+                totals["expirations"] += shard.expirations
+                totals["evictions"] += shard.evictions
+                totals["entries"] += len(shard.entries)
+                totals["bytes"] += shard.bytes
+        totals["maxsize"] = self.maxsize
+        return totals
+
+    def __len__(self):
+        return sum(len(shard.entries) for shard in self._shards)
+
+
+class _Call:
+    __slots__ = ("event", "result", "error")
+
+    def __init__(self):
+        self.event = Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Run at most one call per key at a time; concurrent callers share its outcome."""
+
+    def __init__(self):
+        self._lock = Lock()
+        self._calls = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    def do(self, key, func):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+                self.leaders += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func()
+        except BaseException as exc:
+            call.error = exc
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.event.set()
+        return call.result
+
+    def stats(self):
+        with self._lock:
+            return {"leaders": self.leaders, "coalesced": self.coalesced, "in_flight": len(self._calls)}
+
+
+_refresh_executor = None
+_refresh_executor_lock = Lock()
+
+
+def _submit_refresh(task):
+    global _refresh_executor
+    if _refresh_executor is None:
+        with _refresh_executor_lock:
+            if _refresh_executor is None:
+                _refresh_executor = ThreadPoolExecutor(
+                    max_workers=REFRESH_WORKERS,
+                    thread_name_prefix="cache-refresh",
+                )
+    _refresh_executor.submit(task)
+
+
+def _is_empty_result(value):
+    if isinstance(value, tuple):
+        return all(item is None for item in value)
+    return not value
+
+
+def _memoize(
+    func,
+    store,
+    immutable=False,
+    copy_results=False,
+    fresh_ttl=None,
+    persist_ttl=None,
+    persist_empty=True,
+    persist_store=None,
+    should_cache=None,
+    replace_if=None,
+):
+    """Wrap ``func`` with ``store``; entries older than ``fresh_ttl`` are served stale and refreshed.
+
+    With ``persist_ttl`` set, misses consult the SQLite tier returned by
+    ``persist_store()`` (the shared L2 tier by default) before calling ``func``
+    and new results are written to it. Results for which ``should_cache``
+    returns false are handed to the waiting callers but not stored; when
+    ``replace_if(cached, result)`` returns false the cached value is kept and
+    stored again instead.
+    """
+    name = f"{func.__module__}.{func.__qualname__}"
+    flight = SingleFlight()
+    refreshing = set()
+    refreshing_lock = Lock()
+    load_stats = {"loads": 0, "load_seconds": 0.0, "l2_hits": 0, "refreshes": 0}
+    load_stats_lock = Lock()
+
+    def _load_persisted(l2, key, require_fresh):
+        found = l2.get(name, key)
+        if found is None:
+            return _MISSING
+        value, fresh_until, expires_at = found
+        wall_now = time.time()
+        if require_fresh and fresh_until <= wall_now:
+            return _MISSING
+        if immutable:
+            value = freeze_value(value)
+        now = time.monotonic()
+        local_fresh = math.inf if fresh_ttl is None else now + (fresh_until - wall_now)
+        local_ttl = None if store.ttl is None else expires_at - wall_now
+        store.set(key, (local_fresh, value), now=now, ttl=local_ttl)
+        return value
+
+    def _load(key, args, kwargs, force=False):
+        if not force:
+            # Another leader may have filled the entry between our miss and taking the flight.
+            cached = store.get(key, record=False)
+            if cached is not _MISSING:
+                return cached[1]
+        l2 = (persist_store or get_persistent_store)() if persist_ttl else None
+        if l2 is not None:
+            # Another worker may already hold the value (a fresh one, when refreshing).
+            persisted = _load_persisted(l2, key, require_fresh=force)
+            if persisted is not _MISSING:
+                with load_stats_lock:
+                    load_stats["l2_hits"] += 1
+                return persisted
+
+        started = time.perf_counter()
+        result = func(*args, **kwargs)
+        with load_stats_lock:
+            load_stats["loads"] += 1
+            load_stats["load_seconds"] += time.perf_counter() - started
+        return _store(key, result, l2)
+
+    def _store(key, result, l2):
+        if immutable:
+            result = freeze_value(result)
+        elif copy_results:
+            result = copy.deepcopy(result)
+        if should_cache is not None and not should_cache(result):
+            return result
+        if replace_if is not None:
+            cached = store.get(key, record=False)
+            if cached is not _MISSING and not replace_if(cached[1], result):
+                result = cached[1]
+        now = time.monotonic()
+        fresh_until = math.inf if fresh_ttl is None else now + fresh_ttl
+        store.set(key, (fresh_until, result), now=now)
+        if l2 is not None and (persist_empty or not _is_empty_result(result)):
+            l2.set(name, key, result, persist_ttl, fresh_seconds=fresh_ttl)
+        return result
+
+    def _refresh(key, args, kwargs):
+        try:
+            flight.do(key, lambda: _load(key, args, kwargs, force=True))
+        except Exception as exc:
+            # Stale-if-error: keep serving the previous value until its hard expiry.
+            logger.warning("Background refresh of %s failed: %s", func.__qualname__, exc)
+        finally:
+            with refreshing_lock:
+                refreshing.discard(key)
+
+    def _schedule_refresh(key, args, kwargs):
+        with refreshing_lock:
+            if key in refreshing:
+                return
+            refreshing.add(key)
+        with load_stats_lock:
+            load_stats["refreshes"] += 1
+        try:
+            _submit_refresh(lambda: _refresh(key, args, kwargs))
+        except RuntimeError:
+            # Executor already shut down (interpreter exit); the next miss will reload.
+            with refreshing_lock:
+                refreshing.discard(key)
+
+    def _expires_in(key, fresh_until, now):
+        expires_at = store.expiry(key)
+        return min(fresh_until, math.inf if expires_at is None else expires_at) - now
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        key = _make_key(args, kwargs)
+        now = time.monotonic()
+        cached = store.get(key, now)
+        if cached is _MISSING:
+            value = flight.do(key, lambda: _load(key, args, kwargs))
+        else:
+            fresh_until, value = cached
+            ahead = _refresh_ahead.get()
+            if ahead and _expires_in(key, fresh_until, now) <= ahead:
+                try:
+                    value = flight.do(key, lambda: _load(key, args, kwargs, force=True))
+                except Exception as exc:
+                    logger.debug("Refresh-ahead of %s failed: %s", func.__qualname__, exc)
+            elif fresh_until <= now:
+                _schedule_refresh(key, args, kwargs)
+        return copy.deepcopy(value) if copy_results else value
+
+    def cache_get(*args, **kwargs):
+        """Cached result for these arguments, or None on a miss; never calls ``func``."""
+        key = _make_key(args, kwargs)
+        now = time.monotonic()
+        cached = store.get(key, now)
+        if cached is _MISSING:
+            return None
+        fresh_until, value = cached
+        if fresh_until <= now:
+            _schedule_refresh(key, args, kwargs)
+        return copy.deepcopy(value) if copy_results else value
+
+    def cache_set(result, *args, **kwargs):
+        """Store ``result`` as if ``func(*args, **kwargs)`` had returned it; returns the stored value."""
+        l2 = (persist_store or get_persistent_store)() if persist_ttl else None
+        return _store(_make_key(args, kwargs), result, l2)
+
+    def cache_refresh(*args, **kwargs):
+        """Reload the entry for these arguments now, coalesced with concurrent loads; returns the stored value."""
+        key = _make_key(args, kwargs)
+        value = flight.do(key, lambda: _load(key, args, kwargs, force=True))
+        return copy.deepcopy(value) if copy_results else value
+
+    def cache_ttl_left(*args, **kwargs):
+        """Seconds until the entry for these arguments goes stale or expires, or None on a miss."""
+        key = _make_key(args, kwargs)
+        now = time.monotonic()
+        cached = store.get(key, now, record=False)
+        if cached is _MISSING:
+            return None
+        return max(0.0, _expires_in(key, cached[0], now))
+
+    def cache_clear():
+        store.clear()
+
+    def cache_info():
+        """Store counters plus upstream load cost and single-flight counts for this function."""
+        info = store.stats()
+        with load_stats_lock:
+            loads = load_stats["loads"]
+            info["loads"] = loads
+            info["avg_load_ms"] = round(load_stats["load_seconds"] / loads * 1000, 3) if loads else 0.0
+            info["l2_hits"] = load_stats["l2_hits"]
+            info["refreshes"] = load_stats["refreshes"]
+        flight_stats = flight.stats()
+        info["coalesced"] = flight_stats["coalesced"]
+        return info
+
+    wrapper.cache_get = cache_get
+    wrapper.cache_set = cache_set
+    wrapper.cache_refresh = cache_refresh
+    wrapper.cache_ttl_left = cache_ttl_left
+    wrapper.cache_clear = cache_clear
+    wrapper.cache_info = cache_info
+    wrapper.single_flight_stats = flight.stats
+    _REGISTRY[name] = wrapper
+    return wrapper
+
+
+def ttl_cache(
+    ttl_seconds=45,
+    maxsize=2048,
+    shards=CACHE_SHARDS,
+    immutable=False,
+    hard_ttl_seconds=None,
+    persist=False,
+    budget=None,
+    should_cache=None,
+    replace_if=None,
+):
+    """Memoize results for ``ttl_seconds``.
+
+    By default every hit returns a deep copy. With ``immutable=True`` the result
+    is frozen once (see ``freeze_value``) and the same read-only object is
+    returned to every caller; callers copy only what they need to change.
+
+    When ``hard_ttl_seconds`` is larger than ``ttl_seconds``, entries between
+    the two ages are returned immediately while a background refresh runs
+    (stale-while-revalidate). A refresh that raises keeps the old value in
+    place until the hard TTL (stale-if-error).
+
+    ``persist=True`` also keeps results in the shared L2 tier (see
+    ``flix_stream.persistent_cache``) until the hard TTL, so other worker
+    processes and restarts can reuse them.
+
+    ``budget`` (a CacheBudget) additionally evicts by estimated bytes across
+    every cache sharing it; ``maxsize`` still caps the entry count.
+
+    ``should_cache(result)`` returning false skips storing that result, e.g.
+    for degraded answers that should be recomputed on the next call.
+    ``replace_if(cached, result)`` returning false keeps the cached value when
+    a reload comes back with ``result``, e.g. an empty answer for a known key.
+    """
     ttl = int(ttl_seconds or 0)
-    limit = max(1, int(maxsize or 1))
+    hard_ttl = max(ttl, int(hard_ttl_seconds or 0))
 
     def decorator(func):
-        cache_store = OrderedDict()
-        lock = RLock()
-
-        @wraps(func)
-        def wrapper(*args, **kwargs):
-            if ttl <= 0:
+        if ttl <= 0:
+            @wraps(func)
+            def passthrough(*args, **kwargs):
                 return func(*args, **kwargs)
 
-            key = _make_key(args, kwargs)
-            now = time.monotonic()
+            passthrough.cache_get = lambda *args, **kwargs: None
+            passthrough.cache_set = lambda result, *args, **kwargs: result
+            passthrough.cache_refresh = passthrough
+            passthrough.cache_ttl_left = lambda *args, **kwargs: None
+            passthrough.cache_clear = lambda: None
+            return passthrough
+        store = TTLStore(hard_ttl, maxsize, shards=shards, budget=budget)
+        return _memoize(
+            func,
+            store,
+            immutable=immutable,
+            copy_results=not immutable,
+            fresh_ttl=ttl,
+            persist_ttl=hard_ttl if persist else None,
+            should_cache=should_cache,
+            replace_if=replace_if,
+        )
 
-            with lock:
-                expired_keys = [k for k, (expires_at, _) in cache_store.items() if expires_at <= now]
-                for expired_key in expired_keys:
-                    cache_store.pop(expired_key, None)
+    return decorator
 
-                cached = cache_store.get(key)
-                if cached is not None:
-                    expires_at, value = cached
-                    if expires_at > now:
-                        cache_store.move_to_end(key)
-                        return copy.deepcopy(value)
-                    cache_store.pop(key, None)
 
-            result = func(*args, **kwargs)
-            result_snapshot = copy.deepcopy(result)
+def lru_cache(maxsize=128, shards=CACHE_SHARDS, persist_ttl_seconds=None, persist_store=None):
+    """Drop-in for ``functools.lru_cache(maxsize=...)`` with single-flight misses.
 
-            with lock:
-                cache_store[key] = (time.monotonic() + ttl, result_snapshot)
-                cache_store.move_to_end(key)
-                while len(cache_store) > limit:
-                    cache_store.popitem(last=False)
+    Results never expire and are returned as-is, matching functools semantics.
+    ``persist_ttl_seconds`` opts into a SQLite tier (``persist_store``, the
+    shared L2 tier by default); empty results (None, empty containers, all-None
+    tuples) are not persisted since resolvers also return them when an
+    upstream call fails.
+    """
 
-            return copy.deepcopy(result_snapshot)
+    def decorator(func):
+        return _memoize(
+            func,
+            TTLStore(None, maxsize, shards=shards),
+            persist_ttl=persist_ttl_seconds,
+            persist_empty=False,
+            persist_store=persist_store,
+        )
 
-        def cache_clear():
-            with lock:
-                cache_store.clear()
+    return decorator
 
-        wrapper.cache_clear = cache_clear
-        return wrapper
 
-    return decorator
+# One byte budget shared by every provider stream cache (PROVIDER_CACHE_MAX_BYTES).
+PROVIDER_CACHE_BUDGET = CacheBudget(PROVIDER_CACHE_MAX_BYTES)
+
+
+def cache_stats():
+    """cache_info() of every ttl_cache/lru_cache-decorated function, keyed by qualified name."""
+    return {name: wrapper.cache_info() for name, wrapper in sorted(_REGISTRY.items())}
+
+
+def single_flight_stats():
+    """Per-function counts of upstream calls made (leaders) and calls coalesced onto them."""
+    return {name: wrapper.single_flight_stats() for name, wrapper in sorted(_REGISTRY.items())}
@@ -0,0 +1,67 @@
+"""Export/import SQLite cache snapshots so new nodes and blue/green deploys start warm.
+
+    python -m flix_stream.cache_snapshot export ids.jsonl
+    python -m flix_stream.cache_snapshot import ids.jsonl
+    python -m flix_stream.cache_snapshot export - --store l2 --namespace flix_stream.tmdb.
+"""
+import argparse
+import json
+import sys
+
+from flix_stream.persistent_cache import get_id_store, get_persistent_store
+
+
+_STORES = {
+    "ids": (get_id_store, "ID_CACHE_PATH"),
+    "l2": (get_persistent_store, "CACHE_L2_PATH"),
+}
+
+
+def export_snapshot(store, out, namespace_prefix=""):
+    count = 0
+    for row in store.export_rows(namespace_prefix):
+        out.write(json.dumps(row, separators=(",", ":")) + "\n")
+        count += 1
+    return count
+
+
+def import_snapshot(store, src):
+    rows = (json.loads(line) for line in src if line.strip())
+    return store.import_rows(rows)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m flix_stream.cache_snapshot",
+        description="Export or import cached resolver results as JSON lines.",
+    )
+    parser.add_argument("action", choices=["export", "import"])
+    parser.add_argument("path", help="snapshot file, or '-' for stdout/stdin")
+    parser.add_argument("--store", choices=sorted(_STORES), default="ids", help="cache database (default: ids)")
+    parser.add_argument("--namespace", default="", help="export only namespaces starting with this prefix")
+    args = parser.parse_args(argv)
+
+    open_store, env_name = _STORES[args.store]
+    store = open_store()
+    if store is None:
+        parser.error(f"the {args.store} cache is disabled; set {env_name}")
+
+    if args.action == "export":
+        if args.path == "-":
+            count = export_snapshot(store, sys.stdout, args.namespace)
+        else:
+            with open(args.path, "w", encoding="utf-8") as out:
+                count = export_snapshot(store, out, args.namespace)
+        print(f"Exported {count} entries from {store.path}", file=sys.stderr)
+    else:
+        if args.path == "-":
+            count = import_snapshot(store, sys.stdin)
+        else:
+            with open(args.path, "r", encoding="utf-8") as src:
+                count = import_snapshot(store, src)
+        print(f"Imported {count} entries into {store.path}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,8 +6,7 @@ import os
 import random
 import shutil
 import subprocess
-import requests
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import threading
 from Crypto.Cipher import AES
 from Crypto.Util.Padding import unpad
 
@@ -17,11 +16,129 @@ try:
 except ImportError:
     WASM_AVAILABLE = False
 
-from flix_stream.config import COMMON_HEADERS
-from flix_stream.cache import ttl_cache
+from flix_stream import http_client
+from flix_stream.config import (
+    CINEBY_WASM_MAX_MEMORY_MB,
+    CINEBY_WASM_MAX_USES,
+    CINEBY_WASM_POOL_SIZE,
+    COMMON_HEADERS,
+)
+from flix_stream.availability import ProviderError
+from flix_stream.cache import PROVIDER_CACHE_BUDGET, ttl_cache
+from flix_stream.registry import get_provider, provider_plan
+from flix_stream.scheduler import submit
 
 logger = logging.getLogger(__name__)
 
+CINEBY = get_provider("cineby")
+
+
+class WasmDecryptor:
+    """One instantiated decrypt module in its own Store; used by one thread at a time.
+
+    ``decrypt`` consumes the module's verification, so the instance re-verifies
+    right after each call (with the hash string pinned once) and is always
+    ready for the next one.
+    """
+
+    def __init__(self, engine, module, wasm_hash):
+        self.store = Store(engine)
+        # Use deterministic seed to match our FIXED_WASM_HASH
+        seed_func = Func(self.store, FuncType([], [ValType.f64()]), lambda: 0.5)
+        abort_func = Func(self.store, FuncType([ValType.i32(), ValType.i32(), ValType.i32(), ValType.i32()], []), lambda a,b,c,d: None)
+        exports = Instance(self.store, module, [seed_func, abort_func]).exports(self.store)
+        self._memory = exports["memory"]
+        self._new = exports["__new"]
+        self._verify = exports["verify"]
+        self._decrypt = exports["decrypt"]
+        self._hash_ptr = self._write_str(wasm_hash)
+        exports["__pin"](self.store, self._hash_ptr)
+        self.uses = 0
+        self._verify(self.store, self._hash_ptr)
+
+    def _write_str(self, s):
+        b = s.encode("utf-16-le")
+        ptr = self._new(self.store, len(b), 2)
+        self._memory.write(self.store, b, ptr)
+        return ptr
+
+    def _read_str(self, ptr):
+        if not ptr: return None
+        byte_len = int.from_bytes(self._memory.read(self.store, ptr - 4, ptr), "little")
+        return self._memory.read(self.store, ptr, ptr + byte_len).decode("utf-16-le")
+
+    def decrypt(self, hex_response, tmdb_id):
+        self.uses += 1
+        res_ptr = self._decrypt(self.store, self._write_str(hex_response), float(tmdb_id))
+        result = self._read_str(res_ptr)
+        self._verify(self.store, self._hash_ptr)
+        return result
+
+    def memory_size(self):
+        return self._memory.data_len(self.store)
+
+
+class WasmPool:
+    """Thread-safe pool of ready decryptors built by ``factory``.
+
+    Idle instances are reused; an instance is dropped instead of returned when
+    it failed, served ``max_uses`` calls or grew past ``max_memory`` bytes, or
+    when ``max_idle`` instances are already waiting.
+    """
+
+    def __init__(self, factory, max_idle, max_uses, max_memory):
+        self._factory = factory
+        self.max_idle = max(0, max_idle)
+        self.max_uses = max(1, max_uses)
+        self.max_memory = max_memory
+        self._lock = threading.Lock()
+        self._idle = []
+        self._stats = {"created": 0, "reused": 0, "recycled": 0, "discarded": 0, "in_use": 0}
+
+    def acquire(self):
+        with self._lock:
+            if self._idle:
+                self._stats["reused"] += 1
+                self._stats["in_use"] += 1
+                return self._idle.pop()
+        # Instantiating takes milliseconds; do it outside the lock.
+        instance = self._factory()
+        with self._lock:
+            self._stats["created"] += 1
+            self._stats["in_use"] += 1
+        return instance
+
+    def release(self, instance, healthy=True):
+        worn = healthy and (
+            instance.uses >= self.max_uses or bool(self.max_memory and instance.memory_size() > self.max_memory)
+        )
+        with self._lock:
+            self._stats["in_use"] -= 1
+            if not healthy:
+                self._stats["discarded"] += 1
+            elif worn:
+                self._stats["recycled"] += 1
+            elif len(self._idle) < self.max_idle:
+                self._idle.append(instance)
+            else:
+                self._stats["discarded"] += 1
+
+    def run(self, func, *args):
+        """Call ``func(instance, *args)`` on a pooled instance; one that raises is not reused."""
+        instance = self.acquire()
+        try:
+            result = func(instance, *args)
+        except BaseException:
+            self.release(instance, healthy=False)
+            raise
+        self.release(instance)
+        return result
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, idle=len(self._idle))
+
+
 class CinebyProvider:
     BASE_URL = "https://api.videasy.net"
     # Pre-calculated hash for WASM seed 0.5
@@ -30,6 +147,8 @@ class CinebyProvider:
 
     _wasm_engine = None
     _wasm_module = None
+    _wasm_pool = None
+    _wasm_lock = threading.Lock()
 
     @classmethod
     def _resolve_module_path(cls):
@@ -49,15 +168,29 @@ class CinebyProvider:
         if not WASM_AVAILABLE:
             return None, None
         if cls._wasm_engine is None:
-            try:
-                cls._wasm_engine = Engine()
-                module_path = cls._resolve_module_path()
-                if module_path:
-                    cls._wasm_module = Module.from_file(cls._wasm_engine, module_path)
-            except Exception as e:
-                logger.error("Failed to load WASM engine: %s", e)
+            with cls._wasm_lock:
+                # Concurrent first requests compile the module once.
+                if cls._wasm_engine is None:
+                    try:
+                        engine = Engine()
+                        module_path = cls._resolve_module_path()
+                        if module_path:
+                            cls._wasm_module = Module.from_file(engine, module_path)
+                            cls._wasm_pool = WasmPool(
+                                lambda: WasmDecryptor(engine, cls._wasm_module, cls.FIXED_WASM_HASH),
+                                CINEBY_WASM_POOL_SIZE,
+                                CINEBY_WASM_MAX_USES,
+                                CINEBY_WASM_MAX_MEMORY_MB * 1024 * 1024,
+                            )
+                        cls._wasm_engine = engine
+                    except Exception as e:
+                        logger.error("Failed to load WASM engine: %s", e)
         return cls._wasm_engine, cls._wasm_module
 
+    @classmethod
+    def wasm_pool_stats(cls):
+        return cls._wasm_pool.stats() if cls._wasm_pool is not None else None
+
     @staticmethod
     def derive_key_and_iv(passphrase, salt):
         """OpenSSL compatible key derivation (MD5 KDF)."""
@@ -84,13 +217,13 @@ class CinebyProvider:
         return None
 
     @staticmethod
-    @ttl_cache(ttl_seconds=3600)
+    @ttl_cache(immutable=True, persist=True, budget=PROVIDER_CACHE_BUDGET, **CINEBY.cache_window)
     def fetch_streams(tmdb_id, imdb_id=None, media_type="movie", season=1, episode=1):
         engine, module = CinebyProvider._get_wasm()
         has_node_runtime = shutil.which("node") is not None
         if not module and not has_node_runtime:
             logger.error("Cineby provider unavailable: WASM runtime missing (install wasmtime or provide node).")
-            return []
+            raise ProviderError("Cineby WASM runtime missing")
 
         # Sub-providers to query on the videasy API
         sub_providers = ["moviebox", "hdmovie", "myflixerzupcloud", "vidsrc"]
@@ -110,10 +243,16 @@ class CinebyProvider:
         }
 
         def _fetch_from_sub(sub):
+            # Returns None when the sub-provider failed rather than answered empty.
             url = f"{CinebyProvider.BASE_URL}/{sub}/sources-with-title"
             try:
-                r = requests.get(url, params=params, headers=headers, timeout=8)
-                if r.status_code != 200 or r.text.startswith("{") or len(r.text) < 100:
+                r = http_client.resilient_get(url, params=params, headers=headers, timeout=CINEBY.timeout, breaker=f"cineby/{sub}")
+                if r.status_code == 404:
+                    return []
+                if r.status_code != 200:
+                    # Throttled, blocked or failing: not an answer about this title.
+                    return None
+                if r.text.startswith("{") or len(r.text) < 100:
                     return []
 
                 # Step 1: WASM Decrypt
@@ -121,7 +260,7 @@ class CinebyProvider:
                 if not b64_ciphertext and has_node_runtime:
                     b64_ciphertext = CinebyProvider._run_node_wasm_decrypt(r.text, tmdb_id)
                 if not b64_ciphertext:
-                    return []
+                    return None
 
                 # Step 2: AES Decrypt (passphrase is empty string based on reverse engineering)
                 final_json_str = CinebyProvider.aes_decrypt(b64_ciphertext, "")
@@ -141,54 +280,34 @@ class CinebyProvider:
                     return results
             except Exception as e:
                 logger.debug("Error fetching from Cineby sub-provider %s: %s", sub, e)
+                return None
             return []
 
         all_results = []
-        with ThreadPoolExecutor(max_workers=len(sub_providers)) as executor:
-            future_to_sub = {executor.submit(_fetch_from_sub, sub): sub for sub in sub_providers}
-            for future in as_completed(future_to_sub):
-                try:
-                    all_results.extend(future.result())
-                except Exception as e:
-                    logger.error("Cineby future failed: %s", e)
-
+        failed_subs = []
+        tasks = [(sub, submit(_fetch_from_sub, sub, provider="cineby")) for sub in sub_providers]
+        for sub, task in tasks:
+            try:
+                results = task.result()
+            except Exception as e:
+                logger.error("Cineby task failed: %s", e)
+                results = None
+            if results is None:
+                failed_subs.append(sub)
+                continue
+            all_results.extend(results)
+
+        if not all_results and failed_subs:
+            raise ProviderError(f"Cineby sub-providers failed: {', '.join(sorted(failed_subs))}")
         return all_results
 
     @staticmethod
     def _run_wasm_decrypt(engine, module, hex_response, tmdb_id):
-        if not engine or not module:
+        pool = CinebyProvider._wasm_pool
+        if not engine or not module or pool is None:
             return None
         try:
-            store = Store(engine)
-            # Use deterministic seed to match our FIXED_WASM_HASH
-            seed_func = Func(store, FuncType([], [ValType.f64()]), lambda: 0.5)
-            abort_func = Func(store, FuncType([ValType.i32(), ValType.i32(), ValType.i32(), ValType.i32()], []), lambda a,b,c,d: None)
-
-            instance = Instance(store, module, [seed_func, abort_func])
-            exports = instance.exports(store)
-
-            memory = exports["memory"]
-            new_func = exports["__new"]
-            verify_func = exports["verify"]
-            decrypt_func = exports["decrypt"]
-
-            def write_str(s):
-                b = s.encode("utf-16-le")
-                ptr = new_func(store, len(b), 2)
-                memory.write(store, b, ptr)
-                return ptr
-
-            def read_str(ptr):
-                if not ptr: return None
-                byte_len = int.from_bytes(memory.read(store, ptr - 4, ptr), "little")
-                return memory.read(store, ptr, ptr + byte_len).decode("utf-16-le")
-
-            # Initialize/Verify WASM
-            verify_func(store, write_str(CinebyProvider.FIXED_WASM_HASH))
-
-            # Decrypt response
-            res_ptr = decrypt_func(store, write_str(hex_response), float(tmdb_id))
-            return read_str(res_ptr)
+            return pool.run(WasmDecryptor.decrypt, hex_response, tmdb_id)
         except Exception as e:
             logger.error("WASM decryption failed: %s", e)
             return None
@@ -267,3 +386,9 @@ main().catch((err) => {
         except Exception as e:
             logger.debug("Node WASM fallback error: %s", e)
             return None
+
+
+@provider_plan("cineby")
+def plan_cineby(query):
+    media_type = "tv" if query.content_type == "series" else "movie"
+    return [(CinebyProvider.fetch_streams, query.title_id, query.imdb_id, media_type, query.season or 1, query.episode or 1)]
@@ -66,16 +66,163 @@ ANIWAYS_COMMON_HEADERS = {
     "Referer": "https://aniways.xyz/",
     "Origin": "https://aniways.xyz",
 }
+# Aniways pipeline stages are cached separately (seconds): the episode number -> id index per
+# anime (reused stale for a day while it refreshes) and the server list per episode. The final
+# sources use the aniways provider cache window.
+ANIWAYS_EPISODES_CACHE_TTL = int(os.environ.get("ANIWAYS_EPISODES_CACHE_TTL", "3600"))
+ANIWAYS_EPISODES_CACHE_HARD_TTL = int(os.environ.get("ANIWAYS_EPISODES_CACHE_HARD_TTL", "86400"))
+ANIWAYS_EPISODES_REFRESH_MIN_AGE = int(os.environ.get("ANIWAYS_EPISODES_REFRESH_MIN_AGE", "300"))
+ANIWAYS_SERVERS_CACHE_TTL = int(os.environ.get("ANIWAYS_SERVERS_CACHE_TTL", "1800"))
+# Seconds the anime subtitle lookup waits for the Wikidata external-id answer before it starts
+# searching TMDB by title as well; an external-id match still wins when it arrives.
+ANIME_EXTERNAL_ID_WAIT = float(os.environ.get("ANIME_EXTERNAL_ID_WAIT", "2"))
 KITSU_API_BASE = "https://kitsu.io/api/edge"
 WYZIE_API_BASE = "https://sub.wyzie.ru"
+# Wyzie search results are kept this long (seconds); 0 disables the cache.
+WYZIE_CACHE_TTL = int(os.environ.get("WYZIE_CACHE_TTL", "3600"))
 WYZIE_COMMON_HEADERS = {
     "User-Agent": COMMON_HEADERS["User-Agent"],
     "Referer": f"{WYZIE_API_BASE}/",
     "Origin": WYZIE_API_BASE,
 }
 
+# Circuit breakers per upstream (flix_stream.breaker): trip after BREAKER_FAILURES consecutive
+# errors or BREAKER_ERROR_RATE over the last BREAKER_WINDOW calls, probe again after BREAKER_COOLDOWN.
+BREAKER_FAILURES = int(os.environ.get("BREAKER_FAILURES", "5"))
+BREAKER_ERROR_RATE = float(os.environ.get("BREAKER_ERROR_RATE", "0.5"))
+BREAKER_WINDOW = int(os.environ.get("BREAKER_WINDOW", "20"))
+BREAKER_COOLDOWN = float(os.environ.get("BREAKER_COOLDOWN", "30"))
+# Upstream timeouts become ADAPTIVE_TIMEOUT_FACTOR x observed p95 latency (never below the minimum).
+ADAPTIVE_TIMEOUT_FACTOR = float(os.environ.get("ADAPTIVE_TIMEOUT_FACTOR", "2"))
+ADAPTIVE_TIMEOUT_MIN = float(os.environ.get("ADAPTIVE_TIMEOUT_MIN", "1.5"))
+
+# Idempotent provider GETs (http_client.resilient_get): retries of 5xx/connection resets with
+# jittered exponential backoff from RETRY_BACKOFF seconds, and a hedged second attempt once the
+# first has been slower than the upstream's p90 latency.
+RETRY_ATTEMPTS = int(os.environ.get("RETRY_ATTEMPTS", "2"))
+RETRY_BACKOFF = float(os.environ.get("RETRY_BACKOFF", "0.2"))
+HEDGE_REQUESTS = os.environ.get("HEDGE_REQUESTS", "1").strip().lower() not in ("0", "false", "no", "off")
+HEDGE_WORKERS = int(os.environ.get("HEDGE_WORKERS", "32"))
+
+# Keep-alive connections kept per upstream host (see flix_stream.http_client).
+HTTP_POOL_MAXSIZE = int(os.environ.get("HTTP_POOL_MAXSIZE", "16"))
+
+
+def _upstream_limits(defaults):
+    """Per-host (requests/second, max concurrency), overridable as UPSTREAM_LIMITS="host=rate:concurrency,..."."""
+    limits = dict(defaults)
+    for entry in os.environ.get("UPSTREAM_LIMITS", "").split(","):
+        host, _, spec = entry.strip().partition("=")
+        rate, _, concurrency = spec.partition(":")
+        if not host or not rate:
+            continue
+        default_concurrency = limits.get(host.lower(), UPSTREAM_DEFAULT_LIMIT)[1]
+        limits[host.lower()] = (max(0.0, float(rate)), max(1, int(concurrency or default_concurrency)))
+    return limits
+
+
+# Every upstream host gets a token bucket (rate 0 = unmetered) and an AIMD concurrency limit
+# that starts at the maximum, halves on 429/503/timeouts and creeps back on success (see
+# flix_stream.rate_limit). Calls over the limit queue for up to UPSTREAM_QUEUE_TIMEOUT seconds
+# (or the request budget); a 429 is resent up to UPSTREAM_THROTTLE_RETRIES times when its
+# Retry-After fits that wait.
+UPSTREAM_DEFAULT_LIMIT = (
+    max(0.0, float(os.environ.get("UPSTREAM_DEFAULT_RATE", "0"))),
+    max(1, int(os.environ.get("UPSTREAM_DEFAULT_CONCURRENCY", "32"))),
+)
+UPSTREAM_LIMITS = _upstream_limits({
+    "api.themoviedb.org": (40.0, 16),
+    "kitsu.io": (10.0, 4),
+    "query.wikidata.org": (2.0, 3),
+    "sub.wyzie.ru": (10.0, 8),
+})
+UPSTREAM_QUEUE_TIMEOUT = float(os.environ.get("UPSTREAM_QUEUE_TIMEOUT", "10"))
+UPSTREAM_THROTTLE_RETRIES = int(os.environ.get("UPSTREAM_THROTTLE_RETRIES", "2"))
+
+# /stream answers after STREAM_DEADLINE seconds with the streams found so far (0 waits
+# for every provider); late providers get STREAM_BACKGROUND_GRACE more seconds to fill the caches.
+STREAM_DEADLINE = float(os.environ.get("STREAM_DEADLINE", "2.5"))
+STREAM_BACKGROUND_GRACE = float(os.environ.get("STREAM_BACKGROUND_GRACE", "10"))
+
+# Process-wide upstream worker pool (see flix_stream.scheduler).
+SCHEDULER_WORKERS = int(os.environ.get("SCHEDULER_WORKERS", "64"))
+SCHEDULER_QUEUE_SIZE = int(os.environ.get("SCHEDULER_QUEUE_SIZE", "1024"))
+
+# After a series/anime /stream request, warm the caches for the next PREFETCH_EPISODES episodes
+# (0 disables) on PREFETCH_WORKERS background threads. Prefetches are skipped while the scheduler
+# has more than PREFETCH_MAX_LOAD running+queued tasks per worker, and one client may have at most
+# PREFETCH_MAX_PER_CLIENT of them queued or running. Clients are told apart by their address;
+# X-Forwarded-For is only believed from the comma-separated TRUSTED_PROXIES addresses.
+PREFETCH_EPISODES = int(os.environ.get("PREFETCH_EPISODES", "0"))
+PREFETCH_WORKERS = int(os.environ.get("PREFETCH_WORKERS", "2"))
+PREFETCH_QUEUE_SIZE = int(os.environ.get("PREFETCH_QUEUE_SIZE", "64"))
+PREFETCH_MAX_LOAD = float(os.environ.get("PREFETCH_MAX_LOAD", "0.5"))
+PREFETCH_MAX_PER_CLIENT = int(os.environ.get("PREFETCH_MAX_PER_CLIENT", "4"))
+TRUSTED_PROXIES = frozenset(
+    address.strip() for address in os.environ.get("TRUSTED_PROXIES", "").split(",") if address.strip()
+)
+
+# Popularity warmer: track /stream request frequency in a decaying top-K sketch (WARMER_TRACKED
+# counters, halved every WARMER_HALF_LIFE seconds) and every WARMER_INTERVAL seconds rebuild the
+# responses of the WARMER_TOP_K hottest ids (0 disables) seen at least WARMER_MIN_HITS times that
+# are missing or expire within WARMER_LEAD seconds, at most WARMER_BUDGET per cycle. A cycle stops
+# while the scheduler has more than WARMER_MAX_LOAD tasks per worker or an upstream host is
+# throttled or queueing.
+WARMER_TOP_K = int(os.environ.get("WARMER_TOP_K", "0"))
+WARMER_TRACKED = int(os.environ.get("WARMER_TRACKED", "512"))
+WARMER_HALF_LIFE = float(os.environ.get("WARMER_HALF_LIFE", "600"))
+WARMER_MIN_HITS = float(os.environ.get("WARMER_MIN_HITS", "2"))
+WARMER_INTERVAL = float(os.environ.get("WARMER_INTERVAL", "5"))
+WARMER_LEAD = float(os.environ.get("WARMER_LEAD", "10"))
+WARMER_BUDGET = int(os.environ.get("WARMER_BUDGET", "20"))
+WARMER_MAX_LOAD = float(os.environ.get("WARMER_MAX_LOAD", "0.25"))
+
+
+def _provider_concurrency(provider, default):
+    return max(1, int(os.environ.get(f"{provider.upper()}_CONCURRENCY", default)))
+
+
+# Upstream calls one non-stream upstream may have running at once across all requests;
+# stream providers declare theirs in flix_stream.registry.
+PROVIDER_CONCURRENCY = {
+    "kitsu": _provider_concurrency("kitsu", 4),
+    "wyzie": _provider_concurrency("wyzie", 8),
+}
+
 PROVIDER_CACHE_TTL = int(os.environ.get("PROVIDER_CACHE_TTL", "45"))
+# Stream URLs are signed and short-lived, so results are not served stale unless an operator opts in
+# with a hard TTL above the soft one (0 means "same as the soft TTL").
+PROVIDER_CACHE_HARD_TTL = int(os.environ.get("PROVIDER_CACHE_HARD_TTL", "0"))
 PROVIDER_CACHE_MAXSIZE = int(os.environ.get("PROVIDER_CACHE_MAXSIZE", "2048"))
+# Combined (estimated) byte budget for all provider caches in one process; 0 disables it.
+PROVIDER_CACHE_MAX_BYTES = int(os.environ.get("PROVIDER_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+# Cineby decryption reuses instantiated WASM modules: at most CINEBY_WASM_POOL_SIZE idle instances
+# are kept, and an instance is replaced after CINEBY_WASM_MAX_USES decrypts or once its linear
+# memory exceeds CINEBY_WASM_MAX_MEMORY_MB.
+CINEBY_WASM_POOL_SIZE = int(os.environ.get("CINEBY_WASM_POOL_SIZE", "12"))
+CINEBY_WASM_MAX_USES = int(os.environ.get("CINEBY_WASM_MAX_USES", "1000"))
+CINEBY_WASM_MAX_MEMORY_MB = int(os.environ.get("CINEBY_WASM_MAX_MEMORY_MB", "16"))
+
+# Serialized /stream, /catalog and /meta bodies; 0 disables the response cache.
+RESPONSE_CACHE_TTL = int(os.environ.get("RESPONSE_CACHE_TTL", "30"))
+RESPONSE_CACHE_MAXSIZE = int(os.environ.get("RESPONSE_CACHE_MAXSIZE", "4096"))
+# Byte budget of the response cache alone, kept apart from PROVIDER_CACHE_MAX_BYTES; 0 disables it.
+RESPONSE_CACHE_MAX_BYTES = int(os.environ.get("RESPONSE_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+# Optional SQLite cache tier shared by all worker processes (disabled when the path is empty).
+CACHE_L2_PATH = os.environ.get("CACHE_L2_PATH", "")
+CACHE_L2_MAX_BYTES = int(os.environ.get("CACHE_L2_MAX_BYTES", str(256 * 1024 * 1024)))
+CACHE_L2_COMPACT_INTERVAL = int(os.environ.get("CACHE_L2_COMPACT_INTERVAL", "300"))
+# How long ID/metadata resolver results stay in the L2 tier.
+RESOLVER_CACHE_PERSIST_TTL = int(os.environ.get("RESOLVER_CACHE_PERSIST_TTL", "86400"))
+# Optional durable store for IMDb/TMDB/Kitsu/Aniways/Wikidata id mappings, kept across restarts
+# independently of CACHE_L2_PATH (disabled when the path is empty).
+ID_CACHE_PATH = os.environ.get("ID_CACHE_PATH", "")
+ID_CACHE_TTL = int(os.environ.get("ID_CACHE_TTL", str(30 * 86400)))
+
+# Confirmed-empty provider answers are remembered much longer than stream results.
+PROVIDER_EMPTY_TTL = int(os.environ.get("PROVIDER_EMPTY_TTL", "21600"))
+PROVIDER_EMPTY_MAXSIZE = int(os.environ.get("PROVIDER_EMPTY_MAXSIZE", "50000"))
 
 LANG_MAP = {
     "English": "eng",
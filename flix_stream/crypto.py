@@ -2,48 +2,42 @@ import base64
 import hashlib
 import json
 import logging
-import time
 
-import requests
 from Crypto.Cipher import AES
 from Crypto.Hash import SHA256
 from Crypto.Protocol.KDF import PBKDF2
 from Crypto.Util.Padding import unpad
 
+from flix_stream import http_client
+from flix_stream.cache import ttl_cache
 from flix_stream.config import COMMON_HEADERS, MASTER_KEY
 
 
 logger = logging.getLogger(__name__)
 
-# Simple cache for decryption key.
-_KEY_CACHE = {"key": None, "timestamp": 0}
 
+@ttl_cache(ttl_seconds=3600, maxsize=1, persist=True)
+def _fetch_decryption_key():
+    response = http_client.get("https://core.vidzee.wtf/api-key", headers=COMMON_HEADERS, timeout=10)
+    response.raise_for_status()
+    encrypted_data = base64.b64decode(response.text.strip())
 
-def get_decryption_key():
-    """Fetches and decrypts the current VidZee API key with caching (1 hour)."""
-    now = time.time()
-    if _KEY_CACHE["key"] and (now - _KEY_CACHE["timestamp"] < 3600):
-        return _KEY_CACHE["key"]
-
-    try:
-        response = requests.get("https://core.vidzee.wtf/api-key", headers=COMMON_HEADERS, timeout=10)
-        response.raise_for_status()
-        encrypted_data = base64.b64decode(response.text.strip())
+    if len(encrypted_data) <= 28:
+        raise ValueError("API key payload too short")
 
-        if len(encrypted_data) <= 28:
-            return None
+    iv = encrypted_data[:12]
+    tag = encrypted_data[12:28]
+    ciphertext = encrypted_data[28:]
 
-        iv = encrypted_data[:12]
-        tag = encrypted_data[12:28]
-        ciphertext = encrypted_data[28:]
+    key = hashlib.sha256(MASTER_KEY.encode()).digest()
+    cipher = AES.new(key, AES.MODE_GCM, nonce=iv)
+    return cipher.decrypt_and_verify(ciphertext, tag).decode()
 
-        key = hashlib.sha256(MASTER_KEY.encode()).digest()
-        cipher = AES.new(key, AES.MODE_GCM, nonce=iv)
-        decrypted_key = cipher.decrypt_and_verify(ciphertext, tag).decode()
 
-        _KEY_CACHE["key"] = decrypted_key
-        _KEY_CACHE["timestamp"] = now
-        return decrypted_key
+def get_decryption_key():
+    """Fetches and decrypts the current VidZee API key with caching (1 hour)."""
+    try:
+        return _fetch_decryption_key()
     except Exception as exc:
         logger.error("Failed to get decryption key: %s", exc)
         return None
@@ -0,0 +1,85 @@
+"""Per-request upstream time budget carried in a contextvar.
+
+A budget has two limits: ``respond_by``, after which /stream answers with
+whatever has arrived, and ``finish_by``, after which no upstream call is
+started and running ones time out. Calls still in flight between the two keep
+going in the background and fill the provider caches for the next request.
+
+The scheduler copies the submitting context into every task, so calls made on
+worker threads see the budget of the request that queued them.
+"""
+import contextvars
+import time
+from contextlib import contextmanager
+
+
+class Budget:
+    __slots__ = ("respond_by", "finish_by", "partial")
+
+    def __init__(self, respond_by, finish_by):
+        self.respond_by = respond_by
+        self.finish_by = finish_by
+        # Set when an answer was built before every upstream call finished.
+        self.partial = False
+
+
+_budget = contextvars.ContextVar("upstream_budget", default=None)
+
+
+class DeadlineExceeded(TimeoutError):
+    pass
+
+
+@contextmanager
+def request_budget(respond_in, finish_in=0):
+    """Limit upstream work to ``respond_in`` (+ ``finish_in`` in the background) seconds; 0 disables."""
+    if not respond_in or respond_in <= 0:
+        yield None
+        return
+    now = time.monotonic()
+    budget = Budget(now + respond_in, now + respond_in + max(0, finish_in or 0))
+    outer = _budget.get()
+    if outer is not None:
+        budget = Budget(min(budget.respond_by, outer.respond_by), min(budget.finish_by, outer.finish_by))
+    token = _budget.set(budget)
+    try:
+        yield budget
+    finally:
+        _budget.reset(token)
+
+
+def response_time_left():
+    """Seconds until the current request should respond, or None without a budget."""
+    budget = _budget.get()
+    if budget is None:
+        return None
+    return max(0.0, budget.respond_by - time.monotonic())
+
+
+def time_left():
+    """Seconds of upstream budget left (including the background grace), or None without a budget."""
+    budget = _budget.get()
+    if budget is None:
+        return None
+    return max(0.0, budget.finish_by - time.monotonic())
+
+
+def mark_partial():
+    budget = _budget.get()
+    if budget is not None:
+        budget.partial = True
+
+
+def clamp_timeout(timeout):
+    """Shrink an upstream ``timeout`` to the remaining budget; raises DeadlineExceeded once it is spent."""
+    budget = _budget.get()
+    if budget is None:
+        return timeout
+    left = budget.finish_by - time.monotonic()
+    if left <= 0:
+        raise DeadlineExceeded("upstream time budget exhausted")
+    if timeout is None:
+        return left
+    if isinstance(timeout, tuple):
+        return tuple(left if part is None else min(part, left) for part in timeout)
+    return min(timeout, left)
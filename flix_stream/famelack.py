@@ -3,10 +3,10 @@ import io
 import json
 import logging
 import re
-from functools import lru_cache
 from urllib.parse import quote
 
-import requests
+from flix_stream import http_client
+from flix_stream.cache import lru_cache
 
 logger = logging.getLogger(__name__)
 
@@ -14,10 +14,10 @@ FAMELACK_BASE_URL = "https://raw.githubusercontent.com/famelack/famelack-channel
 METADATA_URL = f"{FAMELACK_BASE_URL}/countries_metadata.json"
 CACHE_TTL = 3600  # 1 hour
 
-@lru_cache(maxsize=1)
+@lru_cache(maxsize=1, persist_ttl_seconds=CACHE_TTL)
 def get_famelack_countries():
     try:
-        response = requests.get(METADATA_URL, timeout=10)
+        response = http_client.get(METADATA_URL, timeout=10)
         if response.status_code != 200:
             logger.error(f"Failed to fetch metadata: {response.status_code}")
             return {}
@@ -33,14 +33,14 @@ def get_famelack_countries():
         logger.error(f"Error fetching famelack countries: {e}")
         return {}
 
-@lru_cache(maxsize=20)
+@lru_cache(maxsize=20, persist_ttl_seconds=CACHE_TTL)
 def fetch_famelack_country(code):
     code = code.lower()
     url = f"{FAMELACK_BASE_URL}/countries/{code}.json"
     try:
-        response = requests.get(url, timeout=10)
+        response = http_client.get(url, timeout=10)
         if response.status_code != 200:
-            response = requests.get(f"{FAMELACK_BASE_URL}/countries/{code.upper()}.json", timeout=10)
+            response = http_client.get(f"{FAMELACK_BASE_URL}/countries/{code.upper()}.json", timeout=10)
             if response.status_code != 200:
                 logger.error(f"Failed to fetch country {code}: {response.status_code}")
                 return []
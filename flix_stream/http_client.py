@@ -0,0 +1,316 @@
+"""Shared HTTP client: one pooled, keep-alive requests.Session per upstream host."""
+import contextvars
+import http.cookiejar
+import logging
+import queue
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import requests
+
+from flix_stream.breaker import CircuitOpenError, get_breaker
+from flix_stream.config import (
+    HEDGE_REQUESTS,
+    HEDGE_WORKERS,
+    HTTP_POOL_MAXSIZE,
+    RETRY_ATTEMPTS,
+    RETRY_BACKOFF,
+    UPSTREAM_QUEUE_TIMEOUT,
+    UPSTREAM_THROTTLE_RETRIES,
+)
+from flix_stream.deadline import DeadlineExceeded, clamp_timeout, time_left
+from flix_stream.rate_limit import (
+    CONGESTED,
+    DEFAULT_RETRY_AFTER,
+    FAILED,
+    OK,
+    QueueTimeout,
+    limiter_for,
+    parse_retry_after,
+)
+
+
+logger = logging.getLogger(__name__)
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def _origin(url):
+    parts = urlsplit(str(url))
+    return f"{parts.scheme.lower()}://{parts.netloc.lower()}"
+
+
+def _new_session():
+    session = requests.Session()
+    # Upstream calls are independent; never replay cookies one response set on later calls.
+    session.cookies.set_policy(http.cookiejar.DefaultCookiePolicy(allowed_domains=[]))
+    adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=HTTP_POOL_MAXSIZE)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def session_for(url):
+    """Return the shared Session for ``url``'s host, creating it on first use."""
+    origin = _origin(url)
+    session = _sessions.get(origin)
+    if session is None:
+        with _sessions_lock:
+            session = _sessions.get(origin)
+            if session is None:
+                session = _sessions[origin] = _new_session()
+    return session
+
+
+def _queue_timeout():
+    left = time_left()
+    return UPSTREAM_QUEUE_TIMEOUT if left is None else min(left, UPSTREAM_QUEUE_TIMEOUT)
+
+
+class _Unguarded:
+    """Breaker stand-in for calls whose outcome the caller accounts for itself."""
+
+    def allow(self):
+        return True
+
+    def release(self):
+        pass
+
+    def record(self, success, latency=None):
+        pass
+
+    def timeout(self, default):
+        return default
+
+
+_UNGUARDED = _Unguarded()
+
+
+def _send(circuit, limiter, method, url, kwargs):
+    if not circuit.allow():
+        raise CircuitOpenError(f"circuit open for {circuit.name}")
+    try:
+        started = limiter.acquire(_queue_timeout())
+    except QueueTimeout:
+        circuit.release()
+        raise
+    wanted = circuit.timeout(kwargs.get("timeout"))
+    try:
+        timeout = clamp_timeout(wanted)
+    except DeadlineExceeded:
+        circuit.release()
+        limiter.release(started, FAILED)
+        raise
+    sent = time.perf_counter()
+    try:
+        response = session_for(url).request(method, url, **dict(kwargs, timeout=timeout))
+    except requests.exceptions.Timeout:
+        if timeout == wanted:
+            circuit.record(False)
+            limiter.release(started, CONGESTED)
+        else:
+            # Cut short by the request budget, not by the upstream's own latency.
+            circuit.release()
+            limiter.release(started, FAILED)
+        raise
+    except Exception:
+        circuit.record(False)
+        limiter.release(started, FAILED)
+        raise
+
+    status = response.status_code
+    if status == 429:
+        # Throttling is handled by pausing the host, not by tripping its breaker.
+        circuit.release()
+        retry_after = parse_retry_after(response.headers.get("Retry-After"))
+        limiter.release(started, CONGESTED, DEFAULT_RETRY_AFTER if retry_after is None else retry_after)
+    elif status >= 500:
+        circuit.record(False)
+        if status == 503:
+            limiter.release(started, CONGESTED, parse_retry_after(response.headers.get("Retry-After")))
+        else:
+            limiter.release(started, FAILED)
+    else:
+        circuit.record(True, time.perf_counter() - sent)
+        limiter.release(started, OK)
+    return response
+
+
+def request(method, url, breaker=None, **kwargs):
+    """Send through the host's pooled session, guarded by a circuit breaker and the host limiter.
+
+    ``breaker`` names the upstream (defaults to the host); ``breaker=False``
+    sends without one, for callers that judge the outcome themselves. The call first
+    queues for the host's limiter, then ``timeout`` is shrunk to the
+    upstream's observed latency and to the current request budget. A 429 is
+    sent again once the host's Retry-After has passed, if that fits the
+    allowed queue wait. Raises CircuitOpenError without sending while the
+    breaker is open and QueueTimeout when no slot freed up in time.
+    """
+    circuit = _UNGUARDED if breaker is False else get_breaker(breaker or _origin(url))
+    limiter = limiter_for(url)
+    attempts = 0
+    while True:
+        response = _send(circuit, limiter, method, url, kwargs)
+        attempts += 1
+        if response.status_code != 429:
+            return response
+        pause = limiter.paused_for()
+        if attempts > UPSTREAM_THROTTLE_RETRIES or pause >= _queue_timeout():
+            logger.warning("%s throttled %s %s (429) after %d attempt(s); paused for %.1fs", limiter.host, method, url, attempts, pause)
+            return response
+        logger.info("%s throttled %s %s (429); resending in %.1fs", limiter.host, method, url, pause)
+
+
+def get(url, **kwargs):
+    """Drop-in for ``requests.get`` that reuses pooled connections to the host."""
+    return request("GET", url, **kwargs)
+
+
+RETRY_STATUSES = frozenset({500, 502, 503, 504})
+
+_hedge_executor = None
+_hedge_executor_lock = threading.Lock()
+_hedge_slots = threading.BoundedSemaphore(max(2, HEDGE_WORKERS))
+_policy_stats = {}
+_policy_stats_lock = threading.Lock()
+
+
+def _count(name, counter):
+    with _policy_stats_lock:
+        stats = _policy_stats.get(name)
+        if stats is None:
+            stats = _policy_stats[name] = {"retries": 0, "hedges_fired": 0, "hedges_won": 0}
+        stats[counter] += 1
+
+
+def _submit_attempt(results, tag, url, breaker, kwargs):
+    global _hedge_executor
+    if _hedge_executor is None:
+        with _hedge_executor_lock:
+            if _hedge_executor is None:
+                _hedge_executor = ThreadPoolExecutor(max_workers=max(2, HEDGE_WORKERS), thread_name_prefix="http-hedge")
+
+    def _attempt():
+        try:
+            results.put((tag, request("GET", url, breaker=breaker, **kwargs), None))
+        except Exception as exc:
+            results.put((tag, None, exc))
+        finally:
+            _hedge_slots.release()
+
+    _hedge_executor.submit(contextvars.copy_context().run, _attempt)
+
+
+def _failed(outcome):
+    _, response, error = outcome
+    return error is not None or response.status_code in RETRY_STATUSES
+
+
+def _hedged_get(url, breaker, kwargs):
+    name = breaker or _origin(url)
+    delay = get_breaker(name).latency_percentile(0.90) if HEDGE_REQUESTS else None
+    left = time_left()
+    if delay is None or (left is not None and left <= delay) or not _hedge_slots.acquire(blocking=False):
+        return request("GET", url, breaker=breaker, **kwargs)
+
+    results = queue.SimpleQueue()
+    _submit_attempt(results, "primary", url, breaker, kwargs)
+    outstanding = 1
+    try:
+        outcome = results.get(timeout=delay)
+    except queue.Empty:
+        outcome = None
+        if _hedge_slots.acquire(blocking=False):
+            _submit_attempt(results, "hedge", url, breaker, kwargs)
+            outstanding += 1
+            _count(name, "hedges_fired")
+    if outcome is None:
+        outcome = results.get()
+    outstanding -= 1
+    if outstanding and _failed(outcome):
+        # The other attempt may still succeed.
+        outcome = results.get()
+    tag, response, error = outcome
+    if tag == "hedge" and not _failed(outcome):
+        _count(name, "hedges_won")
+    if error is not None:
+        raise error
+    return response
+
+
+def _backoff(retry):
+    # Full jitter: uniform in [0, base * 2^(retry - 1)].
+    return random.uniform(0, RETRY_BACKOFF * (2 ** (retry - 1)))
+
+
+def resilient_get(url, breaker=None, **kwargs):
+    """GET for idempotent upstream reads.
+
+    Sends a hedged second attempt when the first has not answered within the
+    upstream's p90 latency, and retries 5xx answers and connection failures
+    with jittered backoff while the request budget still has room. Read
+    timeouts, open breakers and an exhausted budget are not retried.
+    """
+    retry = 0
+    while True:
+        response = error = None
+        try:
+            response = _hedged_get(url, breaker, kwargs)
+        except (CircuitOpenError, DeadlineExceeded, requests.exceptions.Timeout):
+            raise
+        except requests.exceptions.ConnectionError as exc:
+            error = exc
+        if error is None and response.status_code not in RETRY_STATUSES:
+            return response
+
+        retry += 1
+        pause = _backoff(retry)
+        left = time_left()
+        if retry > RETRY_ATTEMPTS or (left is not None and left <= pause):
+            if error is not None:
+                raise error
+            return response
+        _count(breaker or _origin(url), "retries")
+        logger.debug("Retrying %s in %.2fs (%s)", url, pause, error or response.status_code)
+        time.sleep(pause)
+
+
+def resilience_stats():
+    """Retries, hedges fired and hedges that answered first, per upstream."""
+    with _policy_stats_lock:
+        return {name: dict(stats) for name, stats in sorted(_policy_stats.items())}
+
+
+def _pool_counters(session):
+    connections = requests_sent = 0
+    seen = set()
+    for adapter in session.adapters.values():
+        if id(adapter) in seen:
+            continue
+        seen.add(id(adapter))
+        pools = adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            connections += pool.num_connections
+            requests_sent += pool.num_requests
+    return connections, requests_sent
+
+
+def http_stats():
+    """Per-host request and new-connection counts; ``reuse_rate`` is the share of requests sent on a kept-alive connection."""
+    stats = {}
+    for origin, session in sorted(_sessions.items()):
+        connections, requests_sent = _pool_counters(session)
+        stats[origin] = {
+            "requests": requests_sent,
+            "connections": connections,
+            "reuse_rate": round(1 - connections / requests_sent, 4) if requests_sent else 0.0,
+        }
+    return stats
@@ -26,17 +26,3 @@ def normalize_episode_part(value):
         return str(int(match.group(0)))
     return None
 
-
-def provider_rank(stream_obj):
-    name = str(stream_obj.get("name", "")).lower()
-    if name.startswith("vidzee"):
-        return 0
-    if name.startswith("cineby"):
-        return 1
-    if name.startswith("autoembed"):
-        return 2
-    if name.startswith("vixsrc"):
-        return 3
-    if name.startswith("aniways"):
-        return 4
-    return 5
@@ -0,0 +1,237 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from flix_stream.config import CACHE_L2_COMPACT_INTERVAL, CACHE_L2_MAX_BYTES, CACHE_L2_PATH, ID_CACHE_PATH
+
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS cache_entries ("
+    " namespace TEXT NOT NULL,"
+    " key TEXT NOT NULL,"
+    " value TEXT NOT NULL,"
+    " fresh_until REAL NOT NULL,"
+    " expires_at REAL NOT NULL,"
+    " size INTEGER NOT NULL,"
+    " updated_at REAL NOT NULL,"
+    " PRIMARY KEY (namespace, key)"
+    ") WITHOUT ROWID",
+    "CREATE INDEX IF NOT EXISTS cache_entries_expires_at ON cache_entries (expires_at)",
+    "CREATE INDEX IF NOT EXISTS cache_entries_updated_at ON cache_entries (updated_at)",
+)
+
+
+def _hash_key(key):
+    return hashlib.sha1(repr(key).encode("utf-8")).hexdigest()
+
+
+class SQLiteCache:
+    """Second cache tier in a local SQLite file shared by every worker process.
+
+    Values are stored as JSON with wall-clock expiry. All errors are logged and
+    treated as misses so a broken or locked database never fails a request.
+    """
+
+    def __init__(self, path, max_bytes=CACHE_L2_MAX_BYTES, compact_interval=CACHE_L2_COMPACT_INTERVAL):
+        self.path = path
+        self.max_bytes = max(0, int(max_bytes or 0))
+        self.compact_interval = max(1, int(compact_interval or 1))
+        self._local = threading.local()
+        self._compactor = None
+        self._compactor_lock = threading.Lock()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        conn = self._conn()
+        for statement in _SCHEMA:
+            conn.execute(statement)
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, namespace, key):
+        """Return (value, fresh_until, expires_at) in wall-clock time, or None."""
+        self._ensure_compactor()
+        try:
+            row = self._conn().execute(
+                "SELECT value, fresh_until, expires_at FROM cache_entries"
+                " WHERE namespace = ? AND key = ? AND expires_at > ?",
+                (namespace, _hash_key(key), time.time()),
+            ).fetchone()
+            if row is None:
+                return None
+            return json.loads(row[0]), row[1], row[2]
+        except Exception as exc:
+            logger.warning("L2 cache read failed for %s: %s", namespace, exc)
+            return None
+
+    def set(self, namespace, key, value, ttl_seconds, fresh_seconds=None):
+        self._ensure_compactor()
+        try:
+            payload = json.dumps(value, separators=(",", ":"))
+        except (TypeError, ValueError):
+            return
+        now = time.time()
+        fresh = ttl_seconds if fresh_seconds is None else min(fresh_seconds, ttl_seconds)
+        try:
+            self._conn().execute(
+                "INSERT OR REPLACE INTO cache_entries"
+                " (namespace, key, value, fresh_until, expires_at, size, updated_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (namespace, _hash_key(key), payload, now + fresh, now + ttl_seconds, len(payload), now),
+            )
+        except Exception as exc:
+            logger.warning("L2 cache write failed for %s: %s", namespace, exc)
+
+    def delete(self, namespace, key):
+        try:
+            self._conn().execute(
+                "DELETE FROM cache_entries WHERE namespace = ? AND key = ?",
+                (namespace, _hash_key(key)),
+            )
+        except Exception as exc:
+            logger.warning("L2 cache delete failed for %s: %s", namespace, exc)
+
+    def compact(self):
+        """Drop expired rows, then the least recently written rows until under max_bytes."""
+        conn = self._conn()
+        conn.execute("DELETE FROM cache_entries WHERE expires_at <= ?", (time.time(),))
+        if not self.max_bytes:
+            return
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM cache_entries").fetchone()[0]
+        excess = total - self.max_bytes
+        if excess <= 0:
+            return
+        victims = []
+        for namespace, key, size in conn.execute(
+            "SELECT namespace, key, size FROM cache_entries ORDER BY updated_at"
+        ):
+            victims.append((namespace, key))
+            excess -= size
+            if excess <= 0:
+                break
+        conn.executemany("DELETE FROM cache_entries WHERE namespace = ? AND key = ?", victims)
+
+    def export_rows(self, namespace_prefix=""):
+        """Yield unexpired rows as dicts, suitable for import_rows on another node."""
+        cursor = self._conn().execute(
+            "SELECT namespace, key, value, fresh_until, expires_at, updated_at FROM cache_entries"
+            " WHERE expires_at > ? AND substr(namespace, 1, ?) = ? ORDER BY namespace, key",
+            (time.time(), len(namespace_prefix), namespace_prefix),
+        )
+        for namespace, key, value, fresh_until, expires_at, updated_at in cursor:
+            yield {
+                "namespace": namespace,
+                "key": key,
+                "value": value,
+                "fresh_until": fresh_until,
+                "expires_at": expires_at,
+                "updated_at": updated_at,
+            }
+
+    def import_rows(self, rows):
+        """Insert exported rows, keeping whichever copy of an entry was written last. Returns rows applied."""
+        now = time.time()
+        applied = 0
+        conn = self._conn()
+        conn.execute("BEGIN")
+        try:
+            for row in rows:
+                if float(row["expires_at"]) <= now:
+                    continue
+                value = str(row["value"])
+                cursor = conn.execute(
+                    "INSERT INTO cache_entries"
+                    " (namespace, key, value, fresh_until, expires_at, size, updated_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?)"
+                    " ON CONFLICT (namespace, key) DO UPDATE SET"
+                    " value = excluded.value, fresh_until = excluded.fresh_until,"
+                    " expires_at = excluded.expires_at, size = excluded.size, updated_at = excluded.updated_at"
+                    " WHERE excluded.updated_at > cache_entries.updated_at",
+                    (
+                        str(row["namespace"]),
+                        str(row["key"]),
+                        value,
+                        float(row["fresh_until"]),
+                        float(row["expires_at"]),
+                        len(value),
+                        float(row["updated_at"]),
+                    ),
+                )
+                applied += cursor.rowcount
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return applied
+
+    def clear(self, namespace=None):
+        if namespace is None:
+            self._conn().execute("DELETE FROM cache_entries")
+        else:
+            self._conn().execute("DELETE FROM cache_entries WHERE namespace = ?", (namespace,))
+
+    def _ensure_compactor(self):
+        # Started lazily so each forked worker runs its own compaction thread.
+        if self._compactor is not None and self._compactor.is_alive():
+            return
+        with self._compactor_lock:
+            if self._compactor is not None and self._compactor.is_alive():
+                return
+            self._compactor = threading.Thread(
+                target=self._compact_loop,
+                name="l2-cache-compactor",
+                daemon=True,
+            )
+            self._compactor.start()
+
+    def _compact_loop(self):
+        while True:
+            time.sleep(self.compact_interval)
+            try:
+                self.compact()
+            except Exception as exc:
+                logger.warning("L2 cache compaction failed: %s", exc)
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def _open_store(path):
+    if not path:
+        return None
+    store = _stores.get(path)
+    if store is None:
+        with _stores_lock:
+            store = _stores.get(path)
+            if store is None:
+                try:
+                    store = SQLiteCache(path)
+                except Exception as exc:
+                    logger.error("Failed to open cache database at %s, running without it: %s", path, exc)
+                    store = False
+                _stores[path] = store
+    return store or None
+
+
+def get_persistent_store():
+    """Shared SQLiteCache configured by CACHE_L2_PATH, or None when the L2 tier is disabled."""
+    return _open_store(CACHE_L2_PATH)
+
+
+def get_id_store():
+    """Durable SQLiteCache for id-resolution results (ID_CACHE_PATH), or None when disabled."""
+    return _open_store(ID_CACHE_PATH)
@@ -0,0 +1,169 @@
+"""Background prefetch of the next episodes after a series or anime /stream request.
+
+Someone who just asked for episode 3 usually asks for episode 4 next. After a
+series or anime /stream request, ``schedule_next`` queues the next
+PREFETCH_EPISODES episode ids on a few low-priority threads. Each job renders
+the response through the same cached path (and request budget) as a real
+request, which fills the response cache as well as the provider, Aniways and
+Wyzie caches (and the provider availability index). Jobs are dropped
+rather than queued while the upstream scheduler is busy, when one client
+already has PREFETCH_MAX_PER_CLIENT jobs pending or when the queue is full.
+"""
+import json
+import logging
+import os
+import queue
+import threading
+
+from flix_stream.config import (
+    PREFETCH_EPISODES,
+    PREFETCH_MAX_LOAD,
+    PREFETCH_MAX_PER_CLIENT,
+    PREFETCH_QUEUE_SIZE,
+    PREFETCH_WORKERS,
+    TRUSTED_PROXIES,
+)
+from flix_stream.ids import decode_stream_id
+from flix_stream.scheduler import scheduler_load
+
+
+logger = logging.getLogger(__name__)
+
+_ANIME_PREFIXES = ("aniways", "kitsu")
+
+_lock = threading.Lock()
+_jobs = queue.Queue(maxsize=max(1, PREFETCH_QUEUE_SIZE))
+_pending = set()
+_per_client = {}
+_threads = []
+_pid = None
+_stats = {
+    "scheduled": 0,
+    "completed": 0,
+    "failed": 0,
+    "duplicate": 0,
+    "skipped_load": 0,
+    "skipped_client": 0,
+    "skipped_queue": 0,
+}
+
+
+def next_episode_ids(content_type, raw_id, count):
+    """Ids of the ``count`` episodes after ``raw_id``, or [] when it is not an episode id."""
+    parts = [p for p in decode_stream_id(raw_id).split(":") if p]
+    if count <= 0 or len(parts) < 3 or not parts[-1].isdigit():
+        return []
+    is_anime = parts[0].lower() in _ANIME_PREFIXES
+    if not is_anime and str(content_type or "").lower() not in ("series", "tv"):
+        return []
+    episode = int(parts[-1])
+    return [":".join(parts[:-1] + [str(episode + step)]) for step in range(1, count + 1)]
+
+
+def client_key(remote_addr, forwarded_for=""):
+    """Address the per-client cap is keyed by.
+
+    X-Forwarded-For is ignored unless the direct peer is one of TRUSTED_PROXIES,
+    since any client can send it; then the right-most address that no trusted
+    proxy added is the client.
+    """
+    client = remote_addr or ""
+    if client not in TRUSTED_PROXIES:
+        return client
+    for hop in reversed([hop.strip() for hop in (forwarded_for or "").split(",") if hop.strip()]):
+        client = hop
+        if hop not in TRUSTED_PROXIES:
+            break
+    return client
+
+
+def _under_load():
+    return scheduler_load() > PREFETCH_MAX_LOAD
+
+
+def _ensure_workers():
+    # Called with the lock held; forked worker processes start their own threads.
+    global _pid
+    if _pid == os.getpid() and _threads:
+        return
+    _pid = os.getpid()
+    _threads.clear()
+    for idx in range(max(1, PREFETCH_WORKERS)):
+        thread = threading.Thread(target=_work, name=f"prefetch-{idx}", daemon=True)
+        thread.start()
+        _threads.append(thread)
+
+
+def _count(name):
+    with _lock:
+        _stats[name] += 1
+
+
+def schedule_next(content_type, raw_id, addon_config, client, build):
+    """Queue ``build(content_type, next_id, addon_config)`` for the next episodes; never blocks.
+
+    Returns how many prefetches were queued.
+    """
+    next_ids = next_episode_ids(content_type, raw_id, PREFETCH_EPISODES)
+    if not next_ids:
+        return 0
+    if _under_load():
+        _count("skipped_load")
+        return 0
+
+    config_key = json.dumps(addon_config, sort_keys=True, default=str)
+    queued = 0
+    with _lock:
+        _ensure_workers()
+        for next_id in next_ids:
+            key = (str(content_type).lower(), next_id, config_key)
+            if key in _pending:
+                _stats["duplicate"] += 1
+                continue
+            if _per_client.get(client, 0) >= PREFETCH_MAX_PER_CLIENT:
+                _stats["skipped_client"] += 1
+                break
+            try:
+                _jobs.put_nowait((key, client, build, content_type, next_id, addon_config))
+            except queue.Full:
+                _stats["skipped_queue"] += 1
+                break
+            _pending.add(key)
+            _per_client[client] = _per_client.get(client, 0) + 1
+            _stats["scheduled"] += 1
+            queued += 1
+    return queued
+
+
+def _work():
+    while True:
+        key, client, build, content_type, next_id, addon_config = _jobs.get()
+        try:
+            if _under_load():
+                _count("skipped_load")
+                continue
+            build(content_type, next_id, addon_config)
+            _count("completed")
+        except Exception as exc:
+            _count("failed")
+            logger.debug("Prefetch of %s failed: %s", next_id, exc)
+        finally:
+            with _lock:
+                _pending.discard(key)
+                left = _per_client.get(client, 1) - 1
+                if left > 0:
+                    _per_client[client] = left
+                else:
+                    _per_client.pop(client, None)
+
+
+def prefetch_stats():
+    with _lock:
+        stats = dict(_stats)
+        stats.update(
+            episodes=PREFETCH_EPISODES,
+            queued=_jobs.qsize(),
+            pending=len(_pending),
+            clients=len(_per_client),
+        )
+    return stats
@@ -2,23 +2,29 @@ import logging
 import re
 from urllib.parse import urlencode
 
-import requests
-
+from flix_stream import http_client
 from flix_stream.config import (
     AUTOEMBED_COMMON_HEADERS,
+    AUTOEMBED_SERVERS,
     COMMON_HEADERS,
     PROVIDER_CACHE_MAXSIZE,
-    PROVIDER_CACHE_TTL,
+    SERVERS,
     VIXSRC_BASE_URL,
     VIXSRC_COMMON_HEADERS,
 )
-from flix_stream.cache import ttl_cache
-from flix_stream.crypto import decrypt_autoembed_response, decrypt_link
+from flix_stream.availability import ProviderError
+from flix_stream.cache import PROVIDER_CACHE_BUDGET, ttl_cache
+from flix_stream.crypto import decrypt_autoembed_response, decrypt_link, get_decryption_key
+from flix_stream.registry import get_provider, provider_plan
 from flix_stream.subtitles import parse_subtitles
 
 
 logger = logging.getLogger(__name__)
 
+VIDZEE = get_provider("vidzee")
+AUTOEMBED = get_provider("autoembed")
+VIXSRC = get_provider("vixsrc")
+
 
 def needs_stremio_proxy(decrypted_url):
     """Avoid double-proxying already wrapped upstream proxy URLs."""
@@ -28,9 +34,19 @@ def needs_stremio_proxy(decrypted_url):
     return True
 
 
-@ttl_cache(ttl_seconds=PROVIDER_CACHE_TTL, maxsize=PROVIDER_CACHE_MAXSIZE)
+@ttl_cache(
+    maxsize=PROVIDER_CACHE_MAXSIZE,
+    immutable=True,
+    persist=True,
+    budget=PROVIDER_CACHE_BUDGET,
+    **VIDZEE.cache_window,
+)
 def fetch_server_streams(tmdb_id, sr_info, season, episode, decryption_key):
-    """Worker function to fetch streams from a specific server."""
+    """Worker function to fetch streams from a specific server.
+
+    Returns [] when the server has nothing for the title and raises ProviderError
+    when the upstream call fails, so failures are never cached as empty answers.
+    """
     sr = sr_info["id"]
     api_url = f"https://player.vidzee.wtf/api/server?id={tmdb_id}&sr={sr}"
     if season and episode:
@@ -38,7 +54,9 @@ def fetch_server_streams(tmdb_id, sr_info, season, episode, decryption_key):
 
     streams = []
     try:
-        response = requests.get(api_url, headers=COMMON_HEADERS, timeout=10)
+        response = http_client.resilient_get(api_url, headers=COMMON_HEADERS, timeout=VIDZEE.timeout, breaker=f"vidzee/{sr}")
+        if response.status_code == 404:
+            return streams
         response.raise_for_status()
         data = response.json()
 
@@ -72,14 +90,23 @@ def fetch_server_streams(tmdb_id, sr_info, season, episode, decryption_key):
                     if subtitles:
                         stream_obj["subtitles"] = subtitles
                     streams.append(stream_obj)
+            if not streams:
+                raise ValueError("no stream link could be decrypted")
     except Exception as exc:
         logger.error("Error fetching streams for server %s: %s", sr, exc)
+        raise ProviderError(f"VidZee server {sr}: {exc}") from exc
     return streams
 
 
-@ttl_cache(ttl_seconds=PROVIDER_CACHE_TTL, maxsize=PROVIDER_CACHE_MAXSIZE)
+@ttl_cache(
+    maxsize=PROVIDER_CACHE_MAXSIZE,
+    immutable=True,
+    persist=True,
+    budget=PROVIDER_CACHE_BUDGET,
+    **AUTOEMBED.cache_window,
+)
 def fetch_autoembed_server_streams(tmdb_id, sr_info, season, episode):
-    """Fetch streams from AutoEmbed API for one server."""
+    """Fetch streams from AutoEmbed API for one server; raises ProviderError on upstream failure."""
     sr = sr_info["id"]
     api_url = f"https://test.autoembed.cc/api/server?id={tmdb_id}&sr={sr}"
     if season and episode:
@@ -93,12 +120,17 @@ def fetch_autoembed_server_streams(tmdb_id, sr_info, season, episode):
 
     streams = []
     try:
-        response = requests.get(api_url, headers=headers, timeout=10)
+        response = http_client.resilient_get(api_url, headers=headers, timeout=AUTOEMBED.timeout, breaker=f"autoembed/{sr}")
+        if response.status_code == 404:
+            return streams
         response.raise_for_status()
         data = response.json()
+        if not isinstance(data, dict) or not (data.get("data") or data.get("encryptedData")):
+            # No encrypted payload means the server has nothing for this title.
+            return streams
         decrypted_data = decrypt_autoembed_response(data)
         if not decrypted_data:
-            return streams
+            raise ValueError("response could not be decrypted")
 
         raw_subs = (
             decrypted_data.get("tracks", [])
@@ -126,6 +158,7 @@ def fetch_autoembed_server_streams(tmdb_id, sr_info, season, episode):
             streams.append(stream_obj)
     except Exception as exc:
         logger.error("Error fetching AutoEmbed streams for server %s: %s", sr, exc)
+        raise ProviderError(f"AutoEmbed server {sr}: {exc}") from exc
     return streams
 
 
@@ -214,9 +247,18 @@ def extract_vixsrc_playlist_url(html_text):
     return f"{base_url}{separator}{urlencode(params)}"
 
 
-@ttl_cache(ttl_seconds=PROVIDER_CACHE_TTL, maxsize=PROVIDER_CACHE_MAXSIZE)
+@ttl_cache(
+    maxsize=PROVIDER_CACHE_MAXSIZE,
+    immutable=True,
+    persist=True,
+    budget=PROVIDER_CACHE_BUDGET,
+    **VIXSRC.cache_window,
+)
 def fetch_vixsrc_streams(tmdb_id, content_type, season, episode):
-    """Fetch stream links from VixSrc by decoding window.masterPlaylist from the embed page."""
+    """Fetch stream links from VixSrc by decoding window.masterPlaylist from the embed page.
+
+    Raises ProviderError on upstream failure; a missing title yields [].
+    """
     media_type = "tv" if str(content_type or "").lower() in ("series", "tv") else "movie"
     if media_type == "tv":
         if not season or not episode:
@@ -233,7 +275,9 @@ def fetch_vixsrc_streams(tmdb_id, content_type, season, episode):
     }
 
     try:
-        response = requests.get(embed_url, headers=request_headers, timeout=10)
+        response = http_client.resilient_get(embed_url, headers=request_headers, timeout=VIXSRC.timeout, breaker="vixsrc")
+        if response.status_code == 404:
+            return []
         response.raise_for_status()
         playlist_url = extract_vixsrc_playlist_url(response.text)
         if not playlist_url:
@@ -252,4 +296,23 @@ def fetch_vixsrc_streams(tmdb_id, content_type, season, episode):
         ]
     except Exception as exc:
         logger.error("Error fetching VixSrc streams for TMDB %s: %s", tmdb_id, exc)
+        raise ProviderError(f"VixSrc: {exc}") from exc
+
+
+@provider_plan("vidzee")
+def plan_vidzee(query):
+    decryption_key = get_decryption_key()
+    if not decryption_key:
+        logger.warning("VidZee decryption key unavailable; skipping VidZee provider")
         return []
+    return [(fetch_server_streams, query.title_id, s, query.season, query.episode, decryption_key) for s in SERVERS]
+
+
+@provider_plan("autoembed")
+def plan_autoembed(query):
+    return [(fetch_autoembed_server_streams, query.title_id, s, query.season, query.episode) for s in AUTOEMBED_SERVERS]
+
+
+@provider_plan("vixsrc")
+def plan_vixsrc(query):
+    return [(fetch_vixsrc_streams, query.title_id, query.content_type, query.season, query.episode)]
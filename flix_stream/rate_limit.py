@@ -0,0 +1,192 @@
+"""Per-host upstream limiter: a token bucket plus an AIMD concurrency limit.
+
+Every upstream host gets one limiter (limits from UPSTREAM_LIMITS). A call
+waits in the host's queue until the host is not paused by a Retry-After, a
+concurrency slot is free and, for metered hosts, a token is available. The
+concurrency limit starts at the configured maximum, is halved on congestion
+(429, 503, upstream timeouts) and grows by roughly one slot per limit's worth
+of successful calls.
+"""
+import email.utils
+import threading
+import time
+from datetime import datetime, timezone
+from urllib.parse import urlsplit
+
+from flix_stream.config import UPSTREAM_DEFAULT_LIMIT, UPSTREAM_LIMITS
+from flix_stream.deadline import DeadlineExceeded
+
+
+OK = "ok"
+CONGESTED = "congested"
+FAILED = "failed"
+
+# Upper bound on how long one Retry-After may pause a host, and the pause for a 429 without one.
+MAX_RETRY_AFTER = 300.0
+DEFAULT_RETRY_AFTER = 1.0
+
+
+class QueueTimeout(DeadlineExceeded):
+    """Raised when an upstream call could not start within its allowed wait."""
+
+
+def parse_retry_after(value):
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP-date), or None."""
+    value = str(value or "").strip()
+    if not value:
+        return None
+    if value.isdigit():
+        return min(float(value), MAX_RETRY_AFTER)
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return min(max(0.0, (when - datetime.now(timezone.utc)).total_seconds()), MAX_RETRY_AFTER)
+
+
+class HostLimiter:
+    def __init__(self, host, rate, max_concurrency):
+        self.host = host
+        self.rate = rate
+        self.burst = max(1.0, rate)
+        self.max_concurrency = max(1, max_concurrency)
+        self._cond = threading.Condition()
+        self._tokens = self.burst
+        self._refilled_at = time.monotonic()
+        self._limit = float(self.max_concurrency)
+        self._in_flight = 0
+        self._queued = 0
+        self._paused_until = 0.0
+        self._last_decrease = 0.0
+        self._acquired = 0
+        self._waited = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._pauses = 0
+        self._timeouts = 0
+
+    def _refill(self, now):
+        if self.rate:
+            self._tokens = min(self.burst, self._tokens + (now - self._refilled_at) * self.rate)
+        self._refilled_at = now
+
+    def _delay(self, now):
+        """Seconds until a call could start, None when waiting on a free slot, 0 when it can start now."""
+        if now < self._paused_until:
+            return self._paused_until - now
+        if self._in_flight >= int(self._limit):
+            return None
+        if self.rate and self._tokens < 1:
+            return (1 - self._tokens) / self.rate
+        return 0.0
+
+    def acquire(self, timeout=None):
+        """Wait for a slot and return the start time to hand back to ``release``.
+
+        Raises QueueTimeout when the call could not (or provably cannot) start
+        within ``timeout`` seconds.
+        """
+        enqueued = time.monotonic()
+        deadline = None if timeout is None else enqueued + max(0.0, timeout)
+        with self._cond:
+            self._queued += 1
+            try:
+                while True:
+                    now = time.monotonic()
+                    self._refill(now)
+                    delay = self._delay(now)
+                    if delay == 0:
+                        break
+                    if deadline is not None:
+                        if now >= deadline or (delay is not None and now + delay > deadline):
+                            self._timeouts += 1
+                            raise QueueTimeout(f"{self.host}: no upstream slot within {timeout:.1f}s")
+                        delay = deadline - now if delay is None else delay
+                    self._cond.wait(delay)
+            finally:
+                self._queued -= 1
+            if self.rate:
+                self._tokens -= 1
+            self._in_flight += 1
+            self._acquired += 1
+            waited = now - enqueued
+            if waited > 0.001:
+                self._waited += 1
+                self._wait_total += waited
+                self._wait_max = max(self._wait_max, waited)
+        return now
+
+    def release(self, started, outcome=OK, retry_after=None):
+        """Return a slot; CONGESTED halves the concurrency limit once per round of calls, OK grows it.
+
+        ``retry_after`` pauses the whole host for that many seconds.
+        """
+        with self._cond:
+            now = time.monotonic()
+            self._in_flight -= 1
+            if retry_after is not None:
+                self._pauses += 1
+                self._paused_until = max(self._paused_until, now + retry_after)
+            if outcome == CONGESTED:
+                # Calls that were already in flight saw the same congestion; react once.
+                if started >= self._last_decrease:
+                    self._limit = max(1.0, self._limit / 2)
+                    self._last_decrease = now
+            elif outcome == OK:
+                self._limit = min(float(self.max_concurrency), self._limit + 1 / self._limit)
+            self._cond.notify_all()
+
+    def throttled(self):
+        with self._cond:
+            return bool(self._queued) or self._paused_until > time.monotonic()
+
+    def paused_for(self):
+        with self._cond:
+            return max(0.0, self._paused_until - time.monotonic())
+
+    def stats(self):
+        with self._cond:
+            self._refill(time.monotonic())
+            return {
+                "rate": self.rate,
+                "concurrency_limit": round(self._limit, 2),
+                "max_concurrency": self.max_concurrency,
+                "in_flight": self._in_flight,
+                "queued": self._queued,
+                "tokens": round(self._tokens, 2) if self.rate else None,
+                "acquired": self._acquired,
+                "waited": self._waited,
+                "wait_avg_ms": round(self._wait_total / self._waited * 1000, 1) if self._waited else 0.0,
+                "wait_max_ms": round(self._wait_max * 1000, 1),
+                "retry_after_pauses": self._pauses,
+                "queue_timeouts": self._timeouts,
+                "paused_for": round(max(0.0, self._paused_until - time.monotonic()), 1),
+            }
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def limiter_for(url):
+    """Return the shared limiter for ``url``'s host, creating it on first use."""
+    host = (urlsplit(str(url)).hostname or "").lower()
+    limiter = _limiters.get(host)
+    if limiter is None:
+        with _limiters_lock:
+            limiter = _limiters.get(host)
+            if limiter is None:
+                rate, concurrency = UPSTREAM_LIMITS.get(host, UPSTREAM_DEFAULT_LIMIT)
+                limiter = _limiters[host] = HostLimiter(host, rate, concurrency)
+    return limiter
+
+
+def upstream_throttled():
+    """True while any upstream host is paused by a Retry-After or has calls waiting for a slot."""
+    return any(limiter.throttled() for limiter in list(_limiters.values()))
+
+
+def limiter_stats():
+    return {host: limiter.stats() for host, limiter in sorted(_limiters.items())}
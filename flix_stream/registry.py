@@ -0,0 +1,122 @@
+"""Stream provider registry.
+
+Each provider declares the ID kinds it understands, the content types it
+serves, its rank in the stream list and its scheduling metadata: concurrency
+slots, per-call timeout and cache window. Provider modules attach a *plan*
+with ``@provider_plan(name)``: a function turning a StreamQuery into the
+upstream calls to make, each a ``(fetch, *args)`` tuple. The /stream fan-out
+(app.py and asgi.py) schedules whatever ``stream_providers`` returns, so a
+provider is added, tuned or disabled here rather than in the request path.
+
+Every declared value can be overridden from the environment with
+<NAME>_ENABLED, <NAME>_RANK, <NAME>_CONCURRENCY, <NAME>_TIMEOUT,
+<NAME>_CACHE_TTL and <NAME>_CACHE_HARD_TTL.
+"""
+import os
+
+from flix_stream.config import PROVIDER_CACHE_HARD_TTL, PROVIDER_CACHE_TTL
+
+
+MOVIE = "movie"
+SERIES = "series"
+
+
+class StreamQuery:
+    """What one /stream request asks the providers for."""
+
+    __slots__ = ("id_kind", "title_id", "content_type", "season", "episode", "imdb_id")
+
+    def __init__(self, id_kind, title_id, content_type, season=None, episode=None, imdb_id=None):
+        self.id_kind = id_kind
+        self.title_id = title_id
+        self.content_type = SERIES if str(content_type or "").lower() in ("series", "tv") else MOVIE
+        self.season = season
+        self.episode = episode
+        self.imdb_id = imdb_id
+
+
+class ProviderSpec:
+    def __init__(self, name, label, id_kinds, content_types, rank, concurrency, timeout,
+                 ttl=PROVIDER_CACHE_TTL, hard_ttl=PROVIDER_CACHE_HARD_TTL, fans_out=False):
+        prefix = name.upper()
+        self.name = name
+        self.label = label
+        self.id_kinds = frozenset(id_kinds)
+        self.content_types = frozenset(content_types)
+        self.enabled = os.environ.get(f"{prefix}_ENABLED", "1").strip().lower() not in ("0", "false", "no", "off")
+        self.rank = int(os.environ.get(f"{prefix}_RANK", rank))
+        self.concurrency = max(1, int(os.environ.get(f"{prefix}_CONCURRENCY", concurrency)))
+        self.timeout = float(os.environ.get(f"{prefix}_TIMEOUT", timeout))
+        soft = int(os.environ.get(f"{prefix}_CACHE_TTL", ttl))
+        hard = int(os.environ.get(f"{prefix}_CACHE_HARD_TTL", hard_ttl))
+        # ttl_cache keyword arguments: fresh for ttl_seconds, served stale until hard_ttl_seconds.
+        self.cache_window = {"ttl_seconds": soft, "hard_ttl_seconds": max(soft, hard)}
+        # A plan whose fetch submits its own provider-tagged calls runs untagged (see flix_stream.scheduler).
+        self.fans_out = fans_out
+        self.plan = None
+
+    @property
+    def slot(self):
+        """Scheduler tag for this provider's planned calls."""
+        return None if self.fans_out else self.name
+
+    def serves(self, query):
+        return (
+            self.enabled
+            and self.plan is not None
+            and query.id_kind in self.id_kinds
+            and query.content_type in self.content_types
+        )
+
+
+PROVIDERS = {}
+
+
+def register_provider(spec):
+    PROVIDERS[spec.name] = spec
+    return spec
+
+
+def get_provider(name):
+    return PROVIDERS[name]
+
+
+def provider_plan(name):
+    """Decorator attaching ``plan(query) -> [(fetch, *args), ...]`` to a registered provider."""
+    def decorator(plan):
+        PROVIDERS[name].plan = plan
+        return plan
+    return decorator
+
+
+def stream_providers(query, addon_config):
+    """Providers that can answer ``query`` and are enabled in ``addon_config``, best rank first."""
+    return sorted(
+        (spec for spec in PROVIDERS.values() if spec.serves(query) and addon_config.get(f"enable_{spec.name}")),
+        key=lambda spec: spec.rank,
+    )
+
+
+def provider_quotas():
+    return {name: spec.concurrency for name, spec in PROVIDERS.items()}
+
+
+def provider_rank(stream_obj):
+    """Sort rank of a stream by the provider label its name starts with."""
+    name = str(stream_obj.get("name", "")).lower()
+    ranks = [spec.rank for spec in PROVIDERS.values() if name.startswith(spec.label.lower())]
+    return min(ranks) if ranks else len(PROVIDERS)
+
+
+_TMDB_IDS = ("imdb", "tmdb")
+_ANIME_IDS = ("aniways", "kitsu")
+_ALL_TYPES = (MOVIE, SERIES)
+
+register_provider(ProviderSpec("vidzee", "VidZee", _TMDB_IDS, _ALL_TYPES, rank=0, concurrency=24, timeout=10))
+register_provider(ProviderSpec("autoembed", "AutoEmbed", _TMDB_IDS, _ALL_TYPES, rank=2, concurrency=16, timeout=10))
+register_provider(ProviderSpec("vixsrc", "VixSrc", _TMDB_IDS, _ALL_TYPES, rank=3, concurrency=8, timeout=10))
+register_provider(ProviderSpec(
+    "cineby", "Cineby", _TMDB_IDS, _ALL_TYPES, rank=1, concurrency=12, timeout=8,
+    ttl=3600, fans_out=True,
+))
+register_provider(ProviderSpec("aniways", "Aniways", _ANIME_IDS, _ALL_TYPES, rank=4, concurrency=12, timeout=10, fans_out=True))
@@ -2,6 +2,8 @@ import base64
 import json
 import logging
 
+from flix_stream.registry import PROVIDERS
+
 
 logger = logging.getLogger(__name__)
 
@@ -15,12 +17,11 @@ ALLOWED_WYZIE_SOURCES = {
     "animetosho",
 }
 
+# One enable_<provider> flag per registered stream provider.
+PROVIDER_FLAGS = tuple(f"enable_{name}" for name in PROVIDERS)
+
 DEFAULT_ADDON_CONFIG = {
-    "enable_vidzee": True,
-    "enable_autoembed": True,
-    "enable_vixsrc": True,
-    "enable_cineby": True,
-    "enable_aniways": True,
+    **{flag: True for flag in PROVIDER_FLAGS},
     "famelack_countries": [], # List of country codes
     "enable_wyzie": True,
     "wyzie_languages": ["en"],
@@ -34,11 +35,7 @@ DEFAULT_ADDON_CONFIG = {
 
 def _default_config_copy():
     return {
-        "enable_vidzee": DEFAULT_ADDON_CONFIG["enable_vidzee"],
-        "enable_autoembed": DEFAULT_ADDON_CONFIG["enable_autoembed"],
-        "enable_vixsrc": DEFAULT_ADDON_CONFIG["enable_vixsrc"],
-        "enable_cineby": DEFAULT_ADDON_CONFIG["enable_cineby"],
-        "enable_aniways": DEFAULT_ADDON_CONFIG["enable_aniways"],
+        **{flag: DEFAULT_ADDON_CONFIG[flag] for flag in PROVIDER_FLAGS},
         "famelack_countries": list(DEFAULT_ADDON_CONFIG["famelack_countries"]),
         "enable_wyzie": DEFAULT_ADDON_CONFIG["enable_wyzie"],
         "wyzie_languages": list(DEFAULT_ADDON_CONFIG["wyzie_languages"]),
@@ -94,11 +91,8 @@ def normalize_addon_config(raw_config):
     if not isinstance(raw_config, dict):
         return cfg
 
-    cfg["enable_vidzee"] = _to_bool(raw_config.get("enable_vidzee"), cfg["enable_vidzee"])
-    cfg["enable_autoembed"] = _to_bool(raw_config.get("enable_autoembed"), cfg["enable_autoembed"])
-    cfg["enable_vixsrc"] = _to_bool(raw_config.get("enable_vixsrc"), cfg["enable_vixsrc"])
-    cfg["enable_cineby"] = _to_bool(raw_config.get("enable_cineby"), cfg["enable_cineby"])
-    cfg["enable_aniways"] = _to_bool(raw_config.get("enable_aniways"), cfg["enable_aniways"])
+    for flag in PROVIDER_FLAGS:
+        cfg[flag] = _to_bool(raw_config.get(flag), cfg[flag])
 
     # Handle famelack_countries
     countries = raw_config.get("famelack_countries")
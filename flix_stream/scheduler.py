@@ -0,0 +1,350 @@
+"""Process-wide bounded scheduler for upstream calls.
+
+Work runs on one fixed pool of daemon threads instead of per-request
+ThreadPoolExecutors. A caller waiting on a task that no worker has picked up
+yet runs it itself, so nested fan-out (a provider task submitting per-server
+calls) always makes progress and cannot deadlock the pool; the same happens
+when the queue is full. Coroutines use ``run_async``, which never runs work on
+the event loop: it waits for a free queue slot when the queue is full and then
+for the task to finish.
+
+Tasks tagged with a ``provider`` hold one of that provider's slots (declared
+in flix_stream.registry, or PROVIDER_CONCURRENCY for other upstreams) while
+running. Only tag leaf calls that do not wait on
+other tasks of the same provider.
+
+Each task runs in a copy of the submitter's contextvars (e.g. the request's
+upstream budget from flix_stream.deadline).
+"""
+import asyncio
+import contextvars
+import logging
+import os
+import threading
+from collections import deque
+
+from flix_stream.config import PROVIDER_CONCURRENCY, SCHEDULER_QUEUE_SIZE, SCHEDULER_WORKERS
+from flix_stream.registry import provider_quotas
+
+
+logger = logging.getLogger(__name__)
+
+_PENDING = 0
+_RUNNING = 1
+_DONE = 2
+
+
+class Task:
+    """Handle for submitted work; ``result()`` waits for it (or runs it if still queued)."""
+
+    __slots__ = (
+        "scheduler", "func", "args", "kwargs", "provider", "context",
+        "state", "finished", "value", "error", "callbacks",
+    )
+
+    def __init__(self, scheduler, func, args, kwargs, provider):
+        self.scheduler = scheduler
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.provider = provider
+        self.context = contextvars.copy_context()
+        self.state = _PENDING
+        self.finished = threading.Event()
+        self.value = None
+        self.error = None
+        self.callbacks = []
+
+    def done(self):
+        return self.state == _DONE
+
+    def add_done_callback(self, fn):
+        """Call ``fn(task)`` once the task finishes (immediately if it already has)."""
+        with self.scheduler._lock:
+            if self.state != _DONE:
+                self.callbacks.append(fn)
+                return
+        fn(self)
+
+    def wait(self, timeout=None):
+        """Wait up to ``timeout`` without running the task here; returns whether it finished."""
+        return self.finished.wait(timeout)
+
+    def result(self, timeout=None):
+        if self.state == _PENDING and self.scheduler._claim(self):
+            self.scheduler._run(self, caller_runs=True)
+        if not self.finished.wait(timeout):
+            raise TimeoutError("task did not finish in time")
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+
+class _ProviderSlots:
+    __slots__ = ("semaphore", "limit", "queued", "running", "waiting", "completed")
+
+    def __init__(self, limit):
+        self.semaphore = threading.BoundedSemaphore(limit)
+        self.limit = limit
+        self.queued = 0
+        self.running = 0
+        self.waiting = 0
+        self.completed = 0
+
+
+class Scheduler:
+    def __init__(self, workers=SCHEDULER_WORKERS, max_queue=SCHEDULER_QUEUE_SIZE, quotas=None):
+        self.workers = max(1, int(workers))
+        self.max_queue = max(1, int(max_queue))
+        self._quotas = dict(PROVIDER_CONCURRENCY, **provider_quotas()) if quotas is None else dict(quotas)
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+        self._queue = deque()
+        self._queued = 0
+        self._active = 0
+        self._threads = []
+        self._pid = None
+        self._held = threading.local()
+        self._providers = {}
+        # (loop, future) per coroutine waiting for a queue slot, oldest first.
+        self._slot_waiters = deque()
+        self._counters = {
+            "submitted": 0, "completed": 0, "caller_runs": 0, "overflow_runs": 0, "slot_waits": 0, "max_queue_depth": 0,
+        }
+
+    def _slots(self, provider):
+        slots = self._providers.get(provider)
+        if slots is None:
+            slots = self._providers[provider] = _ProviderSlots(self._quotas.get(provider, self.workers))
+        return slots
+
+    def _ensure_workers(self):
+        # Called with the lock held; threads are started per process so forked workers get their own.
+        if self._pid == os.getpid() and self._threads:
+            return
+        self._pid = os.getpid()
+        self._queue.clear()
+        self._queued = 0
+        self._threads = []
+        for idx in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"upstream-{idx}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, func, *args, provider=None, **kwargs):
+        return self._enqueue(Task(self, func, args, kwargs, provider), inline_overflow=True)
+
+    async def submit_async(self, func, *args, provider=None, **kwargs):
+        """Run work from a coroutine and return its result. Never runs on the event loop.
+
+        While the queue is full the coroutine waits for a free slot, so async
+        callers are held back by max_queue like threads are.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        task = Task(self, func, args, kwargs, provider)
+        task.add_done_callback(lambda done: loop.call_soon_threadsafe(_resolve_future, future, done))
+        while self._enqueue(task, inline_overflow=False) is None:
+            await self._wait_for_slot(loop)
+        return await future
+
+    async def _wait_for_slot(self, loop):
+        waiter = loop.create_future()
+        entry = (loop, waiter)
+        with self._lock:
+            if self._queued < self.max_queue:
+                return
+            self._slot_waiters.append(entry)
+            self._counters["slot_waits"] += 1
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            with self._lock:
+                try:
+                    self._slot_waiters.remove(entry)
+                except ValueError:
+                    # Already woken for a slot we will not use; pass it on.
+                    self._wake_slot_waiter_locked()
+            raise
+
+    def _wake_slot_waiter_locked(self):
+        while self._slot_waiters:
+            loop, waiter = self._slot_waiters.popleft()
+            try:
+                loop.call_soon_threadsafe(_wake_slot_waiter, self, waiter)
+                return
+            except RuntimeError:
+                # Its event loop is closed; try the next waiter.
+                continue
+
+    def _enqueue(self, task, inline_overflow):
+        """Queue ``task``; a full queue runs it inline or, without ``inline_overflow``, returns None."""
+        provider = task.provider
+        with self._lock:
+            self._ensure_workers()
+            full = self._queued >= self.max_queue
+            if full and not inline_overflow:
+                return None
+            self._counters["submitted"] += 1
+            if provider is not None:
+                self._slots(provider)
+            overflow = full
+            if overflow:
+                task.state = _RUNNING
+                self._counters["overflow_runs"] += 1
+            else:
+                self._queue.append(task)
+                self._queued += 1
+                if provider is not None:
+                    self._providers[provider].queued += 1
+                self._counters["max_queue_depth"] = max(self._counters["max_queue_depth"], self._queued)
+                self._not_empty.notify()
+        # Decided under the lock: a worker may already have claimed a queued task (state RUNNING).
+        if overflow:
+            # Queue full: run in the submitting thread instead of growing without bound.
+            self._run(task)
+        return task
+
+    def map(self, func, items, provider=None):
+        """Run ``func`` over ``items`` concurrently; like ``Executor.map`` but returns a list."""
+        tasks = [self.submit(func, item, provider=provider) for item in items]
+        return [task.result() for task in tasks]
+
+    def _claim(self, task):
+        with self._lock:
+            if task.state != _PENDING:
+                return False
+            self._claim_locked(task)
+            self._counters["caller_runs"] += 1
+            return True
+
+    def _claim_locked(self, task):
+        task.state = _RUNNING
+        self._queued -= 1
+        if task.provider is not None:
+            self._providers[task.provider].queued -= 1
+        if self._slot_waiters:
+            self._wake_slot_waiter_locked()
+
+    def _work(self):
+        while True:
+            with self._lock:
+                while not self._queue:
+                    self._not_empty.wait()
+                task = self._queue.popleft()
+                if task.state != _PENDING:
+                    continue
+                self._claim_locked(task)
+            self._run(task)
+
+    def _run(self, task, caller_runs=False):
+        provider = task.provider
+        with self._lock:
+            self._active += 1
+        held = getattr(self._held, "providers", None)
+        if held is None:
+            held = self._held.providers = set()
+        slots = None
+        if provider is not None and provider not in held:
+            slots = self._providers[provider]
+            if not slots.semaphore.acquire(blocking=False):
+                with self._lock:
+                    slots.waiting += 1
+                slots.semaphore.acquire()
+                with self._lock:
+                    slots.waiting -= 1
+            held.add(provider)
+            with self._lock:
+                slots.running += 1
+        try:
+            task.value = task.context.run(task.func, *task.args, **task.kwargs)
+        except BaseException as exc:
+            task.error = exc
+        finally:
+            if slots is not None:
+                held.discard(provider)
+                with self._lock:
+                    slots.running -= 1
+                    slots.completed += 1
+                slots.semaphore.release()
+            with self._lock:
+                self._active -= 1
+                self._counters["completed"] += 1
+                task.state = _DONE
+                callbacks, task.callbacks = task.callbacks, None
+            task.finished.set()
+            for callback in callbacks:
+                try:
+                    callback(task)
+                except Exception:
+                    logger.exception("Task callback failed")
+
+    def load(self):
+        """Running plus queued tasks per worker thread."""
+        with self._lock:
+            return (self._active + self._queued) / self.workers
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+            stats.update(
+                workers=self.workers,
+                active=self._active,
+                queue_depth=self._queued,
+                slot_waiters=len(self._slot_waiters),
+                max_queue=self.max_queue,
+                providers={
+                    name: {
+                        "limit": slots.limit,
+                        "queued": slots.queued,
+                        "running": slots.running,
+                        "waiting": slots.waiting,
+                        "completed": slots.completed,
+                    }
+                    for name, slots in sorted(self._providers.items())
+                },
+            )
+        return stats
+
+
+def _wake_slot_waiter(scheduler, waiter):
+    # Runs on the waiter's event loop.
+    if waiter.done():
+        with scheduler._lock:
+            scheduler._wake_slot_waiter_locked()
+    else:
+        waiter.set_result(None)
+
+
+def _resolve_future(future, task):
+    if future.cancelled():
+        return
+    if task.error is not None:
+        future.set_exception(task.error)
+    else:
+        future.set_result(task.value)
+
+
+_SCHEDULER = Scheduler()
+
+
+def submit(func, *args, provider=None, **kwargs):
+    """Queue ``func(*args, **kwargs)`` on the shared upstream pool and return its Task."""
+    return _SCHEDULER.submit(func, *args, provider=provider, **kwargs)
+
+
+def run_async(func, *args, provider=None, **kwargs):
+    """Coroutine running ``func(*args, **kwargs)`` on the shared upstream pool."""
+    return _SCHEDULER.submit_async(func, *args, provider=provider, **kwargs)
+
+
+def map_tasks(func, items, provider=None):
+    return _SCHEDULER.map(func, items, provider=provider)
+
+
+def scheduler_load():
+    return _SCHEDULER.load()
+
+
+def scheduler_stats():
+    return _SCHEDULER.stats()
@@ -1,26 +1,55 @@
 import logging
 import re
-from functools import lru_cache
 
-import requests
-
-from flix_stream.config import COMMON_HEADERS, TMDB_TOKEN
+from flix_stream import http_client
+from flix_stream.cache import lru_cache
+from flix_stream.config import COMMON_HEADERS, ID_CACHE_TTL, TMDB_TOKEN
+from flix_stream.persistent_cache import get_id_store
 
 
 logger = logging.getLogger(__name__)
 
 
-@lru_cache(maxsize=2048)
-def get_tmdb_id(imdb_id, content_type=None):
-    """Maps IMDb id to TMDB id with type-aware selection."""
+_FIND_RESULTS = ("movie_results", "tv_results", "tv_episode_results", "tv_season_results")
+_FIND_FIELDS = ("id", "show_id", "season_number", "episode_number")
+
+
+@lru_cache(maxsize=4096, persist_ttl_seconds=ID_CACHE_TTL, persist_store=get_id_store)
+def _tmdb_find(imdb_id):
+    """Raw TMDB /find result for an IMDb id, shared by every lookup derived from it.
+
+    Only the non-empty result lists, with their ids and season/episode
+    numbers, are kept. Raises when TMDB cannot be reached so failures are
+    not cached.
+    """
     url = f"https://api.themoviedb.org/3/find/{imdb_id}?external_source=imdb_id"
     headers = {"Authorization": f"Bearer {TMDB_TOKEN}", "User-Agent": COMMON_HEADERS["User-Agent"]}
+    response = http_client.get(url, headers=headers, timeout=10)
+    response.raise_for_status()
+    data = response.json()
+    found = {}
+    for name in _FIND_RESULTS:
+        items = [
+            {field: item[field] for field in _FIND_FIELDS if item.get(field) is not None}
+            for item in data.get(name) or []
+            if isinstance(item, dict)
+        ]
+        if items:
+            found[name] = items
+    # An empty result is not persisted, so titles TMDB adds later are picked up after a restart.
+    return found
+
+
+def get_tmdb_id(imdb_id, content_type=None):
+    """Maps IMDb id to TMDB id with type-aware selection.
+
+    Not cached itself: it is derived from the cached _tmdb_find result, so a
+    failed /find is retried on the next call instead of pinning a miss.
+    """
     kind = (content_type or "").lower()
 
     try:
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()
-        data = response.json()
+        data = _tmdb_find(imdb_id)
         movie_results = data.get("movie_results") or []
         tv_results = data.get("tv_results") or []
         tv_episode_results = data.get("tv_episode_results") or []
@@ -64,7 +93,7 @@ def get_tmdb_id(imdb_id, content_type=None):
     return None
 
 
-@lru_cache(maxsize=2048)
+@lru_cache(maxsize=2048, persist_ttl_seconds=ID_CACHE_TTL, persist_store=get_id_store)
 def get_tmdb_id_from_cinemeta(imdb_id, content_type=None):
     """Fallback IMDb->TMDB mapping via Cinemeta meta endpoint."""
     kind = (content_type or "").lower()
@@ -79,7 +108,7 @@ def get_tmdb_id_from_cinemeta(imdb_id, content_type=None):
     for meta_type in meta_types:
         url = f"https://v3-cinemeta.strem.io/meta/{meta_type}/{imdb_id}.json"
         try:
-            response = requests.get(url, headers=headers, timeout=10)
+            response = http_client.get(url, headers=headers, timeout=10)
             if response.status_code != 200:
                 continue
             data = response.json()
@@ -94,17 +123,10 @@ def get_tmdb_id_from_cinemeta(imdb_id, content_type=None):
     return None
 
 
-@lru_cache(maxsize=2048)
 def get_series_context_from_imdb(imdb_id):
-    """Resolve show/season/episode context from an IMDb episode id."""
-    url = f"https://api.themoviedb.org/3/find/{imdb_id}?external_source=imdb_id"
-    headers = {"Authorization": f"Bearer {TMDB_TOKEN}", "User-Agent": COMMON_HEADERS["User-Agent"]}
-
+    """Resolve show/season/episode context from an IMDb episode id (derived from _tmdb_find, like get_tmdb_id)."""
     try:
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()
-        data = response.json()
-
+        data = _tmdb_find(imdb_id)
         tv_episode_results = data.get("tv_episode_results") or []
         if tv_episode_results:
             item = tv_episode_results[0]
@@ -124,7 +146,7 @@ def _normalize_title_token(value):
     return re.sub(r"[^a-z0-9]+", "", str(value or "").lower())
 
 
-@lru_cache(maxsize=4096)
+@lru_cache(maxsize=4096, persist_ttl_seconds=ID_CACHE_TTL, persist_store=get_id_store)
 def search_tmdb_id_by_title(title, content_type_hint=None, year=None):
     """Resolve TMDB id from a title using TMDB search endpoints."""
     raw_title = str(title or "").strip()
@@ -151,7 +173,7 @@ def search_tmdb_id_by_title(title, content_type_hint=None, year=None):
                 params["first_air_date_year"] = str(year)
 
         try:
-            response = requests.get(
+            response = http_client.get(
                 f"https://api.themoviedb.org/3/search/{media_type}",
                 headers=headers,
                 params=params,
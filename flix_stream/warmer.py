@@ -0,0 +1,215 @@
+"""Popularity-driven warmer for the /stream response cache.
+
+A few titles make up most /stream traffic. ``record_request`` counts requests
+per (type, decoded id, config) in a Space-Saving top-K sketch whose counts
+decay exponentially (halved every WARMER_HALF_LIFE seconds), so the hot set
+follows what is popular now. Every WARMER_INTERVAL seconds a background thread
+rebuilds the responses of the hottest ids that are missing from the cache or
+expire within WARMER_LEAD seconds. Rebuilds run under ``refresh_ahead`` so the
+provider caches they read are renewed too, at most WARMER_BUDGET per cycle,
+and a cycle stops as soon as the scheduler is busy or an upstream host is
+throttled (paused by a Retry-After or queueing calls).
+"""
+import json
+import logging
+import os
+import threading
+import time
+
+from flix_stream.cache import refresh_ahead
+from flix_stream.config import (
+    WARMER_BUDGET,
+    WARMER_HALF_LIFE,
+    WARMER_INTERVAL,
+    WARMER_LEAD,
+    WARMER_MAX_LOAD,
+    WARMER_MIN_HITS,
+    WARMER_TOP_K,
+    WARMER_TRACKED,
+)
+from flix_stream.ids import decode_stream_id
+from flix_stream.rate_limit import upstream_throttled
+from flix_stream.scheduler import scheduler_load
+
+
+logger = logging.getLogger(__name__)
+
+# Rescale stored counts before the growth factor loses float precision.
+_RESCALE_EXPONENT = 32
+
+
+class DecayingTopK:
+    """Space-Saving heavy-hitter sketch over at most ``capacity`` keys with exponentially decaying counts.
+
+    Instead of shrinking every count as time passes, new hits are weighted by
+    2 ** (age / half_life) and counts are divided by the same factor when read.
+    """
+
+    def __init__(self, capacity, half_life):
+        self.capacity = max(1, capacity)
+        self.half_life = half_life
+        self._lock = threading.Lock()
+        self._origin = time.monotonic()
+        # key -> [count, overestimate, payload]
+        self._entries = {}
+
+    def _scale(self, now):
+        if self.half_life <= 0:
+            return 1.0
+        exponent = (now - self._origin) / self.half_life
+        if exponent > _RESCALE_EXPONENT:
+            factor = 2.0 ** exponent
+            for entry in self._entries.values():
+                entry[0] /= factor
+                entry[1] /= factor
+            self._origin = now
+            return 1.0
+        return 2.0 ** exponent
+
+    def add(self, key, payload=None, now=None):
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            weight = self._scale(now)
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry[0] += weight
+                entry[2] = payload
+                return
+            if len(self._entries) < self.capacity:
+                self._entries[key] = [weight, 0.0, payload]
+                return
+            # Replace the smallest counter; the newcomer inherits its count as possible overestimate.
+            victim = min(self._entries, key=lambda k: self._entries[k][0])
+            floor = self._entries.pop(victim)[0]
+            self._entries[key] = [floor + weight, floor, payload]
+
+    def top(self, k, min_count=0.0, now=None):
+        """Up to ``k`` (key, decayed count, payload) tuples, hottest first.
+
+        Only keys whose guaranteed count (count minus overestimate) reaches
+        ``min_count`` are returned.
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            scale = self._scale(now)
+            ranked = sorted(self._entries.items(), key=lambda item: item[1][0], reverse=True)
+        hot = []
+        for key, (count, error, payload) in ranked:
+            if len(hot) >= k:
+                break
+            if (count - error) / scale >= min_count:
+                hot.append((key, count / scale, payload))
+        return hot
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+
+_sketch = DecayingTopK(WARMER_TRACKED, WARMER_HALF_LIFE)
+_lock = threading.Lock()
+_thread = None
+_pid = None
+_stats = {
+    "recorded": 0,
+    "cycles": 0,
+    "warmed": 0,
+    "filled": 0,
+    "fresh": 0,
+    "failed": 0,
+    "budget_exhausted": 0,
+    "skipped_load": 0,
+    "skipped_throttled": 0,
+}
+# Callbacks from register_stream_renderer: ttl_left(type, id, config) and build(type, id, config).
+_ttl_left = None
+_build = None
+
+
+def register_stream_renderer(ttl_left, build):
+    """Set how the warmer inspects and rebuilds cached /stream responses."""
+    global _ttl_left, _build
+    _ttl_left, _build = ttl_left, build
+
+
+def _ensure_thread():
+    # Called with the lock held; forked worker processes start their own thread.
+    global _thread, _pid
+    if _pid == os.getpid() and _thread is not None:
+        return
+    _pid = os.getpid()
+    _thread = threading.Thread(target=_run, name="cache-warmer", daemon=True)
+    _thread.start()
+
+
+def record_request(content_type, raw_id, addon_config):
+    """Count one /stream request towards its title's popularity; never blocks on upstream work."""
+    if WARMER_TOP_K <= 0 or _build is None:
+        return
+    content_type = str(content_type).lower()
+    content_id = decode_stream_id(raw_id)
+    key = (content_type, content_id, json.dumps(addon_config, sort_keys=True, default=str))
+    _sketch.add(key, (content_type, content_id, addon_config))
+    with _lock:
+        _stats["recorded"] += 1
+        _ensure_thread()
+
+
+def _blocked():
+    if scheduler_load() > WARMER_MAX_LOAD:
+        return "skipped_load"
+    if upstream_throttled():
+        return "skipped_throttled"
+    return None
+
+
+def _count(name):
+    with _lock:
+        _stats[name] += 1
+
+
+def warm_once():
+    """Run one warming cycle and return how many responses were rebuilt."""
+    _count("cycles")
+    rebuilt = 0
+    for _, _, (content_type, content_id, addon_config) in _sketch.top(WARMER_TOP_K, WARMER_MIN_HITS):
+        ttl_left = _ttl_left(content_type, content_id, addon_config)
+        if ttl_left is not None and ttl_left > WARMER_LEAD:
+            _count("fresh")
+            continue
+        if rebuilt >= WARMER_BUDGET:
+            _count("budget_exhausted")
+            break
+        reason = _blocked()
+        if reason:
+            _count(reason)
+            break
+        rebuilt += 1
+        try:
+            with refresh_ahead(WARMER_LEAD):
+                _build(content_type, content_id, addon_config)
+            _count("warmed" if ttl_left is not None else "filled")
+        except Exception as exc:
+            _count("failed")
+            logger.debug("Warming %s %s failed: %s", content_type, content_id, exc)
+    return rebuilt
+
+
+def _run():
+    while True:
+        time.sleep(max(0.1, WARMER_INTERVAL))
+        try:
+            warm_once()
+        except Exception:
+            logger.exception("Cache warmer cycle failed")
+
+
+def warmer_stats():
+    with _lock:
+        stats = dict(_stats)
+    stats.update(top_k=WARMER_TOP_K, tracked=len(_sketch))
+    stats["hottest"] = [
+        {"type": content_type, "id": content_id, "score": round(score, 2)}
+        for (content_type, content_id, _), score, _ in _sketch.top(min(WARMER_TOP_K, 10))
+    ]
+    return stats
@@ -1,8 +1,8 @@
 import logging
 
-import requests
-
-from flix_stream.config import WYZIE_API_BASE, WYZIE_COMMON_HEADERS
+from flix_stream import http_client
+from flix_stream.cache import PROVIDER_CACHE_BUDGET, ttl_cache
+from flix_stream.config import WYZIE_API_BASE, WYZIE_CACHE_TTL, WYZIE_COMMON_HEADERS
 
 
 logger = logging.getLogger(__name__)
@@ -37,7 +37,7 @@ def merge_subtitles(existing, extra):
     merged = []
     seen_urls = set()
 
-    for candidate in (existing or []) + (extra or []):
+    for candidate in list(existing or []) + list(extra or []):
         if not isinstance(candidate, dict):
             continue
         url = str(candidate.get("url") or "").strip()
@@ -49,31 +49,39 @@ def merge_subtitles(existing, extra):
     return merged
 
 
+@ttl_cache(ttl_seconds=WYZIE_CACHE_TTL, immutable=True, persist=True, budget=PROVIDER_CACHE_BUDGET)
+def _search_wyzie(params):
+    """Raw Wyzie search payload; raises on upstream errors so they are not cached."""
+    response = http_client.resilient_get(
+        f"{WYZIE_API_BASE}/search",
+        headers=WYZIE_COMMON_HEADERS,
+        params=params,
+        timeout=10,
+    )
+    if response.status_code == 404:
+        return []
+    if response.status_code != 200:
+        raise RuntimeError(f"Wyzie search returned HTTP {response.status_code}")
+    return response.json()
+
+
 def fetch_wyzie_subtitles(content_id, season, episode, addon_config):
     params = _prepare_wyzie_params(content_id, season, episode, addon_config)
 
     try:
-        response = requests.get(
-            f"{WYZIE_API_BASE}/search",
-            headers=WYZIE_COMMON_HEADERS,
-            params=params,
-            timeout=10,
-        )
-        if response.status_code != 200:
-            return []
-        payload = response.json()
+        payload = _search_wyzie(params)
     except Exception as exc:
         logger.error("Wyzie subtitle lookup failed for id=%s: %s", content_id, exc)
         return []
 
-    if isinstance(payload, list):
+    if isinstance(payload, (list, tuple)):
         items = payload
     elif isinstance(payload, dict):
         items = payload.get("value") or payload.get("items") or []
     else:
         return []
 
-    if not isinstance(items, list):
+    if not isinstance(items, (list, tuple)):
         return []
 
     normalized = []
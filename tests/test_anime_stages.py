@@ -0,0 +1,173 @@
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from flix_stream import anime, breaker, persistent_cache
+
+
+def _response(payload, status_code=200):
+    response = MagicMock(status_code=status_code)
+    response.json.return_value = payload
+    return response
+
+
+class TestAniwaysStageCaches(unittest.TestCase):
+    def setUp(self):
+        for func in (anime.fetch_aniways_streams, anime.get_aniways_episode_index, anime.get_aniways_servers):
+            func.cache_clear()
+            self.addCleanup(func.cache_clear)
+        for patcher in (
+            patch.object(persistent_cache, "CACHE_L2_PATH", ""),
+            patch.object(anime, "_server_params", {}),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.episodes = [{"number": number, "id": f"ep-{number}"} for number in range(1, 4)]
+        self.urls = []
+
+    def _get(self, url, **kwargs):
+        self.urls.append(url)
+        if url.endswith("/episodes"):
+            return _response(self.episodes)
+        if url.endswith("/servers"):
+            return _response([{"serverId": "s1", "serverName": "HD-1", "type": "sub"}])
+        episode = kwargs["params"]["server"]
+        return _response({"source": {"hls": f"https://cdn.test/{episode}/{len(self.urls)}.m3u8"}})
+
+    def _calls(self, suffix):
+        return [url for url in self.urls if url.endswith(suffix)]
+
+    def test_cold_episode_of_a_known_show_skips_the_episode_list(self):
+        with patch.object(anime.http_client, "resilient_get", side_effect=self._get), \
+                patch.object(anime.http_client, "get", side_effect=self._get):
+            first = anime.fetch_aniways_streams("12", "1")
+            second = anime.fetch_aniways_streams("12", "2")
+            anime.fetch_aniways_streams.cache_clear()
+            again = anime.fetch_aniways_streams("12", "2")
+
+        self.assertEqual(len(first), 1)
+        self.assertEqual(len(second), 1)
+        self.assertEqual(len(again), 1)
+        self.assertEqual(len(self._calls("/episodes")), 1)
+        self.assertEqual(len(self._calls("/servers")), 2)
+        # Both spellings of "HD-1" are probed once, then the learned one is reused.
+        self.assertEqual(len(self._calls("/servers/s1")), 4)
+
+    def test_new_episode_refreshes_an_older_index(self):
+        with patch.object(anime.http_client, "resilient_get", side_effect=self._get), \
+                patch.object(anime.http_client, "get", side_effect=self._get):
+            anime.fetch_aniways_streams("12", "1")
+            self.episodes.append({"number": 4, "id": "ep-4"})
+            # The index was just fetched, so a missing episode is not worth another request yet.
+            self.assertIsNone(anime._aniways_episode_id("12", "4"))
+            self.assertEqual(len(self._calls("/episodes")), 1)
+
+            with patch.object(anime, "ANIWAYS_EPISODES_REFRESH_MIN_AGE", 0):
+                streams = anime.fetch_aniways_streams("12", "4")
+                self.episodes = []
+                missing = anime.fetch_aniways_streams("12", "9")
+
+        self.assertEqual(len(streams), 1)
+        self.assertEqual(len(missing), 0)
+        self.assertEqual(len(self._calls("/episodes")), 3)
+        # The empty answer to the last refresh did not replace the known index.
+        self.assertEqual(anime.get_aniways_episode_index("12")["4"], "ep-4")
+
+
+class TestAniwaysServerParams(unittest.TestCase):
+    url = "https://api.aniways.xyz/anime/12/episodes/servers/s2"
+
+    def setUp(self):
+        for patcher in (
+            patch.object(persistent_cache, "CACHE_L2_PATH", ""),
+            patch.object(anime, "_server_params", {}),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.addCleanup(breaker._breakers.pop, anime._PROBE_BREAKER, None)
+        self.sent = []
+        self.release = threading.Event()
+        self.addCleanup(self.release.set)
+
+    def _get(self, url, params=None, **kwargs):
+        sent = (params["server"], params["type"])
+        self.sent.append(sent)
+        if sent == ("hd-2", "dub"):
+            return _response({}, 200)
+        if sent[0] == "hd 2":
+            # Spellings ranked below the working one answer slowly.
+            self.release.wait(5)
+        return _response({}, 404)
+
+    def test_working_parameters_are_learned_and_tried_first(self):
+        before = anime.aniways_probe_stats()
+        with patch.object(anime.http_client, "get", side_effect=self._get), \
+                patch.object(anime.http_client, "resilient_get", side_effect=self._get):
+            # Returns without waiting for the slow, less preferred probes.
+            started = time.monotonic()
+            self.assertIsNotNone(anime._fetch_server_source(self.url, "HD 2", "DUB"))
+            self.assertLess(time.monotonic() - started, 2)
+            self.release.set()
+            deadline = time.monotonic() + 5
+            while len(self.sent) < 6 and time.monotonic() < deadline:
+                time.sleep(0.01)
+            probed = len(self.sent)
+            self.assertIsNotNone(anime._fetch_server_source(self.url, "HD 2", "DUB"))
+
+        self.assertEqual(probed, 6)
+        self.assertEqual(self.sent[probed:], [("hd-2", "dub")])
+        stats = anime.aniways_probe_stats()
+        self.assertEqual(stats["learned_hits"] - before["learned_hits"], 1)
+        self.assertEqual(stats["probe_rounds"] - before["probe_rounds"], 1)
+
+    def _session(self, working):
+        # Each server answers 200 to its working spelling and 500 to every other one.
+        def _request(method, url, params=None, **kwargs):
+            self.sent.append((params["server"], params["type"]))
+            return _response({}, 200 if (params["server"], params["type"]) in working else 500)
+
+        session = MagicMock()
+        session.request.side_effect = _request
+        return session
+
+    def test_unlearned_servers_resolve_although_wrong_spellings_answer_5xx(self):
+        working = {("hd-1", "dub"), ("hd-2", "dub"), ("hd-3", "dub")}
+        with patch.object(anime.http_client, "session_for", return_value=self._session(working)):
+            for number in (1, 2, 3):
+                url = f"https://api.aniways.xyz/anime/12/episodes/servers/s{number}"
+                self.assertIsNotNone(anime._fetch_server_source(url, f"HD {number}", "DUB"))
+
+        self.assertEqual(breaker.get_breaker("https://api.aniways.xyz").stats()["consecutive_failures"], 0)
+        self.assertEqual(breaker.breaker_states()[anime._PROBE_BREAKER]["state"], "closed")
+
+    def test_round_without_any_working_spelling_counts_once_against_the_probe_breaker(self):
+        with patch.object(anime.http_client, "session_for", return_value=self._session(set())):
+            self.assertIsNone(anime._fetch_server_source(self.url, "HD 2", "DUB"))
+
+        # Each spelling is sent once, and only the round as a whole is recorded.
+        self.assertEqual(len(self.sent), 6)
+        self.assertEqual(breaker.get_breaker("https://api.aniways.xyz").stats()["consecutive_failures"], 0)
+        self.assertEqual(breaker.breaker_states()[anime._PROBE_BREAKER]["consecutive_failures"], 1)
+
+    def test_forgotten_spelling_is_removed_from_the_l2_tier(self):
+        key = ("HD 2", "DUB")
+        with tempfile.TemporaryDirectory() as tmpdir, \
+                patch.object(persistent_cache, "CACHE_L2_PATH", os.path.join(tmpdir, "l2.sqlite3")):
+            anime._remember_server_params(key, ("hd-2", "dub"))
+            anime._server_params.clear()
+            with patch.object(anime.http_client, "get", return_value=_response({}, 404)), \
+                    patch.object(anime.http_client, "resilient_get", return_value=_response({}, 404)):
+                self.assertIsNone(anime._fetch_server_source(self.url, *key))
+            anime._server_params.clear()
+
+            self.assertIsNone(anime._learned_server_params(key))
+
+
+if __name__ == '__main__':
+    unittest.main()
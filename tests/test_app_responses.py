@@ -0,0 +1,158 @@
+import os
+import sys
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import app as addon
+from flix_stream import anime, prefetch, providers
+from flix_stream.availability import clear_availability_index
+from flix_stream.cineby import CinebyProvider
+from flix_stream.deadline import DeadlineExceeded, clamp_timeout, request_budget
+
+
+class TestResponseCache(unittest.TestCase):
+    def setUp(self):
+        addon._render_response.cache_clear()
+        self.client = addon.app.test_client()
+
+    def test_repeat_requests_reuse_serialized_body(self):
+        payload = {"streams": [{"name": "VidZee", "url": "https://example.test/a.m3u8"}, addon._support_stream()]}
+        with patch.object(addon, "_stream_payload", return_value=payload) as build:
+            first = self.client.get("/stream/series/tt123%3A1%3A2.json")
+            second = self.client.get("/stream/series/tt123:1:2.json")
+
+        self.assertEqual(build.call_count, 1)
+        self.assertEqual(first.get_json(), payload)
+        self.assertEqual(first.data, second.data)
+        self.assertEqual(second.mimetype, "application/json")
+        # Bodies are charged to their own budget, not to the provider caches'.
+        self.assertGreater(addon.RESPONSE_CACHE_BUDGET.stats()["used_bytes"], 0)
+
+    def _wait_for_prefetch(self):
+        deadline = time.monotonic() + 5
+        while prefetch.prefetch_stats()["pending"] and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def test_prefetch_fills_the_response_cache(self):
+        payload = {"streams": [{"name": "VidZee", "url": "https://example.test/a.m3u8"}, addon._support_stream()]}
+        config = addon.normalize_addon_config(addon.DEFAULT_ADDON_CONFIG)
+        with patch.object(addon, "_stream_payload", return_value=payload) as build, \
+                patch.object(prefetch, "PREFETCH_EPISODES", 1):
+            self.client.get("/stream/series/tt124:1:2.json")
+            self._wait_for_prefetch()
+            self.assertIsNotNone(addon._render_response.cache_get("stream", "series", "tt124:1:3", config, skip=None))
+            self.client.get("/stream/series/tt124:1:3.json")
+            self._wait_for_prefetch()
+
+        built = [call.args[1] for call in build.call_args_list]
+        self.assertEqual(built.count("tt124:1:3"), 1)
+
+    def test_empty_answers_are_not_kept(self):
+        with patch.object(addon, "_stream_payload", return_value={"streams": []}) as build:
+            self.client.get("/stream/movie/tt123.json")
+            self.client.get("/stream/movie/tt123.json")
+
+        self.assertEqual(build.call_count, 2)
+
+    def test_meta_status_is_preserved(self):
+        response = self.client.get("/meta/movie/tt123.json")
+
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.get_json(), {"meta": None})
+
+
+class TestAnimeStreamGraph(unittest.TestCase):
+    def setUp(self):
+        clear_availability_index()
+
+    def test_subtitles_resolve_while_streams_are_fetched(self):
+        subtitles_started = threading.Event()
+        subtitle = {"id": "en", "url": "https://wz.test/en.srt", "lang": "eng"}
+
+        def resolve_aniways_id(kitsu_id):
+            # Only returns once the subtitle branch is running alongside.
+            self.assertTrue(subtitles_started.wait(2))
+            return "77"
+
+        def fetch_subtitles(source_prefix, source_id, season, episode, addon_config):
+            subtitles_started.set()
+            return [subtitle]
+
+        stream = {"name": "Aniways", "title": "SUB", "url": "https://aw.test/1.m3u8"}
+        config = dict(addon.normalize_addon_config(addon.DEFAULT_ADDON_CONFIG), enable_aniways=True)
+        with patch.object(addon, "resolve_aniways_id_from_kitsu", side_effect=resolve_aniways_id), \
+                patch.object(addon, "_fetch_wyzie_for_anime_ids", side_effect=fetch_subtitles), \
+                patch.object(anime, "fetch_aniways_streams", return_value=[stream]) as fetch_streams:
+            payload = addon._stream_payload("series", "kitsu:7442:1:3", config)
+
+        fetch_streams.assert_called_once_with("77", "3")
+        self.assertEqual(payload["streams"][0]["url"], stream["url"])
+        self.assertEqual(payload["streams"][0]["subtitles"][0]["url"], subtitle["url"])
+
+
+class TestAnimeTmdbResolution(unittest.TestCase):
+    def _resolve(self, external_match):
+        context = {"titles": ["Cowboy Bebop"], "media_type": "tv", "mal_id": 1}
+        with patch.object(addon, "get_kitsu_anime_context", return_value=context), \
+                patch.object(addon, "resolve_external_ids_from_mal_anilist", return_value=["candidate"]), \
+                patch.object(addon, "pick_best_tmdb_candidate", return_value=external_match), \
+                patch.object(addon, "search_tmdb_id_by_title", return_value=(30991, "tv")) as search:
+            return addon._resolve_tmdb_for_anime("kitsu", "1"), search
+
+    def test_title_search_only_runs_when_external_ids_miss(self):
+        resolved, search = self._resolve((30991, "tv", None))
+        self.assertEqual(resolved, (30991, "tv"))
+        search.assert_not_called()
+
+        resolved, search = self._resolve((None, None, None))
+        self.assertEqual(resolved, (30991, "tv"))
+        search.assert_called_once_with("Cowboy Bebop", "series", None)
+
+
+class TestStreamDeadline(unittest.TestCase):
+    def setUp(self):
+        addon._render_response.cache_clear()
+        clear_availability_index()
+        self.release = threading.Event()
+        self.addCleanup(self.release.set)
+        config = dict(addon.normalize_addon_config(addon.DEFAULT_ADDON_CONFIG), enable_vidzee=False, enable_autoembed=False, enable_wyzie=False)
+        self.config = config
+
+    def _slow_cineby(self, *args):
+        self.release.wait(5)
+        return [{"name": "Cineby", "title": "late", "url": "https://cb.test/late"}]
+
+    def test_deadline_returns_arrived_streams_and_skips_response_cache(self):
+        fast = [{"name": "VixSrc", "title": "1080p", "url": "https://vx.test/1"}]
+        with patch.object(addon, "parse_stream_id", return_value=("603", None, None)), \
+                patch.object(providers, "fetch_vixsrc_streams", return_value=fast) as vixsrc, \
+                patch.object(CinebyProvider, "fetch_streams", staticmethod(self._slow_cineby)), \
+                patch.object(addon, "STREAM_DEADLINE", 0.2):
+            started = time.monotonic()
+            body, status, cacheable = addon._render_response("stream", "movie", "tt0133093", self.config, skip=None)
+            elapsed = time.monotonic() - started
+            addon._render_response("stream", "movie", "tt0133093", self.config, skip=None)
+
+        self.assertLess(elapsed, 2)
+        self.assertIn(b"vx.test", body)
+        self.assertNotIn(b"cb.test", body)
+        self.assertFalse(cacheable)
+        self.assertEqual(vixsrc.call_count, 2)
+
+    def test_upstream_timeouts_shrink_to_the_remaining_budget(self):
+        self.assertEqual(clamp_timeout(10), 10)
+        with request_budget(0.5, 1):
+            self.assertLessEqual(clamp_timeout(10), 1.5)
+            self.assertEqual(clamp_timeout(0.1), 0.1)
+        with request_budget(0.01, 0):
+            time.sleep(0.02)
+            with self.assertRaises(DeadlineExceeded):
+                clamp_timeout(10)
+
+
+if __name__ == '__main__':
+    unittest.main()
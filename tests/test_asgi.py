@@ -0,0 +1,98 @@
+import asyncio
+import os
+import sys
+import unittest
+from contextlib import ExitStack
+from unittest.mock import patch
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import app as addon
+import asgi
+from flix_stream import providers
+from flix_stream.availability import clear_availability_index
+from flix_stream.cineby import CinebyProvider
+
+
+def _vidzee(tmdb_id, server, season, episode, key):
+    return [{"name": f"VidZee {server['name']}", "title": "1080p", "url": f"https://vz.test/{server['id']}"}]
+
+
+def _autoembed(tmdb_id, server, season, episode):
+    raise RuntimeError("server down")
+
+
+def _cineby(tmdb_id, imdb_id, media_type, season, episode):
+    return [{"name": "Cineby", "title": media_type, "url": "https://cb.test/1"}]
+
+
+def _request(path, method="GET"):
+    scope = {"type": "http", "method": method, "path": path, "query_string": b"", "headers": [], "client": ("127.0.0.1", 1)}
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(asgi.application(scope, receive, send))
+    return messages[0]["status"], dict(messages[0]["headers"]), messages[1]["body"]
+
+
+class TestAsgiEngine(unittest.TestCase):
+    def setUp(self):
+        addon._render_response.cache_clear()
+        clear_availability_index()
+        self.stack = ExitStack()
+        self.addCleanup(self.stack.close)
+        fakes = {
+            "get_decryption_key": lambda: "key",
+            "fetch_server_streams": _vidzee,
+            "fetch_autoembed_server_streams": _autoembed,
+            "fetch_vixsrc_streams": lambda *args: [],
+        }
+        for name, fake in fakes.items():
+            self.stack.enter_context(patch.object(providers, name, fake))
+        parse = lambda content_type, raw_id: ("603", None, None)
+        self.stack.enter_context(patch.object(addon, "parse_stream_id", parse))
+        self.stack.enter_context(patch.object(CinebyProvider, "fetch_streams", staticmethod(_cineby)))
+        self.stack.enter_context(patch.object(addon, "fetch_wyzie_subtitles", return_value=[{"id": "en", "url": "https://sub.test/en.srt", "lang": "en"}]))
+
+    def test_stream_body_matches_wsgi_and_is_cached(self):
+        expected = addon.app.test_client().get("/stream/movie/tt0133093.json").data
+        addon._render_response.cache_clear()
+        clear_availability_index()
+
+        status, headers, body = _request("/stream/movie/tt0133093.json")
+        with patch.object(addon, "_stream_payload", side_effect=AssertionError("not cached")):
+            _, _, cached = _request("/stream/movie/tt0133093.json")
+
+        self.assertEqual(status, 200)
+        self.assertEqual(body, expected)
+        self.assertEqual(cached, expected)
+        self.assertEqual(headers[b"content-type"], b"application/json")
+        self.assertEqual(headers[b"access-control-allow-origin"], b"*")
+
+    def test_concurrent_identical_misses_share_one_build(self):
+        config = addon.normalize_addon_config(addon.DEFAULT_ADDON_CONFIG)
+        payload = {"streams": [{"name": "VidZee", "url": "https://vz.test/1"}, addon._support_stream()]}
+
+        async def _render_twice():
+            return await asyncio.gather(*(asgi.render_stream("movie", "tt0133093", config) for _ in range(2)))
+
+        with patch.object(addon, "_stream_payload", return_value=payload) as build:
+            first, second = asyncio.run(_render_twice())
+
+        self.assertEqual(build.call_count, 1)
+        self.assertEqual(first, second)
+
+    def test_other_routes_are_served_by_the_flask_app(self):
+        status, _, body = _request("/manifest.json")
+
+        self.assertEqual(status, 200)
+        self.assertEqual(body, addon.app.test_client().get("/manifest.json").data)
+
+
+if __name__ == '__main__':
+    unittest.main()
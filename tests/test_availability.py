@@ -0,0 +1,68 @@
+import os
+import sys
+import unittest
+from unittest.mock import MagicMock, patch
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from flix_stream import cineby, wyzie
+from flix_stream.availability import (
+    OUTCOME_EMPTY,
+    OUTCOME_ERROR,
+    OUTCOME_OK,
+    clear_availability_index,
+    is_known_unavailable,
+    ProviderError,
+    provider_outcome,
+    record_provider_outcome,
+)
+
+
+class TestAvailabilityIndex(unittest.TestCase):
+    def tearDown(self):
+        clear_availability_index()
+
+    def test_provider_outcome(self):
+        self.assertEqual(provider_outcome([{"url": "x"}], [RuntimeError()]), OUTCOME_OK)
+        self.assertEqual(provider_outcome([], [RuntimeError()]), OUTCOME_ERROR)
+        self.assertEqual(provider_outcome([], []), OUTCOME_EMPTY)
+
+    def test_only_confirmed_empty_results_are_indexed(self):
+        record_provider_outcome("vixsrc", 42, "1", "2", OUTCOME_ERROR)
+        self.assertFalse(is_known_unavailable("vixsrc", 42, "1", "2"))
+
+        record_provider_outcome("vixsrc", 42, "1", "2", OUTCOME_EMPTY)
+        self.assertTrue(is_known_unavailable("vixsrc", "42", 1, 2))
+        self.assertFalse(is_known_unavailable("autoembed", 42, "1", "2"))
+        self.assertFalse(is_known_unavailable("vixsrc", 42, "1", "3"))
+
+        record_provider_outcome("vixsrc", 42, "1", "2", OUTCOME_OK)
+        self.assertFalse(is_known_unavailable("vixsrc", 42, "1", "2"))
+
+
+
+class TestUpstreamRefusals(unittest.TestCase):
+    def setUp(self):
+        for func in (cineby.CinebyProvider.fetch_streams, wyzie._search_wyzie):
+            func.cache_clear()
+            self.addCleanup(func.cache_clear)
+
+    def _get(self, status_code):
+        return patch.object(cineby.http_client, "resilient_get", return_value=MagicMock(status_code=status_code, text=""))
+
+    def test_only_a_404_from_cineby_is_an_empty_answer(self):
+        with patch.object(cineby.CinebyProvider, "_get_wasm", return_value=(None, object())):
+            with self._get(403), self.assertRaises(ProviderError):
+                cineby.CinebyProvider.fetch_streams(42)
+            with self._get(404):
+                self.assertEqual(cineby.CinebyProvider.fetch_streams(42), ())
+
+    def test_only_a_404_from_wyzie_is_an_empty_answer(self):
+        with self._get(403), self.assertRaises(RuntimeError):
+            wyzie._search_wyzie({"id": "tt1"})
+        with self._get(404):
+            self.assertEqual(wyzie._search_wyzie({"id": "tt1"}), ())
+
+
+if __name__ == '__main__':
+    unittest.main()
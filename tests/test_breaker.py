@@ -0,0 +1,57 @@
+import os
+import sys
+import unittest
+from unittest.mock import patch
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from flix_stream.breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    def test_consecutive_failures_trip_and_probe_closes(self):
+        breaker = CircuitBreaker("vidzee/4", failures=3, window=50, cooldown=30)
+        with patch("flix_stream.breaker.time.monotonic", return_value=100.0):
+            for _ in range(3):
+                self.assertTrue(breaker.allow())
+                breaker.record(False)
+            self.assertEqual(breaker.state, OPEN)
+            self.assertFalse(breaker.allow())
+
+        with patch("flix_stream.breaker.time.monotonic", return_value=131.0):
+            self.assertEqual(breaker.state, HALF_OPEN)
+            self.assertTrue(breaker.allow())
+            self.assertFalse(breaker.allow())
+            breaker.record(True, 0.2)
+            self.assertEqual(breaker.state, CLOSED)
+
+    def test_failed_probe_reopens(self):
+        breaker = CircuitBreaker("cineby/vidsrc", failures=1, cooldown=10)
+        with patch("flix_stream.breaker.time.monotonic", return_value=0.0):
+            breaker.record(False)
+        with patch("flix_stream.breaker.time.monotonic", return_value=11.0):
+            self.assertTrue(breaker.allow())
+            breaker.record(False)
+            self.assertEqual(breaker.state, OPEN)
+        self.assertEqual(breaker.stats()["trips"], 2)
+
+    def test_error_rate_over_window_trips(self):
+        breaker = CircuitBreaker("autoembed/3", failures=100, error_rate=0.5, window=10)
+        for idx in range(10):
+            breaker.record(idx % 2 == 0, 0.1)
+
+        self.assertEqual(breaker.state, OPEN)
+
+    def test_timeout_follows_observed_p95(self):
+        breaker = CircuitBreaker("vixsrc")
+        self.assertEqual(breaker.timeout(10), 10)
+        for idx in range(100):
+            breaker.record(True, 0.5 if idx < 95 else 3.0)
+
+        self.assertEqual(breaker.timeout(10), 1.5)
+        self.assertEqual(breaker.timeout(1), 1)
+        self.assertEqual(breaker.stats()["p95_ms"], 500.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
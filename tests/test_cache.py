@@ -0,0 +1,283 @@
+import os
+import sys
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from flix_stream.cache import _MISSING, CacheBudget, FrozenDict, SingleFlight, TTLStore, lru_cache, refresh_ahead, thaw, ttl_cache
+
+
+class TestTTLCache(unittest.TestCase):
+    def test_hit_returns_copy(self):
+        calls = []
+
+        @ttl_cache(ttl_seconds=60, maxsize=8)
+        def fetch(key):
+            calls.append(key)
+            return [{"url": key}]
+
+        first = fetch("a")
+        first[0]["url"] = "mutated"
+        second = fetch("a")
+
+        self.assertEqual(calls, ["a"])
+        self.assertEqual(second, [{"url": "a"}])
+
+    def test_immutable_hits_share_frozen_result(self):
+        @ttl_cache(ttl_seconds=60, maxsize=8, immutable=True)
+        def fetch(key):
+            return [{"url": key, "behaviorHints": {"proxyHeaders": {"request": {}}}}]
+
+        first = fetch("a")
+        second = fetch("a")
+
+        self.assertIs(first, second)
+        self.assertIsInstance(first[0], FrozenDict)
+        with self.assertRaises(TypeError):
+            first[0]["url"] = "mutated"
+        copied = dict(first[0], url="b")
+        self.assertEqual(copied["url"], "b")
+        self.assertEqual(thaw(first), [{"url": "a", "behaviorHints": {"proxyHeaders": {"request": {}}}}])
+
+    def test_entries_expire(self):
+        calls = []
+
+        @ttl_cache(ttl_seconds=10, maxsize=8)
+        def fetch(key):
+            calls.append(key)
+            return key
+
+        with patch("flix_stream.cache.time.monotonic", return_value=100.0):
+            fetch("a")
+            fetch("a")
+        with patch("flix_stream.cache.time.monotonic", return_value=111.0):
+            fetch("a")
+
+        self.assertEqual(calls, ["a", "a"])
+
+    def test_stale_while_revalidate(self):
+        calls = []
+
+        @ttl_cache(ttl_seconds=10, hard_ttl_seconds=100, maxsize=8)
+        def fetch(key):
+            calls.append(key)
+            if len(calls) >= 3:
+                raise RuntimeError("upstream down")
+            return len(calls)
+
+        with patch("flix_stream.cache.time.monotonic", return_value=100.0):
+            self.assertEqual(fetch("a"), 1)
+        with patch("flix_stream.cache.time.monotonic", return_value=150.0):
+            self.assertEqual(fetch("a"), 1)
+            self._wait_for(lambda: fetch("a") == 2)
+        with patch("flix_stream.cache.time.monotonic", return_value=200.0):
+            self.assertEqual(fetch("a"), 2)
+            self._wait_for(lambda: len(calls) >= 3 and not fetch.single_flight_stats()["in_flight"])
+            self.assertEqual(fetch("a"), 2)
+        with patch("flix_stream.cache.time.monotonic", return_value=300.0):
+            with self.assertRaises(RuntimeError):
+                fetch("a")
+
+    def test_refresh_ahead_reloads_entries_close_to_expiry(self):
+        calls = []
+
+        @ttl_cache(ttl_seconds=30, maxsize=8)
+        def fetch(key):
+            calls.append(key)
+            if len(calls) == 3:
+                raise RuntimeError("upstream down")
+            return len(calls)
+
+        with patch("flix_stream.cache.time.monotonic", return_value=100.0):
+            self.assertEqual(fetch("a"), 1)
+            self.assertEqual(fetch.cache_ttl_left("a"), 30.0)
+            self.assertIsNone(fetch.cache_ttl_left("b"))
+        with patch("flix_stream.cache.time.monotonic", return_value=110.0):
+            with refresh_ahead(10):
+                self.assertEqual(fetch("a"), 1)
+        with patch("flix_stream.cache.time.monotonic", return_value=125.0):
+            with refresh_ahead(10):
+                self.assertEqual(fetch("a"), 2)
+            self.assertEqual(fetch.cache_ttl_left("a"), 30.0)
+        with patch("flix_stream.cache.time.monotonic", return_value=150.0):
+            with refresh_ahead(10):
+                # A failed reload keeps serving the cached value.
+                self.assertEqual(fetch("a"), 2)
+
+        self.assertEqual(len(calls), 3)
+
+    def _wait_for(self, predicate, timeout=2.0):
+        deadline = time.time() + timeout
+        while not predicate():
+            self.assertLess(time.time(), deadline)
+            time.sleep(0.005)
+
+    def test_cache_info_counts_hits_misses_and_evictions(self):
+        @ttl_cache(ttl_seconds=10, maxsize=1, shards=1)
+        def fetch(key):
+            return {"key": key}
+
+        with patch("flix_stream.cache.time.monotonic", return_value=100.0):
+            fetch("a")
+            fetch("a")
+            fetch("b")
+        with patch("flix_stream.cache.time.monotonic", return_value=200.0):
+            fetch("b")
+
+        info = fetch.cache_info()
+        self.assertEqual(info["hits"], 1)
+        self.assertEqual(info["misses"], 3)
+        self.assertEqual(info["evictions"], 1)
+        self.assertEqual(info["expirations"], 1)
+        self.assertEqual(info["entries"], 1)
+        self.assertEqual(info["loads"], 3)
+        self.assertGreater(info["bytes"], 0)
+
+    def test_maxsize_evicts_least_recently_used(self):
+        store = TTLStore(60, maxsize=2, shards=1)
+        store.set("a", 1, now=0)
+        store.set("b", 2, now=0)
+        store.get("a", now=1)
+        store.set("c", 3, now=1)
+
+        self.assertEqual(store.get("a", now=2), 1)
+        self.assertIs(store.get("b", now=2), _MISSING)
+        self.assertEqual(store.get("c", now=2), 3)
+        self.assertEqual(len(store), 2)
+
+    def test_shared_budget_evicts_from_largest_store(self):
+        budget = CacheBudget(max_bytes=2000)
+        small = TTLStore(60, maxsize=100, shards=1, budget=budget)
+        large = TTLStore(60, maxsize=100, shards=1, budget=budget)
+        small.set("s", "x", now=0)
+        for idx in range(20):
+            large.set(idx, "y" * 200, now=0)
+
+        self.assertLessEqual(budget.used_bytes, 2000)
+        self.assertEqual(budget.used_bytes, small.bytes + large.bytes)
+        self.assertEqual(small.get("s", now=1), "x")
+        self.assertEqual(large.get(19, now=1), "y" * 200)
+        self.assertIs(large.get(0, now=1), _MISSING)
+
+        large.clear()
+        self.assertEqual(budget.used_bytes, small.bytes)
+
+    def test_expiry_heap_stays_bounded(self):
+        store = TTLStore(5, maxsize=4, shards=1)
+        for step in range(1000):
+            store.set(step % 3, step, now=step)
+
+        shard = store._shards[0]
+        self.assertLessEqual(len(shard.expiry_heap), 2 * len(shard.entries) + 32)
+
+    def test_expired_entries_purged_on_insert(self):
+        store = TTLStore(5, maxsize=100, shards=1)
+        for key in range(50):
+            store.set(key, key, now=0)
+        store.set("fresh", 1, now=10)
+
+        self.assertEqual(len(store), 1)
+
+
+class TestSingleFlight(unittest.TestCase):
+    def _run_concurrently(self, func, count=8):
+        barrier = threading.Barrier(count)
+        results = []
+
+        def _call():
+            barrier.wait()
+            results.append(func())
+
+        threads = [threading.Thread(target=_call) for _ in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_concurrent_misses_are_coalesced(self):
+        calls = []
+
+        @ttl_cache(ttl_seconds=60, maxsize=8, immutable=True)
+        def fetch(key):
+            calls.append(key)
+            time.sleep(0.05)
+            return [key]
+
+        results = self._run_concurrently(lambda: fetch("a"))
+
+        self.assertEqual(calls, ["a"])
+        self.assertEqual(results, [("a",)] * 8)
+        stats = fetch.single_flight_stats()
+        self.assertEqual(stats["leaders"], 1)
+        self.assertEqual(stats["in_flight"], 0)
+
+    def test_concurrent_refreshes_are_coalesced_and_can_keep_the_cached_value(self):
+        answers = [["a"], [], []]
+
+        @ttl_cache(ttl_seconds=60, maxsize=8, immutable=True, replace_if=lambda cached, new: bool(new))
+        def fetch(key):
+            time.sleep(0.05)
+            return answers.pop(0)
+
+        fetch("k")
+        results = self._run_concurrently(lambda: fetch.cache_refresh("k"))
+
+        # One reload for all callers, and its empty answer kept the cached value.
+        self.assertEqual(answers, [[]])
+        self.assertEqual(results, [("a",)] * 8)
+        self.assertEqual(fetch("k"), ("a",))
+
+    def test_lru_cache_coalesces_and_never_expires(self):
+        calls = []
+
+        @lru_cache(maxsize=4)
+        def resolve(key):
+            calls.append(key)
+            time.sleep(0.05)
+            return {"id": key}
+
+        results = self._run_concurrently(lambda: resolve("a"))
+        with patch("flix_stream.cache.time.monotonic", return_value=1e12):
+            resolve("a")
+
+        self.assertEqual(calls, ["a"])
+        self.assertTrue(all(result is results[0] for result in results))
+
+    def test_errors_propagate_to_waiters_and_are_not_cached(self):
+        flight = SingleFlight()
+        started = threading.Event()
+        release = threading.Event()
+        errors = []
+
+        def _fail():
+            started.set()
+            release.wait()
+            raise RuntimeError("upstream down")
+
+        def _call():
+            try:
+                flight.do("k", _fail)
+            except RuntimeError as exc:
+                errors.append(exc)
+
+        leader = threading.Thread(target=_call)
+        leader.start()
+        started.wait()
+        follower = threading.Thread(target=_call)
+        follower.start()
+        while flight.stats()["coalesced"] == 0:
+            time.sleep(0.001)
+        release.set()
+        leader.join()
+        follower.join()
+
+        self.assertEqual(len(errors), 2)
+        self.assertEqual(flight.stats(), {"leaders": 1, "coalesced": 1, "in_flight": 0})
+
+
+if __name__ == '__main__':
+    unittest.main()
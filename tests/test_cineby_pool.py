@@ -0,0 +1,86 @@
+import os
+import sys
+import threading
+import unittest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from flix_stream.cineby import WasmPool
+
+
+class _FakeDecryptor:
+    def __init__(self):
+        self.uses = 0
+        self.memory = 1024
+
+    def decrypt(self, payload):
+        self.uses += 1
+        if payload == "trap":
+            raise RuntimeError("wasm trap")
+        return payload[::-1]
+
+    def memory_size(self):
+        return self.memory
+
+
+class TestWasmPool(unittest.TestCase):
+    def setUp(self):
+        self.created = []
+
+    def _factory(self):
+        instance = _FakeDecryptor()
+        self.created.append(instance)
+        return instance
+
+    def test_instances_are_reused_until_worn_out(self):
+        pool = WasmPool(self._factory, max_idle=2, max_uses=3, max_memory=4096)
+        results = [pool.run(_FakeDecryptor.decrypt, "abc") for _ in range(4)]
+
+        self.assertEqual(results, ["cba"] * 4)
+        self.assertEqual(len(self.created), 2)
+        stats = pool.stats()
+        self.assertEqual((stats["created"], stats["reused"], stats["recycled"]), (2, 2, 1))
+
+        self.created[1].memory = 8192
+        pool.run(_FakeDecryptor.decrypt, "abc")
+        self.assertEqual(pool.stats()["recycled"], 2)
+        self.assertEqual(pool.stats()["idle"], 0)
+
+    def test_failed_instances_are_discarded(self):
+        pool = WasmPool(self._factory, max_idle=2, max_uses=100, max_memory=0)
+        with self.assertRaises(RuntimeError):
+            pool.run(_FakeDecryptor.decrypt, "trap")
+        pool.run(_FakeDecryptor.decrypt, "abc")
+
+        self.assertEqual(len(self.created), 2)
+        self.assertEqual(pool.stats()["discarded"], 1)
+
+    def test_concurrent_callers_never_share_an_instance(self):
+        pool = WasmPool(self._factory, max_idle=4, max_uses=1000, max_memory=0)
+        busy = set()
+        lock = threading.Lock()
+        clashes = []
+
+        def work(instance, payload):
+            with lock:
+                if id(instance) in busy:
+                    clashes.append(instance)
+                busy.add(id(instance))
+            result = instance.decrypt(payload)
+            with lock:
+                busy.discard(id(instance))
+            return result
+
+        threads = [threading.Thread(target=lambda: [pool.run(work, "xy") for _ in range(200)]) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(clashes, [])
+        self.assertEqual(pool.stats()["in_use"], 0)
+        self.assertLessEqual(pool.stats()["idle"], 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+import os
+import sys
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from flix_stream import http_client
+from flix_stream.breaker import CircuitOpenError, breaker_states, get_breaker
+from flix_stream.rate_limit import limiter_stats
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    hits = {}
+
+    def do_GET(self):
+        body = b'{"ok":true}'
+        seen = self.hits[self.path] = self.hits.get(self.path, 0) + 1
+        if self.path.startswith("/slow-once") and seen == 1:
+            time.sleep(1)
+        status = 200
+        if self.path.startswith("/throttled-once") and seen == 1:
+            self.send_response(429)
+            self.send_header("Retry-After", "1")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if self.path.startswith("/fail") or (self.path.startswith("/flaky") and seen == 1):
+            status = 500 if self.path.startswith("/fail") else 503
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Set-Cookie", "session=abc; Path=/")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestHttpClient(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.base = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_requests_to_one_host_reuse_a_connection(self):
+        for idx in range(5):
+            response = http_client.get(f"{self.base}/item/{idx}", timeout=5)
+            self.assertEqual(response.json(), {"ok": True})
+
+        stats = http_client.http_stats()[self.base]
+        self.assertEqual(stats, {"requests": 5, "connections": 1, "reuse_rate": 0.8})
+        self.assertIs(http_client.session_for(self.base + "/other"), http_client.session_for(self.base.upper()))
+        self.assertEqual(len(http_client.session_for(self.base).cookies), 0)
+
+    def test_failing_upstream_opens_its_breaker(self):
+        for _ in range(5):
+            self.assertEqual(http_client.get(f"{self.base}/fail", timeout=5, breaker="test/fail").status_code, 500)
+
+        with self.assertRaises(CircuitOpenError):
+            http_client.get(f"{self.base}/fail", timeout=5, breaker="test/fail")
+        self.assertEqual(breaker_states()["test/fail"]["state"], "open")
+        self.assertEqual(http_client.get(f"{self.base}/ok", timeout=5).status_code, 200)
+
+    def test_transient_5xx_is_retried(self):
+        response = http_client.resilient_get(f"{self.base}/flaky", timeout=5, breaker="test/flaky")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(http_client.resilience_stats()["test/flaky"]["retries"], 1)
+
+    def test_slow_attempt_is_hedged(self):
+        breaker = get_breaker("test/hedge")
+        for _ in range(20):
+            breaker.record(True, 0.05)
+
+        started = time.monotonic()
+        response = http_client.resilient_get(f"{self.base}/slow-once", timeout=5, breaker="test/hedge")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertLess(time.monotonic() - started, 0.8)
+        self.assertEqual(http_client.resilience_stats()["test/hedge"], {"retries": 0, "hedges_fired": 1, "hedges_won": 1})
+
+    def test_throttled_call_is_resent_after_retry_after(self):
+        started = time.monotonic()
+        response = http_client.get(f"{self.base}/throttled-once", timeout=5, breaker="test/throttled")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertGreaterEqual(time.monotonic() - started, 0.9)
+        self.assertEqual(breaker_states()["test/throttled"]["consecutive_failures"], 0)
+        self.assertGreaterEqual(limiter_stats()["127.0.0.1"]["retry_after_pauses"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+import io
+import os
+import sys
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from flix_stream.cache import lru_cache, ttl_cache
+from flix_stream.cache_snapshot import export_snapshot, import_snapshot
+from flix_stream.persistent_cache import SQLiteCache
+
+
+class TestSQLiteCache(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.store = SQLiteCache(os.path.join(self.tmpdir.name, "l2.sqlite3"), max_bytes=0, compact_interval=3600)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_round_trip_and_expiry(self):
+        self.store.set("ns", ("key", 1), {"streams": [1, 2]}, ttl_seconds=60, fresh_seconds=10)
+        value, fresh_until, expires_at = self.store.get("ns", ("key", 1))
+
+        self.assertEqual(value, {"streams": [1, 2]})
+        self.assertLess(fresh_until, expires_at)
+        self.assertIsNone(self.store.get("other", ("key", 1)))
+
+        with patch("flix_stream.persistent_cache.time.time", return_value=time.time() + 120):
+            self.assertIsNone(self.store.get("ns", ("key", 1)))
+            self.store.compact()
+        self.assertIsNone(self.store.get("ns", ("key", 1)))
+
+    def test_compaction_enforces_size_limit(self):
+        self.store.max_bytes = 1000
+        for idx in range(50):
+            self.store.set("ns", idx, "x" * 100, ttl_seconds=60)
+        self.store.compact()
+
+        total = self.store._conn().execute("SELECT SUM(size) FROM cache_entries").fetchone()[0]
+        self.assertLessEqual(total, 1000)
+        self.assertIsNotNone(self.store.get("ns", 49))
+
+    def test_decorated_functions_share_the_l2_tier(self):
+        calls = []
+
+        def make_worker():
+            # Each decorated copy stands in for a separate worker process with its own L1.
+            @ttl_cache(ttl_seconds=60, maxsize=8, immutable=True, persist=True)
+            def fetch(key):
+                calls.append(key)
+                return [{"url": key}]
+
+            @lru_cache(maxsize=8, persist_ttl_seconds=60)
+            def resolve(key):
+                calls.append(key)
+                return None if key == "missing" else (key, "tv")
+
+            return fetch, resolve
+
+        with patch("flix_stream.cache.get_persistent_store", return_value=self.store):
+            fetch_a, resolve_a = make_worker()
+            fetch_b, resolve_b = make_worker()
+            fetch_a("a")
+            resolve_a("b")
+            resolve_a("missing")
+
+            self.assertEqual(fetch_b("a"), ({"url": "a"},))
+            self.assertEqual(list(resolve_b("b")), ["b", "tv"])
+            self.assertIsNone(resolve_b("missing"))
+
+        self.assertEqual(calls, ["a", "b", "missing", "missing"])
+
+    def test_snapshot_round_trip_keeps_newest_rows(self):
+        self.store.set("flix_stream.tmdb.get_tmdb_id", ("tt1",), 10, ttl_seconds=600)
+        self.store.set("flix_stream.famelack.fetch_famelack_country", ("hu",), [1], ttl_seconds=600)
+        snapshot = io.StringIO()
+        exported = export_snapshot(self.store, snapshot, "flix_stream.tmdb.")
+
+        target = SQLiteCache(os.path.join(self.tmpdir.name, "target.sqlite3"), max_bytes=0)
+        target.set("flix_stream.tmdb.get_tmdb_id", ("tt2",), 20, ttl_seconds=600)
+        snapshot.seek(0)
+        imported = import_snapshot(target, snapshot)
+
+        self.assertEqual((exported, imported), (1, 1))
+        self.assertEqual(target.get("flix_stream.tmdb.get_tmdb_id", ("tt1",))[0], 10)
+        self.assertEqual(target.get("flix_stream.tmdb.get_tmdb_id", ("tt2",))[0], 20)
+        self.assertIsNone(target.get("flix_stream.famelack.fetch_famelack_country", ("hu",)))
+
+        snapshot.seek(0)
+        self.assertEqual(import_snapshot(target, snapshot), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+import os
+import sys
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from flix_stream import prefetch
+
+
+class TestPrefetch(unittest.TestCase):
+    def setUp(self):
+        self.release = threading.Event()
+        self.addCleanup(self.release.set)
+        self.built = []
+        for name, value in (("PREFETCH_EPISODES", 2), ("PREFETCH_MAX_PER_CLIENT", 3)):
+            patcher = patch.object(prefetch, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _build(self, content_type, raw_id, addon_config):
+        self.release.wait(5)
+        self.built.append(raw_id)
+
+    def _wait_idle(self):
+        deadline = time.monotonic() + 5
+        while prefetch.prefetch_stats()["pending"] and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def test_next_episode_ids(self):
+        self.assertEqual(prefetch.next_episode_ids("series", "tt0944947:1:3", 2), ["tt0944947:1:4", "tt0944947:1:5"])
+        self.assertEqual(prefetch.next_episode_ids("series", "kitsu:7442:1:9", 1), ["kitsu:7442:1:10"])
+        self.assertEqual(prefetch.next_episode_ids("movie", "aniways%3A12%3A3", 1), ["aniways:12:4"])
+        self.assertEqual(prefetch.next_episode_ids("movie", "tt0133093", 2), [])
+        self.assertEqual(prefetch.next_episode_ids("series", "tt0944947", 2), [])
+
+    def test_next_episodes_are_built_in_the_background_and_capped_per_client(self):
+        config = {"enable_vidzee": True}
+        self.assertEqual(prefetch.schedule_next("series", "tt1:1:3", config, "10.0.0.1", self._build), 2)
+        self.assertEqual(prefetch.schedule_next("series", "tt1:1:4", config, "10.0.0.1", self._build), 1)
+        self.assertEqual(prefetch.schedule_next("series", "tt2:1:1", config, "10.0.0.1", self._build), 0)
+        self.assertEqual(prefetch.schedule_next("series", "tt2:1:1", config, "10.0.0.2", self._build), 2)
+
+        self.release.set()
+        self._wait_idle()
+        self.assertEqual(sorted(self.built), ["tt1:1:4", "tt1:1:5", "tt1:1:6", "tt2:1:2", "tt2:1:3"])
+
+    def test_forwarded_for_is_only_trusted_from_configured_proxies(self):
+        with patch.object(prefetch, "TRUSTED_PROXIES", frozenset({"10.0.0.9"})):
+            self.assertEqual(prefetch.client_key("203.0.113.5", "198.51.100.1"), "203.0.113.5")
+            self.assertEqual(prefetch.client_key("10.0.0.9", "198.51.100.1, 198.51.100.7"), "198.51.100.7")
+            self.assertEqual(prefetch.client_key("10.0.0.9", "198.51.100.7, 10.0.0.9"), "198.51.100.7")
+            self.assertEqual(prefetch.client_key("10.0.0.9", ""), "10.0.0.9")
+
+    def test_prefetch_is_skipped_under_load(self):
+        with patch.object(prefetch, "scheduler_load", return_value=5.0):
+            self.assertEqual(prefetch.schedule_next("series", "tt3:1:1", {}, "10.0.0.3", self._build), 0)
+        self.assertGreaterEqual(prefetch.prefetch_stats()["skipped_load"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+import os
+import sys
+import threading
+import time
+import unittest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from flix_stream.rate_limit import CONGESTED, OK, HostLimiter, QueueTimeout, parse_retry_after
+
+
+class TestHostLimiter(unittest.TestCase):
+    def test_token_bucket_queues_calls_over_the_rate(self):
+        limiter = HostLimiter("example.org", rate=20.0, max_concurrency=8)
+        started = time.monotonic()
+        for _ in range(25):
+            limiter.release(limiter.acquire(timeout=5))
+
+        # 20 tokens of burst, then 5 more at 20/s.
+        self.assertGreaterEqual(time.monotonic() - started, 0.2)
+        stats = limiter.stats()
+        self.assertEqual(stats["acquired"], 25)
+        self.assertGreaterEqual(stats["waited"], 4)
+        self.assertGreater(stats["wait_max_ms"], 0)
+
+    def test_excess_calls_wait_for_a_free_slot(self):
+        limiter = HostLimiter("example.org", rate=0, max_concurrency=1)
+        first = limiter.acquire()
+        acquired = []
+        waiter = threading.Thread(target=lambda: acquired.append(limiter.acquire(timeout=5)))
+        waiter.start()
+        time.sleep(0.1)
+        self.assertEqual(acquired, [])
+        self.assertEqual(limiter.stats()["queued"], 1)
+
+        limiter.release(first)
+        waiter.join(2)
+        self.assertEqual(len(acquired), 1)
+        with self.assertRaises(QueueTimeout):
+            limiter.acquire(timeout=0.05)
+
+    def test_congestion_halves_limit_once_and_success_grows_it(self):
+        limiter = HostLimiter("example.org", rate=0, max_concurrency=8)
+        calls = [limiter.acquire() for _ in range(4)]
+        for started in calls:
+            limiter.release(started, CONGESTED)
+        self.assertEqual(limiter.stats()["concurrency_limit"], 4)
+
+        for _ in range(8):
+            limiter.release(limiter.acquire(), OK)
+        self.assertGreater(limiter.stats()["concurrency_limit"], 5)
+
+    def test_retry_after_pauses_host_and_fails_fast_past_the_wait(self):
+        limiter = HostLimiter("example.org", rate=0, max_concurrency=4)
+        limiter.release(limiter.acquire(), CONGESTED, retry_after=30)
+
+        started = time.monotonic()
+        with self.assertRaises(QueueTimeout):
+            limiter.acquire(timeout=5)
+        self.assertLess(time.monotonic() - started, 0.5)
+        self.assertEqual(limiter.stats()["retry_after_pauses"], 1)
+
+    def test_parse_retry_after(self):
+        self.assertEqual(parse_retry_after("7"), 7.0)
+        self.assertEqual(parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT"), 0.0)
+        self.assertIsNone(parse_retry_after("soon"))
+        self.assertIsNone(parse_retry_after(None))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+import os
+import sys
+import unittest
+from unittest.mock import patch
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from flix_stream import anime, cineby, providers  # register the built-in plans
+from flix_stream.registry import PROVIDERS, ProviderSpec, StreamQuery, provider_rank, register_provider, stream_providers
+from flix_stream.runtime_config import normalize_addon_config
+
+
+class TestProviderRegistry(unittest.TestCase):
+    def setUp(self):
+        self.config = normalize_addon_config({})
+
+    def test_queries_are_matched_by_id_kind_and_ranked(self):
+        title = stream_providers(StreamQuery("imdb", "603", "movie"), self.config)
+        anime_ids = stream_providers(StreamQuery("kitsu", "1", "series", None, "1"), self.config)
+
+        self.assertEqual([spec.name for spec in title], ["vidzee", "cineby", "autoembed", "vixsrc"])
+        self.assertEqual([spec.name for spec in anime_ids], ["aniways"])
+        self.assertEqual(stream_providers(StreamQuery("famelack", "x", "tv"), self.config), [])
+
+    def test_disabled_providers_are_not_scheduled(self):
+        config = normalize_addon_config({"enable_cineby": "0", "enable_vixsrc": False})
+
+        names = [spec.name for spec in stream_providers(StreamQuery("tmdb", "603", "series", "1", "2"), config)]
+        self.assertEqual(names, ["vidzee", "autoembed"])
+
+    def test_new_provider_is_scheduled_from_its_metadata(self):
+        with patch.dict(os.environ, {"EXAMPLE_TIMEOUT": "3", "EXAMPLE_RANK": "-1"}):
+            spec = register_provider(ProviderSpec("example", "Example", ("tmdb",), ("movie",), rank=9, concurrency=2, timeout=10))
+        self.addCleanup(PROVIDERS.pop, "example")
+        spec.plan = lambda query: [(list, ())]
+        config = dict(self.config, enable_example=True)
+
+        movie = stream_providers(StreamQuery("tmdb", "603", "movie"), config)
+        series = stream_providers(StreamQuery("tmdb", "603", "series", "1", "1"), config)
+
+        self.assertIs(movie[0], spec)
+        self.assertNotIn(spec, series)
+        self.assertEqual((spec.timeout, spec.slot), (3.0, "example"))
+        self.assertEqual(provider_rank({"name": "Example - 1080p"}), -1)
+
+    def test_rank_follows_provider_labels(self):
+        self.assertLess(provider_rank({"name": "VidZee - Duke"}), provider_rank({"name": "Cineby - vidsrc"}))
+        self.assertEqual(provider_rank({"name": "Unknown"}), len(PROVIDERS))
+
+    def test_stream_links_are_not_served_stale_by_default(self):
+        for spec in PROVIDERS.values():
+            self.assertEqual(spec.cache_window["hard_ttl_seconds"], spec.cache_window["ttl_seconds"], spec.name)
+        with patch.dict(os.environ, {"EXAMPLE_CACHE_HARD_TTL": "600"}):
+            spec = ProviderSpec("example", "Example", ("imdb",), ("movie",), rank=9, concurrency=1, timeout=3)
+        self.assertEqual(spec.cache_window, {"ttl_seconds": 45, "hard_ttl_seconds": 600})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+import unittest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from flix_stream.scheduler import Scheduler
+
+
+class TestScheduler(unittest.TestCase):
+    def test_nested_fan_out_completes_on_a_single_worker(self):
+        scheduler = Scheduler(workers=1, max_queue=100, quotas={})
+
+        def _group(group):
+            return sum(scheduler.map(lambda item: item * group, range(5)))
+
+        outer = [scheduler.submit(_group, group) for group in range(1, 4)]
+
+        self.assertEqual([task.result(timeout=5) for task in outer], [10, 20, 30])
+        self.assertEqual(scheduler.stats()["queue_depth"], 0)
+
+    def test_task_claimed_by_a_worker_right_after_queueing_runs_once(self):
+        scheduler = Scheduler(workers=1, max_queue=100, quotas={})
+        calls = []
+        claimed = []
+
+        def _claim_on_notify():
+            # A worker grabs the task the moment submit() releases the lock.
+            task = scheduler._queue.popleft()
+            scheduler._claim_locked(task)
+            claimed.append(task)
+
+        scheduler._ensure_workers()
+        scheduler._not_empty.notify = _claim_on_notify
+        task = scheduler.submit(calls.append, "run")
+        scheduler._run(claimed[0])
+
+        self.assertIs(claimed[0], task)
+        self.assertEqual(task.result(timeout=5), None)
+        self.assertEqual(calls, ["run"])
+
+    def test_async_submissions_wait_for_a_free_queue_slot(self):
+        scheduler = Scheduler(workers=1, max_queue=2, quotas={})
+        release = threading.Event()
+        self.addCleanup(release.set)
+        depths = []
+
+        def _blocked(value):
+            release.wait(5)
+            return value
+
+        async def _fill():
+            calls = [asyncio.ensure_future(scheduler.submit_async(_blocked, idx)) for idx in range(6)]
+            for _ in range(50):
+                await asyncio.sleep(0.01)
+                depths.append(scheduler.stats()["queue_depth"])
+            waiting = scheduler.stats()["slot_waiters"]
+            # A caller that gives up while waiting does not strand the others.
+            calls[3].cancel()
+            release.set()
+            return waiting, await asyncio.gather(*(calls[:3] + calls[4:]))
+
+        waiting, results = asyncio.run(_fill())
+
+        self.assertEqual(results, [0, 1, 2, 4, 5])
+        self.assertLessEqual(max(depths), 2)
+        # One call runs, two are queued and the rest wait for a slot.
+        self.assertEqual(waiting, 3)
+        self.assertEqual(scheduler.stats()["overflow_runs"], 0)
+
+    def test_provider_quota_caps_concurrent_calls(self):
+        scheduler = Scheduler(workers=8, max_queue=100, quotas={"slow": 2})
+        lock = threading.Lock()
+        active = []
+        peak = []
+
+        def _call(_):
+            with lock:
+                active.append(1)
+                peak.append(len(active))
+            time.sleep(0.02)
+            with lock:
+                active.pop()
+
+        scheduler.map(_call, range(10), provider="slow")
+
+        self.assertLessEqual(max(peak), 2)
+        provider = scheduler.stats()["providers"]["slow"]
+        self.assertEqual((provider["completed"], provider["running"], provider["queued"]), (10, 0, 0))
+
+    def test_errors_reach_the_caller_and_full_queue_runs_inline(self):
+        scheduler = Scheduler(workers=1, max_queue=1, quotas={})
+        release = threading.Event()
+        blocker = scheduler.submit(release.wait)
+        queued = scheduler.submit(lambda: "queued")
+        inline = scheduler.submit(threading.current_thread)
+
+        def _fail():
+            raise ValueError("boom")
+
+        self.assertIs(inline.result(timeout=1), threading.current_thread())
+        release.set()
+        self.assertTrue(blocker.result(timeout=5))
+        self.assertEqual(queued.result(timeout=5), "queued")
+        with self.assertRaises(ValueError):
+            scheduler.submit(_fail).result(timeout=5)
+        self.assertGreaterEqual(scheduler.stats()["overflow_runs"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+import os
+import sys
+import unittest
+from unittest.mock import MagicMock, patch
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from flix_stream import persistent_cache, tmdb
+
+
+def _find_response(payload):
+    response = MagicMock(status_code=200)
+    response.json.return_value = payload
+    return response
+
+
+class TestTmdbFind(unittest.TestCase):
+    def setUp(self):
+        for func in (tmdb._tmdb_find, tmdb.get_tmdb_id_from_cinemeta):
+            func.cache_clear()
+            self.addCleanup(func.cache_clear)
+        patcher = patch.object(persistent_cache, "ID_CACHE_PATH", "")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_derived_lookups_share_one_find_call(self):
+        payload = {
+            "movie_results": [],
+            "tv_results": [],
+            "tv_episode_results": [
+                {"id": 63056, "show_id": 1399, "season_number": 1, "episode_number": 2, "name": "The Kingsroad"},
+            ],
+        }
+        with patch.object(tmdb.http_client, "get", return_value=_find_response(payload)) as get:
+            self.assertEqual(tmdb.get_series_context_from_imdb("tt1668746"), (1399, 1, 2))
+            self.assertEqual(tmdb.get_tmdb_id("tt1668746", "series"), 1399)
+            self.assertEqual(tmdb.get_tmdb_id("tt1668746"), 1399)
+
+        self.assertEqual(get.call_count, 1)
+        self.assertEqual(tmdb._tmdb_find("tt1668746"), {"tv_episode_results": [
+            {"id": 63056, "show_id": 1399, "season_number": 1, "episode_number": 2},
+        ]})
+
+    def test_failed_find_is_not_cached(self):
+        episode = {"tv_episode_results": [{"show_id": 1399, "season_number": 1, "episode_number": 1}]}
+        with patch.object(tmdb.http_client, "get", side_effect=OSError("down")):
+            self.assertEqual(tmdb.get_series_context_from_imdb("tt1480055"), (None, None, None))
+        with patch.object(tmdb.http_client, "get", return_value=_find_response(episode)) as get:
+            self.assertEqual(tmdb.get_series_context_from_imdb("tt1480055"), (1399, 1, 1))
+            self.assertEqual(tmdb.get_series_context_from_imdb("tt1480055"), (1399, 1, 1))
+        self.assertEqual(get.call_count, 1)
+
+        with patch.object(tmdb.http_client, "get", side_effect=OSError("down")):
+            self.assertIsNone(tmdb.get_tmdb_id("tt0944947", "series"))
+        with patch.object(tmdb.http_client, "get", return_value=_find_response({"tv_results": [{"id": 1399}]})) as get:
+            self.assertEqual(tmdb.get_tmdb_id("tt0944947", "series"), 1399)
+        self.assertEqual(get.call_count, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+import os
+import sys
+import unittest
+from unittest.mock import patch
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from flix_stream import warmer
+from flix_stream.warmer import DecayingTopK
+
+
+class TestDecayingTopK(unittest.TestCase):
+    def test_counts_decay_by_half_life(self):
+        sketch = DecayingTopK(capacity=8, half_life=10)
+        now = sketch._origin
+        for _ in range(4):
+            sketch.add("old", now=now)
+        sketch.add("new", now=now + 20)
+        sketch.add("new", now=now + 20)
+
+        top = sketch.top(2, now=now + 20)
+        self.assertEqual([key for key, _, _ in top], ["new", "old"])
+        self.assertAlmostEqual(top[0][1], 2.0)
+        self.assertAlmostEqual(top[1][1], 1.0)
+        self.assertEqual([key for key, _, _ in sketch.top(2, min_count=1.5, now=now + 20)], ["new"])
+
+    def test_space_saving_keeps_heavy_hitters(self):
+        sketch = DecayingTopK(capacity=3, half_life=0)
+        for idx in range(200):
+            sketch.add("hot")
+            sketch.add(f"cold-{idx}")
+        top = sketch.top(1)
+        self.assertEqual(top[0][0], "hot")
+        self.assertGreaterEqual(top[0][1], 200)
+        self.assertEqual(len(sketch), 3)
+
+    def test_rescaling_keeps_relative_counts(self):
+        sketch = DecayingTopK(capacity=4, half_life=1)
+        now = sketch._origin
+        sketch.add("a", now=now)
+        sketch.add("a", now=now + 40)
+        sketch.add("b", now=now + 40)
+        top = dict((key, score) for key, score, _ in sketch.top(2, now=now + 40))
+        self.assertAlmostEqual(top["a"], 1.0)
+        self.assertAlmostEqual(top["b"], 1.0)
+
+
+class TestWarmer(unittest.TestCase):
+    def setUp(self):
+        self.ttl = {}
+        self.built = []
+        patches = (
+            patch.object(warmer, "_sketch", DecayingTopK(16, 600)),
+            patch.object(warmer, "_ttl_left", lambda ct, cid, cfg: self.ttl.get(cid)),
+            patch.object(warmer, "_build", lambda ct, cid, cfg: self.built.append(cid)),
+            patch.object(warmer, "_ensure_thread", lambda: None),
+            patch.object(warmer, "WARMER_TOP_K", 3),
+            patch.object(warmer, "WARMER_MIN_HITS", 2),
+            patch.object(warmer, "WARMER_LEAD", 10),
+            patch.object(warmer, "WARMER_BUDGET", 1),
+            patch("flix_stream.warmer.scheduler_load", return_value=0.0),
+            patch("flix_stream.warmer.upstream_throttled", return_value=False),
+        )
+        for patcher in patches:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_rebuilds_hot_ids_close_to_expiry_within_budget(self):
+        config = {"enable_vidzee": True}
+        for _ in range(3):
+            warmer.record_request("movie", "tt0133093", config)
+            warmer.record_request("series", "tt0944947%3A1%3A2", config)
+            warmer.record_request("movie", "tt0111161", config)
+        warmer.record_request("movie", "tt0068646", config)
+        self.ttl.update({"tt0133093": 25.0, "tt0944947:1:2": 4.0})
+
+        self.assertEqual(warmer.warm_once(), 1)
+        self.assertEqual(len(self.built), 1)
+        self.assertIn(self.built[0], ("tt0944947:1:2", "tt0111161"))
+        self.assertNotIn("tt0068646", self.built)
+
+    def test_throttled_upstream_stops_the_cycle(self):
+        for _ in range(3):
+            warmer.record_request("movie", "tt0133093", {})
+        with patch("flix_stream.warmer.upstream_throttled", return_value=True):
+            self.assertEqual(warmer.warm_once(), 0)
+        self.assertEqual(self.built, [])
+        self.assertGreaterEqual(warmer.warmer_stats()["skipped_throttled"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()